@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+bench_codecs
+============
+
+Compares save time, load time and file size of pys containers for the
+compression codecs of src.lib.compression at their lowest, default and
+highest levels. Sample sheets hold numbers, text and formulas.
+
+Usage: python bench_codecs.py [no_cells]
+
+"""
+
+import os
+import random
+import sys
+import tempfile
+from timeit import default_timer
+
+import wx
+app = wx.App()
+
+BENCHPATH = os.sep.join(os.path.realpath(__file__).split(os.sep)[:-1])
+sys.path.insert(0, BENCHPATH + os.sep + os.pardir)
+sys.path.insert(0, BENCHPATH + os.sep + os.pardir + os.sep + "src")
+
+from src.config import config
+from src.interfaces.pys import Pys
+from src.lib.compression import codecs
+from src.model.model import CodeArray
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta"]
+
+
+def get_sample_sheets(no_cells):
+    """Returns dict of sample sheet name to CodeArray with no_cells cells"""
+
+    rng = random.Random(0)
+    no_rows = max(1, no_cells // 10)
+
+    def get_code_array(get_code):
+        """Returns CodeArray filled with get_code(row, col) for all cells"""
+
+        code_array = CodeArray((no_rows, 10, 1))
+        code_array.dict_grid.update(((row, col, 0), get_code(row, col))
+                                    for row in xrange(no_rows)
+                                    for col in xrange(10))
+        return code_array
+
+    return {
+        "numbers": get_code_array(
+            lambda row, col: repr(rng.uniform(-1e6, 1e6))),
+        "text": get_code_array(
+            lambda row, col: repr(" ".join(rng.sample(WORDS, 3)))),
+        "formulas": get_code_array(
+            lambda row, col: "S[{}, {}, 0] * 2 + {}".format(
+                max(row - 1, 0), col, col)),
+    }
+
+
+def bench_codec(code_array, filepath):
+    """Returns save time, load time and file size of a container"""
+
+    start = default_timer()
+    with open(filepath, "wb") as outfile:
+        Pys(code_array, outfile).from_code_array(container=True)
+    save_time = default_timer() - start
+
+    start = default_timer()
+    with open(filepath, "rb") as infile:
+        Pys(CodeArray((1, 1, 1)), infile).to_code_array()
+    load_time = default_timer() - start
+
+    return save_time, load_time, os.path.getsize(filepath)
+
+
+def main(no_cells=100000):
+    """Prints save time, load time and size per codec and sample sheet"""
+
+    filehandle, filepath = tempfile.mkstemp(suffix=".pys")
+    os.close(filehandle)
+
+    # Measure the codecs and not the thread pool
+    config["pys_compression_threads"] = repr(1)
+
+    try:
+        for sheet, code_array in sorted(get_sample_sheets(no_cells).items()):
+            print "Sample sheet {} with {} cells".format(sheet, no_cells)
+            print "{:>6} {:>6} {:>9} {:>9} {:>12}".format(
+                "codec", "level", "save [s]", "load [s]", "size [byte]")
+
+            for codec in codecs.itervalues():
+                if codec.levels is None:
+                    levels = [None]
+                else:
+                    levels = sorted(set([codec.levels[0],
+                                         codec.default_level,
+                                         codec.levels[1]]))
+
+                for level in levels:
+                    config["pys_codec"] = repr(codec.name)
+                    config["pys_codec_level"] = repr(level)
+
+                    save_time, load_time, size = \
+                        bench_codec(code_array, filepath)
+
+                    print "{:>6} {:>6} {:>9.3f} {:>9.3f} {:>12}".format(
+                        codec.name, level, save_time, load_time, size)
+
+            print
+
+    finally:
+        os.remove(filepath)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
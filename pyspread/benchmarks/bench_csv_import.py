@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+bench_csv_import
+================
+
+Compares the import throughput in rows per second of the cell by cell csv
+import with the column converter import, which converts row batches and
+inserts them in bulk. The sample file holds integers, floats and text.
+
+Usage: python bench_csv_import.py [no_rows]
+
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import types
+from timeit import default_timer
+
+import wx
+app = wx.App()
+
+BENCHPATH = os.sep.join(os.path.realpath(__file__).split(os.sep)[:-1])
+sys.path.insert(0, BENCHPATH + os.sep + os.pardir)
+sys.path.insert(0, BENCHPATH + os.sep + os.pardir + os.sep + "src")
+
+from src.lib.__csv import CsvInterface, convert_rows
+from src.lib.undo import group as undo_group
+from src.model.model import CodeArray
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta"]
+
+DIGEST_TYPES = [types.IntType, types.FloatType, types.UnicodeType,
+                types.UnicodeType]
+
+
+def write_sample_file(filepath, no_rows):
+    """Writes csv file with no_rows rows to filepath"""
+
+    rng = random.Random(0)
+
+    with open(filepath, "wb") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        for row in xrange(no_rows):
+            csv_writer.writerow([row, rng.uniform(-1e6, 1e6),
+                                 " ".join(rng.sample(WORDS, 3)),
+                                 rng.choice(WORDS)])
+
+
+def import_cellwise(csv_interface, code_array):
+    """Imports cell by cell with one Digest object per cell"""
+
+    with open(csv_interface.path, "rb") as csvfile:
+        with undo_group("Import"):
+            for row, line in enumerate(csv.reader(csvfile)):
+                cells = csv_interface._get_csv_cells_gen(line)
+                for col, code in enumerate(cells):
+                    code_array[row, col, 0] = code
+
+
+def import_batches(csv_interface, code_array):
+    """Imports row batches with column converters and bulk insertion"""
+
+    converters = csv_interface._get_converters()
+    batch_size = csv_interface.batch_size
+
+    with open(csv_interface.path, "rb") as csvfile:
+        csv_reader = csv.reader(csvfile)
+        with undo_group("Import"):
+            row = 0
+            while True:
+                batch = [line for __, line in zip(xrange(batch_size),
+                                                  csv_reader)]
+                if not batch:
+                    break
+
+                code_array.set_cells(
+                    ((row + i, col, 0), code)
+                    for i, line in enumerate(convert_rows(batch, converters))
+                    for col, code in enumerate(line))
+                row += len(batch)
+
+
+def main(no_rows=100000):
+    """Prints import time and throughput of both import paths"""
+
+    filehandle, filepath = tempfile.mkstemp(suffix=".csv")
+    os.close(filehandle)
+
+    try:
+        write_sample_file(filepath, no_rows)
+        csv_interface = CsvInterface(None, filepath, csv.excel,
+                                     DIGEST_TYPES, False)
+
+        print "CSV import of {} rows".format(no_rows)
+        print "{:>9} {:>9} {:>12}".format("import", "time [s]", "rows/s")
+
+        for name, import_func in [("cellwise", import_cellwise),
+                                  ("batches", import_batches)]:
+            code_array = CodeArray((no_rows, len(DIGEST_TYPES), 1))
+
+            start = default_timer()
+            import_func(csv_interface, code_array)
+            duration = default_timer() - start
+
+            print "{:>9} {:>9.3f} {:>12.0f}".format(name, duration,
+                                                    no_rows / duration)
+
+    finally:
+        os.remove(filepath)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
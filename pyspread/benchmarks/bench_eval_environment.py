@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+bench_eval_environment
+======================
+
+Compares the cell evaluation environment of CodeArray._eval_cell, which
+overlays the per cell names onto the shared globals, with the former
+approach of copying globals via _get_updated_environment for each cell.
+Globals are defined via macros.
+
+Usage: python bench_eval_environment.py [no_cells]
+
+"""
+
+import os
+import sys
+from timeit import default_timer
+
+import wx
+app = wx.App()
+
+BENCHPATH = os.sep.join(os.path.realpath(__file__).split(os.sep)[:-1])
+sys.path.insert(0, BENCHPATH + os.sep + os.pardir)
+sys.path.insert(0, BENCHPATH + os.sep + os.pardir + os.sep + "src")
+
+from src.model.model import CodeArray
+
+GLOBALS_COUNTS = [0, 1000, 10000, 100000]
+CODE = "X * Y + Z"
+
+
+def bench_copied_environment(code_array, keys):
+    """Evaluates code for all keys with a copy of globals per cell"""
+
+    expression = compile(CODE, "<string>", "eval")
+
+    start = default_timer()
+
+    for key in keys:
+        env_dict = {'X': key[0], 'Y': key[1], 'Z': key[2], 'S': code_array}
+        env = code_array._get_updated_environment(env_dict=env_dict)
+        eval(expression, env, {})
+
+    return default_timer() - start
+
+
+def bench_overlaid_environment(code_array, keys):
+    """Evaluates code for all keys with per cell names overlaid on globals"""
+
+    expression = compile(CODE, "<string>", "eval")
+    env = code_array.get_globals()
+
+    start = default_timer()
+
+    for key in keys:
+        env_dict = {'X': key[0], 'Y': key[1], 'Z': key[2], 'S': code_array}
+        env_backup = code_array._overlay_environment(env, env_dict)
+        eval(expression, env, {})
+        code_array._restore_environment(env, env_backup)
+
+    return default_timer() - start
+
+
+def main(no_cells=10000):
+    """Prints evaluation times for growing numbers of macro globals"""
+
+    code_array = CodeArray((no_cells, 1, 1))
+    keys = [(row, 0, 0) for row in xrange(no_cells)]
+
+    print "Evaluation of {} cells".format(no_cells)
+    print "{:>10} {:>12} {:>12} {:>8}".format("globals", "copied [s]",
+                                              "overlaid [s]", "speedup")
+
+    for globals_count in GLOBALS_COUNTS:
+        code_array.clear_globals()
+        code_array.macros = u"\n".join(u"bench_var_{} = {}".format(i, i)
+                                       for i in xrange(globals_count))
+        code_array.execute_macros()
+
+        copied = bench_copied_environment(code_array, keys)
+        overlaid = bench_overlaid_environment(code_array, keys)
+
+        print "{:>10} {:>12.4f} {:>12.4f} {:>8.1f}".format(
+            globals_count, copied, overlaid, copied / overlaid)
+
+    code_array.clear_globals()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
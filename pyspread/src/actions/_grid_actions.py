@@ -52,8 +52,12 @@ import os.path
 import src.lib.i18n as i18n
 import shutil
 import tempfile
+import threading
+import time
 import types
 
+import numpy
+
 try:
     import xlrd
 except ImportError:
@@ -64,22 +68,14 @@ try:
 except ImportError:
     xlwt = None
 
-try:
-    import odf
-except ImportError:
-    odf = None
-
 import wx
 
 from src.config import config
 from src.sysvars import get_default_font, is_gtk
 from src.gui._grid_table import GridTable
-from src.interfaces.pys import Pys
+from src.interfaces.pys import Pys, is_container_file
 from src.interfaces.xls import Xls
-try:
-    from src.interfaces.ods import Ods
-except ImportError:
-    Ods = None
+from src.interfaces.ods import Ods
 
 try:
     from src.lib.gpg import sign, verify
@@ -89,12 +85,14 @@ except ImportError:
     GPG_PRESENT = False
 
 from src.lib.selection import Selection
-from src.lib.fileio import AOpen, Bz2AOpen
+from src.lib.compression import detect_file_codec
+from src.lib.fileio import AOpen, Bz2AOpen, GzipAOpen, LzmaAOpen
+import src.lib.undo as undo
 
 from src.actions._main_window_actions import Actions
 from src.actions._grid_cell_actions import CellActions
 
-from src.gui._events import post_command_event
+from src.gui._events import post_command_event, DeadObjectError
 
 # Use ugettext instead of getttext to avoid unicode errors
 _ = i18n.language.ugettext
@@ -112,6 +110,30 @@ class FileActions(Actions):
 
         self.saving = False
 
+        # True while a worker thread saves, such saves cannot be aborted
+        self.background_saving = False
+
+        # True while a CSV export is written, it can be aborted with <Esc>
+        self.exporting = False
+
+        # Worker thread of the last background save
+        self.save_thread = None
+
+        # Last undo action at the snapshot of the running background save
+        self.save_undo_action = None
+
+        # Target file path, filetype and success of the last background save
+        self.save_result = None
+
+        # Lazy loading state: interface, its file and the tables to load
+        self.lazy_interface = None
+        self.lazy_file = None
+        self.pending_tables = []
+
+        # State of the pys container that the journal refers to, see
+        # _start_journal
+        self.journal_file = None
+
         self.main_window.Bind(self.EVT_CMD_GRID_ACTION_OPEN, self.open)
         self.main_window.Bind(self.EVT_CMD_GRID_ACTION_SAVE, self.save)
 
@@ -280,6 +302,12 @@ class FileActions(Actions):
 
         """
 
+        # Tables of the previous file must not be loaded any more
+        self.stop_lazy_loading()
+
+        # Changes do not refer to the previous file any more
+        self._stop_journal()
+
         # Without setting this explicitly, the cursor is set too late
         self.grid.actions.cursor = 0, 0, 0
         self.grid.current_table = 0
@@ -351,8 +379,7 @@ class FileActions(Actions):
             type2opener["xlsx"] = \
                 (xlrd.open_workbook, [filepath], {"formatting_info": False})
 
-        if odf is not None and Ods is not None:
-            type2opener["ods"] = (open, [filepath, "rb"], {})
+        type2opener["ods"] = (open, [filepath, "rb"], {})
 
         # Specify the interface that shall be used
         opener, op_args, op_kwargs = type2opener[filetype]
@@ -362,6 +389,9 @@ class FileActions(Actions):
         self.opening = True
 
         try:
+            if filetype in ["pys", "pysu"]:
+                opener, op_args[1] = self._get_pys_opener(filepath)
+
             with opener(*op_args, **op_kwargs) as infile:
                 # Make loading safe
                 self.approve(filepath)
@@ -376,7 +406,19 @@ class FileActions(Actions):
                     self.grid.Disable()
                     self.clear()
                     interface = Interface(self.grid.code_array, infile)
-                    interface.to_code_array()
+
+                    if self._is_lazy_loadable(interface, filetype):
+                        self._start_lazy_loading(interface, filepath,
+                                                 filetype)
+                    else:
+                        interface.to_code_array()
+
+                    if filetype in ["pys", "pysu"] and \
+                       interface.is_container():
+                        self._start_journal(filepath)
+
+                    if config["columnar_storage"]:
+                        self.grid.code_array.dict_grid.compact()
                     self.grid.main_window.macro_panel.codetext_ctrl.SetText(
                         self.grid.code_array.macros)
 
@@ -419,6 +461,231 @@ class FileActions(Actions):
             # Unset state for file open
             self.opening = False
 
+    def _get_pys_opener(self, filepath):
+        """Returns AOpen class and file mode for opening a pys file
+
+        Indexed pys containers are read without decompressing all of them.
+        The compression of version 0.1 files is detected from their magic
+        bytes. Raises IOError if the compression is unsupported.
+
+        """
+
+        if is_container_file(filepath):
+            return AOpen, "rb"
+
+        codec2opener = {
+            "none": AOpen,
+            "bz2": Bz2AOpen,
+            "gzip": GzipAOpen,
+            "lzma": LzmaAOpen,
+        }
+
+        codec = detect_file_codec(filepath)
+        opener = codec2opener.get(codec)
+
+        if opener is None:
+            msg = _("Compression {codec} unsupported.").format(codec=codec)
+            raise IOError(msg)
+
+        return opener, "r"
+
+    def _get_file_state(self, filepath):
+        """Returns tuple of absolute path, size and mtime of filepath"""
+
+        stat = os.stat(filepath)
+
+        return os.path.abspath(filepath), stat.st_size, stat.st_mtime
+
+    def _start_journal(self, filepath):
+        """Records changes for incremental saving into pys container filepath
+
+        The code_array has to match the content of filepath.
+
+        """
+
+        self.code_array.start_journal()
+        self.journal_file = self._get_file_state(filepath)
+
+    def _stop_journal(self):
+        """Stops recording changes for incremental saving"""
+
+        self.code_array.stop_journal()
+        self.journal_file = None
+
+    def _get_save_journal(self, filepath):
+        """Returns journal if filepath can be saved incrementally else None
+
+        filepath has to be the unchanged pys container that has been opened
+        or saved last. The journal must not exceed pys_journal_max_ratio of
+        the container data. Otherwise, the file is rewritten completely.
+
+        """
+
+        if not config["pys_journal"] or not config["pys_container"] or \
+           config["font_save_enabled"]:
+            return
+
+        try:
+            if self._get_file_state(filepath) != self.journal_file:
+                return
+
+        except OSError:
+            return
+
+        journal = self.code_array.get_journal()
+        if journal is None:
+            return
+
+        try:
+            with open(filepath, "rb") as infile:
+                interface = Pys(self.code_array, infile)
+
+                # Cells of tables that are not loaded yet are not removed
+                # when the shape shrinks
+                shape = tuple(interface.read_index()["shape"])
+                if self.pending_tables and \
+                   shape != tuple(self.code_array.shape):
+                    return
+
+                ratio = interface.get_journal_ratio(journal)
+
+        except (IOError, ValueError, SyntaxError):
+            return
+
+        if ratio <= config["pys_journal_max_ratio"]:
+            return journal
+
+    def _is_lazy_loadable(self, interface, filetype):
+        """Returns True if interface can load tables when they are needed"""
+
+        if not config["lazy_loading"]:
+            return False
+
+        if filetype == "pys":
+            return interface.is_container()
+
+        return filetype in ("xls", "xlsx")
+
+    def _start_lazy_loading(self, interface, filepath, filetype):
+        """Loads the current table and schedules loading the other tables
+
+        Parameters
+        ----------
+        interface: Pys or Xls object
+        \tInterface of the opened file, which provides load_tables
+        filepath: String
+        \tPath of the opened file
+        filetype: String
+        \tFile type of the opened file
+
+        """
+
+        tab = self.grid.current_table
+
+        interface.to_code_array(tables=[tab])
+
+        no_tabs = self.grid.code_array.shape[2]
+
+        if tab >= no_tabs:
+            # The previous current table does not exist in this file
+            tab = 0
+            interface.load_tables([tab])
+
+        if filetype == "pys":
+            # The opened file is closed after loading the current table
+            self.lazy_file = open(filepath, "rb")
+            interface = Pys(self.grid.code_array, self.lazy_file)
+
+        self.lazy_interface = interface
+        self.pending_tables = [table for table in xrange(no_tabs)
+                               if table != tab]
+
+        if self.pending_tables:
+            wx.CallLater(config["lazy_loading_delay"],
+                         self._load_next_pending_table)
+        else:
+            self.stop_lazy_loading()
+
+    def _load_next_pending_table(self):
+        """Loads one pending table in the background and schedules the next
+
+        Loading happens in the main thread between GUI events.
+
+        """
+
+        if not self.pending_tables:
+            return
+
+        if self.saving or self.opening:
+            # Retry later
+            wx.CallLater(config["lazy_loading_delay"],
+                         self._load_next_pending_table)
+            return
+
+        self.load_table(self.pending_tables[0])
+
+        if self.pending_tables:
+            wx.CallLater(config["lazy_loading_delay"],
+                         self._load_next_pending_table)
+
+    def load_table(self, tab):
+        """Loads table if it is pending from a lazily opened file
+
+        Parameters
+        ----------
+        tab: Integer
+        \tTable that is loaded
+
+        """
+
+        if tab not in self.pending_tables:
+            return
+
+        self.pending_tables.remove(tab)
+
+        with undo.suspended():
+            self.lazy_interface.load_tables([tab])
+
+        # Results may depend on the loaded cells
+        self.code_array.result_cache.clear()
+
+        no_tabs = self.grid.code_array.shape[2]
+        no_loaded = no_tabs - len(self.pending_tables)
+
+        statustext = _("Table {tab} loaded, {no_loaded} of {no_tabs} "
+                       "tables available.").format(tab=tab,
+                                                   no_loaded=no_loaded,
+                                                   no_tabs=no_tabs)
+
+        load_rate = getattr(self.lazy_interface, "load_rate", None)
+        if load_rate is not None:
+            statustext += " " + _("{rate:.0f} rows/s").format(rate=load_rate)
+        try:
+            post_command_event(self.main_window, self.StatusBarMsg,
+                               text=statustext)
+        except TypeError:
+            # The main window does not exist any more
+            pass
+
+        if not self.pending_tables:
+            self.stop_lazy_loading()
+
+    def load_pending_tables(self):
+        """Loads all pending tables, e.g. before the file is saved"""
+
+        while self.pending_tables:
+            self.load_table(self.pending_tables[0])
+
+    def stop_lazy_loading(self):
+        """Drops pending tables and closes the lazily loaded file"""
+
+        self.pending_tables = []
+        self.lazy_interface = None
+
+        if self.lazy_file is not None:
+            self.lazy_file.close()
+            self.lazy_file = None
+
     def sign_file(self, filepath):
         """Signs file if possible"""
 
@@ -430,12 +697,7 @@ class FileActions(Actions):
 
         if signature is None or not signature:
             statustext = _('Error signing file. ') + signed_data.stderr
-            try:
-                post_command_event(self.main_window, self.StatusBarMsg,
-                                   text=statustext)
-            except TypeError:
-                # The main window does not exist any more
-                pass
+            self._post_save_status(statustext)
 
             return
 
@@ -449,10 +711,25 @@ class FileActions(Actions):
         else:
             statustext = _('File signed')
 
+        self._post_save_status(statustext)
+
+    def _post_save_status(self, text):
+        """Posts status bar text of saves, which may run in a worker thread
+
+        Nothing is posted if the main window does not exist any more.
+
+        Parameters
+        ----------
+
+        text: Unicode
+        \tStatus bar text
+
+        """
+
         try:
             post_command_event(self.main_window, self.StatusBarMsg,
-                               text=statustext)
-        except TypeError:
+                               text=text)
+        except (TypeError, DeadObjectError):
             # The main window does not exist any more
             pass
 
@@ -495,7 +772,7 @@ class FileActions(Actions):
 
         except OSError, err:
             # No tmp file present
-            post_command_event(self.main_window, self.StatusBarMsg, text=err)
+            self._post_save_status(unicode(err))
 
     def _save_xls(self, filepath):
         """Saves file as xls workbook
@@ -525,35 +802,100 @@ class FileActions(Actions):
                 # The main window does not exist any more
                 pass
 
-    def _save_pys(self, filepath):
-        """Saves file as pys file and returns True if save success
+    def _save_ods(self, filepath):
+        """Saves file as ods file
 
         Parameters
         ----------
 
         filepath: String
-        \tTarget file path for xls file
+        \tTarget file path for ods file
 
         """
 
+        Interface = self.type2interface["ods"]
+
         try:
-            with Bz2AOpen(filepath, "wb",
-                          main_window=self.main_window) as outfile:
-                interface = Pys(self.grid.code_array, outfile)
+            with open(filepath, "wb") as ods_file:
+                interface = Interface(self.grid.code_array, ods_file)
                 interface.from_code_array()
 
-        except (IOError, ValueError), err:
+        except IOError, err:
             try:
                 post_command_event(self.main_window, self.StatusBarMsg,
                                    text=err)
-                return
             except TypeError:
                 # The main window does not exist any more
                 pass
 
+    def _save_pys(self, filepath, code_array=None, background=False):
+        """Saves file as pys file and returns True if save success
+
+        Parameters
+        ----------
+
+        filepath: String
+        \tTarget file path for xls file
+        code_array: CodeArray or DataArray, defaults to None
+        \tData that is saved, the grid's code_array if None
+        background: Bool, defaults to False
+        \tIf True then the file is written in a worker thread
+
+        """
+
+        if code_array is None:
+            code_array = self.grid.code_array
+
+        container = config["pys_container"]
+
+        opener = AOpen if container else Bz2AOpen
+
+        try:
+            with opener(filepath, "wb", main_window=self.main_window,
+                        background=background) as outfile:
+                interface = Pys(code_array, outfile)
+                interface.from_code_array(container=container)
+
+        except (IOError, ValueError), err:
+            self._post_save_status(unicode(err))
+            return False
+
+        return not outfile.aborted
+
+    def _save_pys_journal(self, filepath, journal, code_array=None,
+                          background=False):
+        """Appends journal to pys container filepath, returns True on success
+
+        Parameters
+        ----------
+
+        filepath: String
+        \tPath of the pys container that the journal refers to
+        journal: Dict
+        \tJournal of changes, see DataArray.get_journal
+        code_array: CodeArray or DataArray, defaults to None
+        \tData that the journal refers to, the grid's code_array if None
+        background: Bool, defaults to False
+        \tIf True then the file is written in a worker thread
+
+        """
+
+        if code_array is None:
+            code_array = self.grid.code_array
+
+        try:
+            with AOpen(filepath, "r+b", main_window=self.main_window,
+                       background=background) as outfile:
+                interface = Pys(code_array, outfile)
+                interface.append_journal(journal)
+
+        except (IOError, ValueError), err:
+            self._post_save_status(unicode(err))
+            return False
+
         return not outfile.aborted
 
-    def _save_pysu(self, filepath):
+    def _save_pysu(self, filepath, code_array=None, background=False):
         """Saves file as pys file and returns True if save success
 
         Parameters
@@ -561,23 +903,25 @@ class FileActions(Actions):
 
         filepath: String
         \tTarget file path for xls file
+        code_array: CodeArray or DataArray, defaults to None
+        \tData that is saved, the grid's code_array if None
+        background: Bool, defaults to False
+        \tIf True then the file is written in a worker thread
 
         """
 
+        if code_array is None:
+            code_array = self.grid.code_array
+
         try:
-            with AOpen(filepath, "wb",
-                       main_window=self.main_window) as outfile:
-                interface = Pys(self.grid.code_array, outfile)
+            with AOpen(filepath, "wb", main_window=self.main_window,
+                       background=background) as outfile:
+                interface = Pys(code_array, outfile)
                 interface.from_code_array()
 
         except (IOError, ValueError), err:
-            try:
-                post_command_event(self.main_window, self.StatusBarMsg,
-                                   text=err)
-                return
-            except TypeError:
-                # The main window does not exist any more
-                pass
+            self._post_save_status(unicode(err))
+            return False
 
         return not outfile.aborted
 
@@ -586,12 +930,7 @@ class FileActions(Actions):
 
         if self.code_array.safe_mode:
             msg = _("File saved but not signed because it is unapproved.")
-            try:
-                post_command_event(self.main_window, self.StatusBarMsg,
-                                   text=msg)
-            except TypeError:
-                # The main window does not exist any more
-                pass
+            self._post_save_status(msg)
 
         else:
             try:
@@ -599,8 +938,7 @@ class FileActions(Actions):
 
             except ValueError, err:
                 msg = "Signing file failed. " + unicode(err)
-                post_command_event(self.main_window, self.StatusBarMsg,
-                                   text=msg)
+                self._post_save_status(msg)
 
     def save(self, event):
         """Saves a file that is specified in event.attr
@@ -609,6 +947,7 @@ class FileActions(Actions):
         ----------
         event.attr: Dict
         \tkey filepath contains file path of file to be saved
+        \tkey background is False if the file has to be written on return
 
         """
 
@@ -619,10 +958,38 @@ class FileActions(Actions):
         except KeyError:
             filetype = "pys"
 
+        # Saves that have to be finished when this method returns, e.g.
+        # before the main window is closed, do not run in the background
+        background = event.attr.get("background", True)
+
+        if not background:
+            self.wait_for_background_save()
+
         # If saving is already in progress abort
         if self.saving:
             return
 
+        # pys files are saved from a snapshot while editing continues
+        if filetype in ["pys", "pysu", "all"] and \
+           config["background_saving"] and background:
+            self._save_in_background(filepath, filetype)
+            return
+
+        # Changes to the last saved pys container are appended
+        if filetype == "pys":
+            journal = self._get_save_journal(filepath)
+
+            if journal is not None:
+                self._set_save_states()
+                if self._save_pys_journal(filepath, journal):
+                    self._save_sign(filepath)
+                    self._start_journal(filepath)
+                self._release_save_states()
+                return
+
+        # A lazily opened file has to be complete before it is saved
+        self.load_pending_tables()
+
         # Use tmpfile to make sure that old save file does not get lost
         # on abort save
 
@@ -634,12 +1001,23 @@ class FileActions(Actions):
             self._move_tmp_file(tmpfilepath, filepath)
             self._release_save_states()
 
+        elif filetype == "ods":
+            self._set_save_states()
+            self._save_ods(tmpfilepath)
+            self._move_tmp_file(tmpfilepath, filepath)
+            self._release_save_states()
+
         elif filetype == "pys" or filetype == "all":
             self._set_save_states()
             if self._save_pys(tmpfilepath):
                 # Writing was successful
                 self._move_tmp_file(tmpfilepath, filepath)
                 self._save_sign(filepath)
+
+                if config["pys_container"]:
+                    self._start_journal(filepath)
+                else:
+                    self._stop_journal()
             self._release_save_states()
 
         elif filetype == "pysu":
@@ -661,6 +1039,163 @@ class FileActions(Actions):
             pass
 
 
+    def _save_in_background(self, filepath, filetype):
+        """Saves a snapshot of the grid in a worker thread
+
+        The snapshot and the journal are taken in the main thread. Changes
+        from then on are recorded in a new journal. Serializing,
+        compressing, signing and moving the file happen in the worker
+        thread, which reports progress via status bar events.
+
+        Parameters
+        ----------
+
+        filepath: String
+        \tTarget file path
+        filetype: String
+        \tpys, pysu or all
+
+        """
+
+        journal = None
+        if filetype == "pys":
+            journal = self._get_save_journal(filepath)
+
+        if journal is None:
+            # A lazily opened file has to be complete before it is saved
+            self.load_pending_tables()
+
+        snapshot = self.code_array.get_snapshot()
+
+        # The journal of the next save starts with the snapshot
+        self.journal_file = None
+        if filetype in ["pys", "all"] and config["pys_container"]:
+            self.code_array.start_journal()
+        else:
+            self.code_array.stop_journal()
+
+        self.saving = True
+        self.background_saving = True
+
+        # The undo savepoint is set to this state if the save succeeds
+        self.save_undo_action = undo.stack().lastaction()
+
+        statustext = _("Saving {filepath}...").format(filepath=filepath)
+        post_command_event(self.main_window, self.StatusBarMsg,
+                           text=statustext)
+
+        self.save_thread = threading.Thread(
+            target=self._save_snapshot,
+            args=(snapshot, filepath, filetype, journal))
+        self.save_thread.start()
+
+    def _save_snapshot(self, snapshot, filepath, filetype, journal):
+        """Saves snapshot into filepath, runs in the background save thread
+
+        Only thread safe wx functions are called. The result is handed to
+        _finish_background_save in the main thread.
+
+        Parameters
+        ----------
+
+        snapshot: DataArray
+        \tSnapshot of the grid data, see DataArray.get_snapshot
+        filepath: String
+        \tTarget file path
+        filetype: String
+        \tpys, pysu or all
+        journal: Dict or None
+        \tJournal that is appended to filepath, full save if None
+
+        """
+
+        success = False
+
+        try:
+            if journal is not None:
+                success = self._save_pys_journal(filepath, journal, snapshot,
+                                                 background=True)
+
+            else:
+                # Use tmpfile to make sure that old save file does not get
+                # lost on failed saves
+                tmpfile_fd, tmpfilepath = tempfile.mkstemp()
+                os.close(tmpfile_fd)
+
+                if filetype == "pysu":
+                    save = self._save_pysu
+                else:
+                    save = self._save_pys
+
+                try:
+                    success = save(tmpfilepath, snapshot, background=True)
+                    if success:
+                        self._move_tmp_file(tmpfilepath, filepath)
+
+                finally:
+                    try:
+                        os.remove(tmpfilepath)
+                    except OSError:
+                        pass
+
+            if success:
+                self._save_sign(filepath)
+
+        finally:
+            self.save_result = filepath, filetype, success
+            wx.CallAfter(self._finish_background_save, filepath, filetype,
+                         success)
+
+    def wait_for_background_save(self):
+        """Waits until a running background save is finished
+
+        The save is finished right away instead of waiting for the main
+        loop, e.g. when the main window is closed.
+
+        """
+
+        if self.save_thread is not None:
+            self.save_thread.join()
+
+        if self.background_saving:
+            self._finish_background_save(*self.save_result)
+
+    def _finish_background_save(self, filepath, filetype, success):
+        """Releases save state after a background save in the main thread"""
+
+        if not self.background_saving:
+            # The save has been finished by wait_for_background_save
+            return
+
+        self.saving = False
+        self.background_saving = False
+
+        if success and filetype in ["pys", "all"] and \
+           config["pys_container"]:
+            self.journal_file = self._get_file_state(filepath)
+        else:
+            # The journal lacks the changes that have not been saved
+            self._stop_journal()
+
+        if success:
+            # Changes after the snapshot are not saved
+            if undo.stack().lastaction() is self.save_undo_action:
+                undo.stack().savepoint()
+
+            statustext = _("{filepath} saved.").format(filepath=filepath)
+        else:
+            statustext = _("Saving {filepath} failed.").format(
+                filepath=filepath)
+
+        try:
+            post_command_event(self.main_window, self.StatusBarMsg,
+                               text=statustext)
+            post_command_event(self.main_window, self.ContentChangedMsg)
+        except (TypeError, DeadObjectError):
+            # The main window does not exist any more
+            pass
+
+
 class TableRowActionsMixin(Actions):
     """Table row controller actions"""
 
@@ -687,6 +1222,9 @@ class TableRowActionsMixin(Actions):
 
         tab = self.grid.current_table
 
+        # Undo restores the cell attributes from before the insertion
+        self.load_pending_tables()
+
         self.code_array.insert(row, no_rows, axis=0, tab=tab)
 
     def delete_rows(self, row, no_rows=1):
@@ -697,6 +1235,9 @@ class TableRowActionsMixin(Actions):
 
         tab = self.grid.current_table
 
+        # Undo restores the cell attributes from before the deletion
+        self.load_pending_tables()
+
         try:
             self.code_array.delete(row, no_rows, axis=0, tab=tab)
 
@@ -731,6 +1272,9 @@ class TableColumnActionsMixin(Actions):
 
         tab = self.grid.current_table
 
+        # Undo restores the cell attributes from before the insertion
+        self.load_pending_tables()
+
         self.code_array.insert(col, no_cols, axis=1, tab=tab)
 
     def delete_cols(self, col, no_cols=1):
@@ -741,6 +1285,9 @@ class TableColumnActionsMixin(Actions):
 
         tab = self.grid.current_table
 
+        # Undo restores the cell attributes from before the deletion
+        self.load_pending_tables()
+
         try:
             self.code_array.delete(col, no_cols, axis=1, tab=tab)
 
@@ -762,6 +1309,9 @@ class TableTabActionsMixin(Actions):
         # Mark content as changed
         post_command_event(self.main_window, self.ContentChangedMsg)
 
+        # Pending tables of lazily opened files would be moved
+        self.load_pending_tables()
+
         self.code_array.insert(tab, no_tabs, axis=2)
 
         # Update TableChoiceIntCtrl
@@ -774,6 +1324,9 @@ class TableTabActionsMixin(Actions):
         # Mark content as changed
         post_command_event(self.main_window, self.ContentChangedMsg)
 
+        # Pending tables of lazily opened files would be moved
+        self.load_pending_tables()
+
         try:
             self.code_array.delete(tab, no_tabs, axis=2)
 
@@ -805,12 +1358,16 @@ class TableActions(TableRowActionsMixin, TableColumnActionsMixin,
         self.main_window.Bind(wx.EVT_KEY_DOWN, self.on_key)
 
     def on_key(self, event):
-        """Sets abort if pasting and if escape is pressed"""
+        """Sets abort if pasting or saving and if escape is pressed"""
+
+        # If paste or save is running and Esc is pressed then we need to
+        # abort. Background saves cannot be aborted.
 
-        # If paste is running and Esc is pressed then we need to abort
+        actions = self.grid.actions
+        is_saving = actions.saving and not actions.background_saving
 
         if event.GetKeyCode() == wx.WXK_ESCAPE and \
-           self.pasting or self.grid.actions.saving:
+           (self.pasting or is_saving):
             self.need_abort = True
 
         event.Skip()
@@ -938,6 +1495,124 @@ class TableActions(TableRowActionsMixin, TableColumnActionsMixin,
 
         self.pasting = False
 
+    def paste_batches(self, tl_key, batches, progress=None):
+        """Pastes row batches into grid from top left cell tl_key
+
+        All cells are set in bulk and are undone in one step. The import
+        throughput in rows per second is shown in the statusbar.
+
+        Batches that are 2D numpy byte string arrays are inserted directly
+        into the column storage if columnar storage is enabled.
+
+        Parameters
+        ----------
+
+        tl_key: Tuple
+        \tKey of top left cell of paste area
+        batches: Iterable of lists of iterables or of 2D numpy arrays
+        \tBatches of rows, cells that are None are skipped
+        progress: Callable, defaults to None
+        \tReturns the share of the data that has been read, e.g. from byte
+        \toffsets, which is shown in the statusbar
+
+        """
+
+        self.pasting = True
+        self.need_abort = False
+
+        code_array = self.grid.code_array
+        grid_rows, grid_cols, __ = code_array.shape
+
+        tl_row, tl_col, tl_tab = self._get_full_key(tl_key)
+
+        # Numbers of rows and columns that fit into the grid
+        max_rows = grid_rows - tl_row
+        max_cols = grid_cols - tl_col
+
+        # Merged cells are respected by set_cells only
+        max_width = code_array.dict_grid.columns.max_width
+        columnar = config["columnar_storage"] and \
+            tl_tab not in code_array.cell_attributes.get_merging_tables()
+
+        row_overflow = False
+        col_overflow = False
+
+        no_rows = 0
+        no_pasted_cells = 0
+
+        start_time = time.time()
+
+        with undo.group(_("Import")):
+            for batch in batches:
+                if no_rows + len(batch) > max_rows:
+                    batch = batch[:max_rows - no_rows]
+                    row_overflow = True
+
+                no_batch_rows = len(batch)
+
+                if isinstance(batch, numpy.ndarray):
+                    if batch.shape[1] > max_cols:
+                        batch = batch[:, :max_cols]
+                        col_overflow = True
+
+                    if columnar and batch.itemsize <= max_width:
+                        code_array.set_block(tl_row + no_rows, tl_col,
+                                             tl_tab, batch)
+                        no_pasted_cells += batch.size
+                        batch = []
+                    else:
+                        batch = batch.tolist()
+
+                cells = []
+                for src_row, row_data in enumerate(batch, no_rows):
+                    row_data = tuple(row_data)
+                    if len(row_data) > max_cols:
+                        row_data = row_data[:max_cols]
+                        col_overflow = True
+
+                    target_row = tl_row + src_row
+                    cells.extend(((target_row, tl_col + src_col, tl_tab), code)
+                                 for src_col, code in enumerate(row_data)
+                                 if code is not None)
+
+                code_array.set_cells(cells)
+
+                no_rows += no_batch_rows
+                no_pasted_cells += len(cells)
+
+                if row_overflow:
+                    break
+
+                rate = no_rows / max(time.time() - start_time, 1e-6)
+                statustext = _("Importing {rate:.0f} rows/s... ").format(
+                    rate=rate)
+
+                if progress is not None:
+                    statustext = _("Importing {percent:.0f} %, {rate:.0f} "
+                                   "rows/s... ").format(
+                        percent=100.0 * progress(), rate=rate)
+
+                if self._is_aborted(no_rows, statustext, freq=1):
+                    self._abort_paste()
+                    return False
+
+        if row_overflow or col_overflow:
+            self._show_final_overflow_message(row_overflow, col_overflow)
+
+        else:
+            rate = no_rows / max(time.time() - start_time, 1e-6)
+
+            plural = "" if no_pasted_cells == 1 else _("s")
+            statustext = _("{ncells} cell{plural} in {nrows} rows imported "
+                           "at cell {topleft}, {rate:.0f} rows/s").format(
+                ncells=no_pasted_cells, plural=plural, nrows=no_rows,
+                topleft=tl_key, rate=rate)
+
+            post_command_event(self.main_window, self.StatusBarMsg,
+                               text=statustext)
+
+        self.pasting = False
+
     def selection_paste_data_gen(self, selection, data, freq=None):
         """Generator that yields data for selection paste"""
 
@@ -976,6 +1651,8 @@ class TableActions(TableRowActionsMixin, TableColumnActionsMixin,
         If no selection is present, data is pasted starting with current cell
         If a selection is present, data is pasted fully if the selection is
         smaller. If the selection is larger then data is duplicated.
+        Data that provides iter_batches, e. g. a CsvInterface, is pasted in
+        bulk if no selection is present.
 
         Parameters
         ----------
@@ -999,6 +1676,10 @@ class TableActions(TableRowActionsMixin, TableColumnActionsMixin,
         if selection:
             # There is a selection.  Paste into it
             self.paste_to_selection(selection, data, freq=freq)
+        elif hasattr(data, "iter_batches"):
+            # There is no selection.  Paste row batches from top left cell.
+            self.paste_batches(tl_key, data.iter_batches(),
+                               getattr(data, "get_progress", None))
         else:
             # There is no selection.  Paste from top left cell.
             self.paste_to_current_cell(tl_key, data, freq=freq)
@@ -1379,6 +2060,9 @@ class GridActions(Actions):
         no_tabs = self.grid.code_array.shape[2] - 1
 
         if 0 <= newtable <= no_tabs:
+            # Tables of lazily opened files are loaded on first access
+            self.load_table(newtable)
+
             self.grid.current_table = newtable
 
             self.grid.SetToolTip(None)
@@ -1735,6 +2419,9 @@ class FindActions(Actions):
 
         """
 
+        # Search all tables of lazily opened files
+        self.load_pending_tables()
+
         code_array = self.grid.code_array
         string_match = code_array.string_match
 
@@ -1763,6 +2450,9 @@ class FindActions(Actions):
 
         """
 
+        # Search all tables of lazily opened files
+        self.load_pending_tables()
+
         findfunc = self.grid.code_array.findnextmatch
 
         if "DOWN" in flags:
@@ -95,7 +95,7 @@ class ExchangeActions(Actions):
         # Get csv info
 
         try:
-            dialect, has_header, digest_types, encoding = \
+            dialect, has_header, digest_types, encoding, no_lines = \
                 self.main_window.interfaces.get_csv_import_info(path)
 
         except IOError:
@@ -107,7 +107,8 @@ class ExchangeActions(Actions):
             return  # Import is aborted or empty
 
         return CsvInterface(self.main_window,
-                            path, dialect, digest_types, has_header, encoding)
+                            path, dialect, digest_types, has_header, encoding,
+                            total_lines=no_lines)
 
     def _import_txt(self, path):
         """Whitespace-delimited txt import workflow. This should be fast."""
@@ -143,7 +144,7 @@ class ExchangeActions(Actions):
 
             self.main_window.interfaces.display_warning(msg, short_msg)
 
-    def _export_csv(self, filepath, data, preview_data):
+    def _export_csv(self, filepath, data, preview_data, total_lines=None):
         """CSV export of code_array results
 
         Parameters
@@ -153,6 +154,8 @@ class ExchangeActions(Actions):
         data: Object
         \tCode array result object slice, i. e. one object or iterable of
         \tsuch objects
+        total_lines: Integer, defaults to None
+        \tNumber of rows in data for progress messages
 
         """
 
@@ -172,7 +175,12 @@ class ExchangeActions(Actions):
         # Export CSV file
 
         csv_interface = CsvInterface(self.main_window, filepath, dialect,
-                                     digest_types, has_header)
+                                     digest_types, has_header,
+                                     total_lines=total_lines)
+
+        # The export can be aborted with <Esc>
+        grid_actions = self.grid.actions
+        grid_actions.exporting = True
 
         try:
             csv_interface.write(data)
@@ -184,6 +192,9 @@ class ExchangeActions(Actions):
             short_msg = _('Error writing CSV file')
             self.main_window.interfaces.display_warning(msg, short_msg)
 
+        finally:
+            grid_actions.exporting = False
+
     def _export_figure(self, filepath, data, format):
         """Export of single cell that contains a matplotlib figure
 
@@ -216,7 +227,8 @@ class ExchangeActions(Actions):
         finally:
             outfile.close()
 
-    def export_file(self, filepath, __filter, data, preview_data=None):
+    def export_file(self, filepath, __filter, data, preview_data=None,
+                    total_lines=None):
         """Export data for other applications
 
         Parameters
@@ -228,6 +240,8 @@ class ExchangeActions(Actions):
         data: Object
         \tCode array result object slice, i. e. one object or iterable of
         \tsuch objects
+        total_lines: Integer, defaults to None
+        \tNumber of rows in data for progress messages
 
         """
 
@@ -235,7 +249,8 @@ class ExchangeActions(Actions):
             self._export_figure(filepath, data, __filter[5:])
 
         elif __filter == "csv":
-            self._export_csv(filepath, data, preview_data=preview_data)
+            self._export_csv(filepath, data, preview_data=preview_data,
+                             total_lines=total_lines)
 
         elif __filter in ["pdf", "svg"]:
             self.export_cairo(filepath, __filter)
@@ -48,7 +48,9 @@ sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 3)
 sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
 
 from src.gui._main_window import MainWindow
+from src.interfaces.pys import Pys
 from src.lib.selection import Selection
+from src.model.model import CodeArray
 
 from src.lib.testlib import params, pytest_generate_tests, undo_test
 from src.lib.testlib import basic_setup_test, restore_basic_grid
@@ -311,6 +313,9 @@ class TestFileActions(object):
             attr = {}
         event = Event()
 
+        # Saving in the main thread
+        config["background_saving"] = repr(False)
+
         # Test normal save
         event.attr["filepath"] = self.filename_save
 
@@ -354,6 +359,39 @@ class TestFileActions(object):
 
         os.remove(self.filename_save)
 
+        config["background_saving"] = repr(True)
+
+    def test_save_background(self):
+        """Tests that saving in a worker thread saves a snapshot"""
+
+        class Event(object):
+            attr = {}
+        event = Event()
+        event.attr["filepath"] = self.filename_save
+
+        self.grid.code_array[(0, 0, 0)] = u"'Saved'"
+
+        self.grid.actions.save(event)
+
+        # Editing continues while saving
+        assert self.grid.actions.saving
+        self.grid.code_array[(0, 0, 0)] = u"'Not saved'"
+
+        self.grid.actions.save_thread.join()
+
+        code_array = CodeArray((1, 1, 1))
+        with open(self.filename_save, "rb") as infile:
+            Pys(code_array, infile).to_code_array()
+
+        assert code_array((0, 0, 0)) == u"'Saved'"
+
+        try:
+            os.remove(self.filename_save + ".sig")
+        except OSError:
+            pass
+
+        os.remove(self.filename_save)
+
     @pytest.mark.skipif(gnupg is None, reason="requires gnupg")
     def test_sign_file(self):
         """Tests signing functionality"""
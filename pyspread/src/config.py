@@ -45,6 +45,51 @@ class DefaultConfig(object):
         # -----------------------------
         self.timeout = repr(10)
 
+        # Maximum number of distinct cell codes with cached compiled code
+        self.code_cache_size = repr(10000)
+
+        # Maximum number of cells with cached cell attributes
+        self.attr_cache_size = repr(10000)
+
+        # Keep densely filled columns of loaded files in numpy arrays
+        self.columnar_storage = repr(False)
+
+        # Maximum approximate memory of the undo history in bytes
+        self.max_undo_bytes = repr(512 * 1024 ** 2)
+
+        # Number of processes that parse large pys files, 0 uses all CPUs
+        # and 1 parses them in the loading thread without a process pool
+        self.pys_parser_processes = repr(1)
+
+        # Save pys files as indexed version 2.0 containers, which older
+        # pyspread versions cannot open
+        self.pys_container = repr(False)
+
+        # Codec of pys container blocks: none, zlib, gzip, bz2 or lzma
+        # zlib at low levels saves much faster than bz2, files get larger
+        self.pys_codec = repr("bz2")
+
+        # Compression level of pys_codec, None uses the codec default
+        self.pys_codec_level = repr(None)
+
+        # Save pys files in a worker thread while editing continues
+        self.background_saving = repr(True)
+
+        # Save changes to pys containers incrementally as appended journal
+        self.pys_journal = repr(True)
+
+        # Rewrite pys containers when the journal exceeds this data share
+        self.pys_journal_max_ratio = repr(0.25)
+
+        # Number of threads that compress pys containers, 0 uses all CPUs
+        self.pys_compression_threads = repr(0)
+
+        # Load the current table first and other tables when needed
+        self.lazy_loading = repr(True)
+
+        # Delay in ms between loading tables in the background
+        self.lazy_loading_delay = repr(50)
+
         # User defined paths
         # ------------------
 
@@ -137,6 +182,9 @@ class DefaultConfig(object):
         # Number of bytes for the sniffer (should be larger than 1st+2nd line)
         self.sniff_size = "65536"
 
+        # Number of sniff_size chunks that are sampled across large files
+        self.csv_sample_chunks = "32"
+
         # Maximum number of characters in wx.TextCtrl
         self.max_textctrl_length = "65534"
 
@@ -61,7 +61,7 @@ from src.sysvars import get_dependencies
 from src.gui._widgets import PythonSTC
 from src.gui._events import post_command_event
 from src.gui._events import MainWindowEventMixin, GridEventMixin
-from src.lib.__csv import Digest, sniff, get_first_line, encode_gen
+from src.lib.__csv import Digest, sniff, profile, get_first_line, encode_gen
 from src.lib.__csv import csv_digest_gen, cell_key_val_gen
 from src.lib.exception_handling import get_user_codeframe
 
@@ -516,7 +516,8 @@ class CSVPreviewGrid(wx.grid.Grid):
 
         self.fill_cells(dialect, self.has_header, choices=False)
 
-    def fill_cells(self, dialect, has_header, choices=True):
+    def fill_cells(self, dialect, has_header, choices=True,
+                   digest_types=None):
         """Fills the grid for preview of csv data
 
         Parameters
@@ -525,6 +526,8 @@ class CSVPreviewGrid(wx.grid.Grid):
         \tDialect used for csv reader
         choices: Bool
         \tCreate and show choices
+        digest_types: List of types, defaults to None
+        \tInitial type choices, e. g. from profile, current choices if None
 
         """
 
@@ -543,6 +546,12 @@ class CSVPreviewGrid(wx.grid.Grid):
         # Retrieve type choices
         digest_keys = self.get_digest_keys()
 
+        if digest_types is not None:
+            type2key = dict((digest_type, key) for key, digest_type
+                            in self.digest_types.iteritems())
+            for col, digest_type in enumerate(digest_types[:no_cols]):
+                digest_keys[col] = type2key.get(digest_type, digest_keys[col])
+
         # Is a header present? --> Import as strings in first line
         if has_header:
             for i, header in enumerate(first_line):
@@ -648,7 +657,8 @@ class CsvImportDialog(wx.Dialog):
 
         self.csvwidgets = CsvParameterWidgets(self, self.csvfilepath)
 
-        dialect, self.has_header = sniff(self.csvfilepath)
+        dialect, self.has_header, digest_types, self.no_lines = \
+            profile(self.csvfilepath)
 
         self.grid = CSVPreviewGrid(self, -1,
                                    has_header=self.has_header,
@@ -660,7 +670,8 @@ class CsvImportDialog(wx.Dialog):
         self._set_properties()
         self._do_layout()
 
-        self.grid.fill_cells(dialect, self.has_header)
+        self.grid.fill_cells(dialect, self.has_header,
+                             digest_types=digest_types)
 
     def _set_properties(self):
         """Sets dialog title and size limitations of the widgets"""
@@ -1215,7 +1226,7 @@ class PreferencesDialog(wx.Dialog):
     """Dialog for changing pyspread's configuration preferences"""
 
     open_filetypes = ["pys", "pysu", "xls", "xlsx", "all"]
-    save_filetypes = ["pys", "pysu", "xls", "all"]
+    save_filetypes = ["pys", "pysu", "xls", "ods", "all"]
 
     parameters = [
         ("grid_rows", {
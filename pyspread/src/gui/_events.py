@@ -29,6 +29,7 @@ Provides
 --------
 
 * post_command_event: Posts a command event
+* DeadObjectError: Raised when a destroyed window is accessed
 
 """
 
@@ -36,6 +37,9 @@ import wx
 import wx.lib
 import wx.lib.newevent
 
+# wxPython classic raises PyDeadObjectError, Phoenix raises RuntimeError
+DeadObjectError = getattr(wx, "PyDeadObjectError", RuntimeError)
+
 
 def post_command_event(target, msg_cls, **kwargs):
     """Posts command event to main window
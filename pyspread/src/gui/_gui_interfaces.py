@@ -210,7 +210,8 @@ class ModalDialogInterfaceMixin(object):
     def get_csv_import_info(self, path):
         """Launches the csv dialog and returns csv_info
 
-        csv_info is a tuple of dialect, has_header, digest_types
+        csv_info is a tuple of dialect, has_header, digest_types, encoding
+        and the estimated number of lines
 
         Parameters
         ----------
@@ -241,6 +242,7 @@ class ModalDialogInterfaceMixin(object):
             dialect, has_header = filterdlg.csvwidgets.get_dialect()
             digest_types = filterdlg.grid.dtypes
             encoding = filterdlg.csvwidgets.encoding
+            no_lines = filterdlg.no_lines
 
         else:
             filterdlg.Destroy()
@@ -249,7 +251,7 @@ class ModalDialogInterfaceMixin(object):
 
         filterdlg.Destroy()
 
-        return dialect, has_header, digest_types, encoding
+        return dialect, has_header, digest_types, encoding, no_lines
 
     def get_csv_export_info(self, preview_data):
         """Shows csv export preview dialog and returns csv_info
@@ -173,6 +173,9 @@ class MainWindow(wx.Frame, EventMixin):
             except:
                 pass
 
+        # Limit memory of undo history
+        undo.stack().maxsize = config["max_undo_bytes"]
+
         # Update undo stack savepoint
         undo.stack().savepoint()
 
@@ -539,6 +542,12 @@ class MainWindowEventHandlers(EventMixin):
     def OnClose(self, event):
         """Program exit event handler"""
 
+        # Wait for a running background save to finish
+
+        wx.BeginBusyCursor()
+        self.main_window.grid.actions.wait_for_background_save()
+        wx.EndBusyCursor()
+
         # If changes have taken place save of old grid
 
         if undo.stack().haschanged():
@@ -549,8 +558,11 @@ class MainWindowEventHandlers(EventMixin):
                 return
 
             elif save_choice:
-                # User wants to save content
-                post_command_event(self.main_window, self.main_window.SaveMsg)
+                # User wants to save content. The file is written before
+                # the main window is destroyed.
+                save_event = self.main_window.SaveMsg(
+                    id=-1, attr={"background": False})
+                self.OnSave(save_event)
 
         # Save the AUI state
 
@@ -906,13 +918,20 @@ class MainWindowEventHandlers(EventMixin):
         except (KeyError, AttributeError):
             filetype = None
 
+        # Saves that are not done in the background are done on return
+        try:
+            background = event.attr["background"]
+
+        except (KeyError, AttributeError):
+            background = True
+
         filepath = self.main_window.filepath
         if filepath is None:
             filetype = config["default_save_filetype"]
 
         if filetype is None:
 
-            f2w = get_filetypes2wildcards(["pys", "pysu", "xls", "all"])
+            f2w = get_filetypes2wildcards(["pys", "pysu", "xls", "ods", "all"])
             __filetypes = f2w.keys()
 
             # Check if the file extension matches any valid save filetype
@@ -924,33 +943,43 @@ class MainWindowEventHandlers(EventMixin):
         # If there is no filepath or no filetype is found then jump to save as
 
         if self.main_window.filepath is None or filetype is None:
-            post_command_event(self.main_window,
-                               self.main_window.SaveAsMsg)
+            if background:
+                post_command_event(self.main_window,
+                                   self.main_window.SaveAsMsg)
+            else:
+                self.OnSaveAs(event)
             return
 
         # Save the grid
 
-        post_command_event(self.main_window,
-                           self.main_window.GridActionSaveMsg,
-                           attr={"filepath": self.main_window.filepath,
-                                 "filetype": filetype})
+        attr = {"filepath": self.main_window.filepath, "filetype": filetype,
+                "background": background}
 
-        # Update undo stack savepoint
-        undo.stack().savepoint()
+        if background:
+            post_command_event(self.main_window,
+                               self.main_window.GridActionSaveMsg, attr=attr)
+        else:
+            save_event = self.main_window.GridActionSaveMsg(id=-1, attr=attr)
+            self.main_window.GetEventHandler().ProcessEvent(save_event)
 
-        # Display file save in status bar
+        # Update undo stack savepoint and display file save in status bar,
+        # background saves do both when they have finished successfully
 
-        statustext = self.main_window.filepath.split("/")[-1] + " saved."
-        post_command_event(self.main_window,
-                           self.main_window.StatusBarMsg,
-                           text=statustext)
+        if filetype in ("xls", "ods") or not config["background_saving"] or \
+           not background:
+            undo.stack().savepoint()
+
+            statustext = self.main_window.filepath.split("/")[-1] + " saved."
+            post_command_event(self.main_window,
+                               self.main_window.StatusBarMsg,
+                               text=statustext)
 
     def OnSaveAs(self, event):
         """File save as event handler"""
 
         # Get filepath from user
 
-        f2w = get_filetypes2wildcards(["pys", "pysu", "xls", "all"])
+        f2w = get_filetypes2wildcards(["pys", "pysu", "xls", "ods", "all"])
         filetypes = f2w.keys()
         wildcards = f2w.values()
 
@@ -1013,8 +1042,19 @@ class MainWindowEventHandlers(EventMixin):
                            text=title_text)
 
         # Now jump to save
-        post_command_event(self.main_window, self.main_window.SaveMsg,
-                           attr={"filetype": filetype})
+        try:
+            background = event.attr["background"]
+
+        except (KeyError, AttributeError):
+            background = True
+
+        attr = {"filetype": filetype, "background": background}
+
+        if background:
+            post_command_event(self.main_window, self.main_window.SaveMsg,
+                               attr=attr)
+        else:
+            self.OnSave(self.main_window.SaveMsg(id=-1, attr=attr))
 
     def OnImport(self, event):
         """File import event handler"""
@@ -1091,7 +1131,9 @@ class MainWindowEventHandlers(EventMixin):
                 yield (code_array[row, col, tab]
                        for col in xrange(left, right))
 
-        data = data_gen(__top, __bottom, __left, __right)
+        # Export data is evaluated in row chunks, results are not kept
+        data = code_array.result_row_gen(__top, __bottom, __left, __right,
+                                         tab)
         preview_data = data_gen(__top, __bottom, __left, __right)
 
         # Get target filepath from user
@@ -1132,7 +1174,8 @@ class MainWindowEventHandlers(EventMixin):
         # -----------
 
         self.main_window.actions.export_file(path, filters[filterindex], data,
-                                             preview_data)
+                                             preview_data,
+                                             total_lines=__bottom - __top)
 
     def OnExportPDF(self, event):
         """Export PDF event handler"""
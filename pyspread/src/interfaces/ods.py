@@ -37,13 +37,40 @@ It is split into the following sections
 
 """
 
-from src.lib.ODSReader import ODSReader
+from collections import defaultdict
+import heapq
+from itertools import groupby
+from operator import itemgetter
+import re
+import sys
+from xml.parsers.expat import ExpatError
+import zipfile
+
+import wx
 
 import src.lib.i18n as i18n
+import src.lib.undo as undo
+from src.lib.ods_reader import OdsReader
+from src.lib.ods_writer import OdsWriter
+from src.lib.parsers import color_pack2rgb
+from src.lib.selection import get_row_intervals
+from src.sysvars import get_dpi
 
 # Use ugettext instead of getttext to avoid unicode errors
 _ = i18n.language.ugettext
 
+# Codes that are written as float values
+FLOAT_CODE_REGEX = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+
+# Cell attributes that are exported to cell styles
+STYLE_ATTRIBUTES = [
+    "textfont", "pointsize", "fontweight", "fontstyle", "textcolor",
+    "underline", "strikethrough", "justification", "vertical_align", "angle",
+    "bgcolor", "borderwidth_right", "borderwidth_bottom", "bordercolor_right",
+    "bordercolor_bottom",
+]
+
+
 class Ods(object):
     """Interface between code_array and ods file
 
@@ -64,50 +91,389 @@ class Ods(object):
         self.code_array = code_array
         self.ods_file = ods_file
 
-    def _get_tables(self, ods):
-        """Returns list of table nodes from ods object"""
+        # Maps cell style attributes to ods cell style name
+        self._style_cache = {}
 
-        childnodes = ods.spreadsheet.childNodes
-        qname_childnodes = [(s.qname[1], s) for s in childnodes]
-        return [node for name, node in qname_childnodes if name == u"table"]
+    def _ods2code(self):
+        """Updates code and shape in code_array
 
-    def _get_rows(self, table):
-        """Returns rows from table"""
+        Cells are streamed from the ods file into code_array in one bulk
+        insert. No undo records are created.
 
-        childnodes = table.childNodes
-        qname_childnodes = [(s.qname[1], s) for s in childnodes]
-        return [node for name, node in qname_childnodes
-                if name == u'table-row']
+        """
 
-    def _get_cells(self, row):
-        """Returns rows from row"""
+        reader = OdsReader(self.ods_file)
 
-        childnodes = row.childNodes
-        qname_childnodes = [(s.qname[1], s) for s in childnodes]
-        return [node for name, node in qname_childnodes
-                if name == u'table-cell']
+        # The shape is only known after all cells have been read
+        old_shape = self.code_array.shape
+        self.code_array.dict_grid.shape = (sys.maxint,) * 3
 
-    def _ods2code(self):
-        """Updates code in code_array"""
+        success = False
+
+        try:
+            with undo.suspended():
+                self.code_array.set_cells(reader)
+                self.code_array.shape = reader.shape
+
+            success = True
+
+        except (zipfile.BadZipfile, KeyError, ExpatError, ValueError), err:
+            raise ValueError(_("Error reading ods file: {err}").format(
+                err=err))
+
+        finally:
+            # The old shape is restored on any error
+            if not success:
+                with undo.suspended():
+                    self.code_array.shape = old_shape
+
+    def _get_style_properties(self, attributes):
+        """Returns ods cell style properties for pyspread cell attributes
+
+        Parameters
+        ----------
+        attributes: Dict
+        \tCell attributes that differ from the default cell attributes
+
+        """
+
+        def color2hex(color):
+            """Returns #rrggbb string of packed RGB color"""
+
+            return "#{:02x}{:02x}{:02x}".format(*color_pack2rgb(color))
+
+        def pixels2points(pixels):
+            """Returns length in pt from length in screen pixels"""
+
+            return pixels / float(get_dpi()[0]) * 72.0
+
+        text = "style:text-properties"
+        paragraph = "style:paragraph-properties"
+        cell = "style:table-cell-properties"
+
+        properties = []
+
+        if "textfont" in attributes:
+            properties.append((text, "fo:font-family", attributes["textfont"]))
+
+        if "pointsize" in attributes:
+            properties.append((text, "fo:font-size",
+                               "{}pt".format(attributes["pointsize"])))
+
+        if attributes.get("fontweight") == wx.BOLD:
+            properties.append((text, "fo:font-weight", "bold"))
+
+        if attributes.get("fontstyle") == wx.ITALIC:
+            properties.append((text, "fo:font-style", "italic"))
+
+        if "textcolor" in attributes:
+            properties.append((text, "fo:color",
+                               color2hex(attributes["textcolor"])))
+
+        if attributes.get("underline"):
+            properties.append((text, "style:text-underline-style", "solid"))
+            properties.append((text, "style:text-underline-width", "auto"))
+            properties.append((text, "style:text-underline-color",
+                               "font-color"))
+
+        if attributes.get("strikethrough"):
+            properties.append((text, "style:text-line-through-style",
+                               "solid"))
+
+        justification2align = {"left": "start", "center": "center",
+                               "right": "end"}
+        if attributes.get("justification") in justification2align:
+            properties.append((paragraph, "fo:text-align",
+                               justification2align[
+                                   attributes["justification"]]))
+
+        if attributes.get("vertical_align") in ("top", "middle", "bottom"):
+            properties.append((cell, "style:vertical-align",
+                               attributes["vertical_align"]))
+
+        if "angle" in attributes:
+            properties.append((cell, "style:rotation-angle",
+                               int(round(attributes["angle"])) % 360))
+
+        if "bgcolor" in attributes:
+            properties.append((cell, "fo:background-color",
+                               color2hex(attributes["bgcolor"])))
+
+        # pyspread draws the bottom and the right border of each cell
+        default_attributes = \
+            self.code_array.cell_attributes.default_cell_attributes
+
+        for side in ["bottom", "right"]:
+            width_key = "borderwidth_" + side
+            color_key = "bordercolor_" + side
+
+            if width_key in attributes or color_key in attributes:
+                width = attributes.get(width_key,
+                                       default_attributes[width_key])
+                color = attributes.get(color_key,
+                                       default_attributes[color_key])
+
+                if width:
+                    border = "{:.2f}pt solid {}".format(pixels2points(width),
+                                                        color2hex(color))
+                else:
+                    border = "none"
+
+                properties.append((cell, "fo:border-" + side, border))
+
+        return tuple(properties)
+
+    def _get_cell_style(self, writer, key):
+        """Returns name of ods cell style for cell key or None if default
+
+        Cells with equal style attributes share one style.
+
+        """
+
+        cell_attributes = self.code_array.cell_attributes
+        default_attributes = cell_attributes.default_cell_attributes
+
+        pys_style = cell_attributes[key]
+
+        style_key = tuple((attr, pys_style[attr]) for attr in STYLE_ATTRIBUTES
+                          if attr in pys_style and
+                          pys_style[attr] != default_attributes.get(attr))
+        try:
+            return self._style_cache[style_key]
+
+        except KeyError:
+            pass
+
+        properties = self._get_style_properties(dict(style_key))
+
+        if properties:
+            style_name = writer.get_cell_style(properties)
+        else:
+            style_name = None
+
+        self._style_cache[style_key] = style_name
+
+        return style_name
+
+    def _get_size_styles(self):
+        """Returns automatic styles and maps for col_widths and row_heights
+
+        Equal widths and heights share one style.
+
+        Returns
+        -------
+        automatic_styles: List of 3-tuples
+        \tName, family and properties of column and row styles
+        col_styles: Dict
+        \tMaps (col, tab) to column style name
+        row_styles: Dict
+        \tMaps (row, tab) to row style name
+
+        """
+
+        dpi_x, dpi_y = get_dpi()
+
+        automatic_styles = []
+
+        def get_styles(sizes, prefix, family, attribute, dpi):
+            """Returns dict of key to style name for sizes in pixels"""
+
+            size2name = {}
+            key2name = {}
 
-        ods = ODSReader(self.ods_file, clonespannedcolumns=True)
-        tables = ods.sheets
-        for tab_id, table in enumerate(tables):
-            for row_id in xrange(len(table)):
-                for col_id in xrange(len(table[row_id])):
-                    key = row_id, col_id, tab_id
-                    text = unicode(table[row_id][col_id])
-                    self.code_array[key] = text
+            for key, size in sorted(sizes.iteritems()):
+                try:
+                    name = size2name[size]
 
+                except KeyError:
+                    name = "{}{}".format(prefix, len(size2name) + 1)
+                    size2name[size] = name
+
+                    inches = "{:.4f}in".format(size / float(dpi))
+                    properties = (("style:" + family + "-properties",
+                                   attribute, inches),)
+                    automatic_styles.append((name, family, properties))
+
+                key2name[key] = name
+
+            return key2name
+
+        col_styles = get_styles(self.code_array.col_widths, "co",
+                                "table-column", "style:column-width", dpi_x)
+        row_styles = get_styles(self.code_array.row_heights, "ro",
+                                "table-row", "style:row-height", dpi_y)
+
+        return automatic_styles, col_styles, row_styles
+
+    def _get_table_blocks(self):
+        """Returns dict of table to blocks of cell attributes with styles
+
+        Attributes that reset a style attribute to its default are included
+        because they split runs of rows with equal formatting.
+
+        """
+
+        table_blocks = defaultdict(list)
+
+        for selection, tab, attrs in self.code_array.cell_attributes:
+            if any(attr in STYLE_ATTRIBUTES for attr in attrs):
+                table_blocks[tab].extend(
+                    selection.get_grid_blocks(self.code_array.shape))
+
+        return table_blocks
+
+    def _get_row_segments(self, blocks, no_rows):
+        """Generator of (top, bottom, col_intervals) that cover all rows
+
+        Rows that are not covered by blocks get empty col_intervals.
+
+        """
+
+        row = 0
+
+        for top, bottom, col_intervals in get_row_intervals(blocks):
+            if top > row:
+                yield row, top - 1, []
+
+            yield top, bottom, col_intervals
+            row = bottom + 1
+
+        if row < no_rows:
+            yield row, no_rows - 1, []
+
+    def _get_row_cells(self, writer, row, tab, code_cols, col_intervals):
+        """Returns list of (col, text, value, style_name) for row
+
+        Styles are only looked up for cells within col_intervals.
+
+        """
+
+        dict_grid = self.code_array.dict_grid
+
+        formatted_cols = set()
+        for left, right in col_intervals:
+            formatted_cols.update(xrange(left, right + 1))
+
+        cells = []
+
+        for col in sorted(formatted_cols.union(code_cols)):
+            key = row, col, tab
+
+            if col in formatted_cols:
+                style_name = self._get_cell_style(writer, key)
+            else:
+                style_name = None
+
+            code = dict_grid.get(key) if col in code_cols else None
+
+            if code is None:
+                cells.append((col, None, None, style_name))
+
+            elif FLOAT_CODE_REGEX.match(code):
+                cells.append((col, code, repr(float(code)), style_name))
+
+            else:
+                cells.append((col, code, None, style_name))
+
+        return cells
+
+    def _get_single_rows(self, tab, row_styles):
+        """Generator of (row, code_cols) for rows that are written singly
+
+        These are the rows of table tab with code or row height in ascending
+        order. code_cols is the set of columns of the cells with code.
+
+        """
+
+        no_rows = self.code_array.shape[0]
+
+        code_keys = self.code_array.dict_grid.itertablekeys(tab)
+        style_keys = sorted((row, None, tab) for row, row_tab in row_styles
+                            if row_tab == tab)
+        keys = heapq.merge(code_keys, style_keys)
+
+        for row, row_keys in groupby(keys, key=itemgetter(0)):
+            if 0 <= row < no_rows:
+                code_cols = set(col for __, col, __ in row_keys)
+                code_cols.discard(None)
+                yield row, code_cols
+
+    def _code2ods(self, writer, col_styles, row_styles):
+        """Writes code and cell formatting of all tables row by row
+
+        Rows without code that share their formatting are written once with
+        a repeat count. The cells with code are walked per table in
+        row-major order.
+
+        """
+
+        no_rows, no_cols, no_tabs = self.code_array.shape
+
+        table_blocks = self._get_table_blocks()
+
+        for tab in xrange(no_tabs):
+            single_rows = self._get_single_rows(tab, row_styles)
+            single_row = next(single_rows, None)
+
+            columns = []
+            for col in xrange(no_cols):
+                col_style = col_styles.get((col, tab))
+                if columns and columns[-1][0] == col_style:
+                    columns[-1][1] += 1
+                else:
+                    columns.append([col_style, 1])
+
+            writer.start_table(unicode(tab), columns)
+
+            for top, bottom, col_intervals in \
+                    self._get_row_segments(table_blocks[tab], no_rows):
+                row = top
+
+                while row <= bottom:
+                    if single_row is not None and single_row[0] <= bottom:
+                        next_row, code_cols = single_row
+                        single_row = next(single_rows, None)
+                    else:
+                        next_row = bottom + 1
+
+                    if next_row > row:
+                        cells = self._get_row_cells(writer, row, tab, (),
+                                                    col_intervals)
+                        writer.write_row(cells, no_cols,
+                                         repeat=next_row - row)
+
+                    if next_row <= bottom:
+                        cells = self._get_row_cells(
+                            writer, next_row, tab, code_cols, col_intervals)
+                        writer.write_row(cells, no_cols,
+                                         row_styles.get((next_row, tab)))
+
+                    row = next_row + 1
+
+            writer.end_table()
 
     # Access via model.py data
     # ------------------------
 
     def from_code_array(self):
-        """Replaces everything in pys_file from code_array"""
+        """Writes code, cell formatting, row heights and col widths to ods_file
+
+        The file is written table by table in row-major order. Export memory
+        does not depend on the grid shape. Cells in column storage are read
+        chunk row by chunk row.
+
+        """
+
+        automatic_styles, col_styles, row_styles = self._get_size_styles()
+
+        self._style_cache = {}
 
-        raise NotImplementedError
+        # Build the table cache once for all cell attribute lookups
+        self.code_array.cell_attributes._update_table_cache()
 
+        writer = OdsWriter(self.ods_file, automatic_styles)
+        self._code2ods(writer, col_styles, row_styles)
+        writer.close()
 
     def to_code_array(self):
         """Replaces everything in code_array from pys_file"""
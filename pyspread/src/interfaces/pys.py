@@ -35,24 +35,160 @@ It is split into the following sections
  * col_widths
  * macros
 
+Version 0.1 files are a compressed stream of these sections, which is
+bz2 unless another codec of src.lib.compression is detected.
+
+Version 2.0 files are indexed containers. After the header, which ends
+with the offset of the index, independently compressed blocks follow.
+Code, attributes, row_heights and col_widths blocks each hold lines of one
+table. The index at the end of the file is a Python literal that lists
+shape, compression and the blocks.
+
+Incremental saves append a journal of changed data blocks and a new index
+to version 2.0 files. Journal blocks are read after the other blocks.
+
 """
 
 import ast
 import base64
-from collections import OrderedDict
+from collections import deque, OrderedDict
 import src.lib.i18n as i18n
 from itertools import imap
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 import os
+import Queue
+from StringIO import StringIO
 import tempfile
+import threading
 
 from matplotlib import font_manager
 
+from src.lib.compression import get_codec
 from src.lib.selection import Selection
+import src.lib.undo as undo
 from src.config import config
 
 # Use ugettext instead of getttext to avoid unicode errors
 _ = i18n.language.ugettext
 
+# Start of indexed version 2.0 pys containers, followed by the index offset
+CONTAINER_HEADER = "[Pyspread save file version]\n2.0\n"
+CONTAINER_OFFSET_WIDTH = 20
+
+
+def is_container_file(filepath):
+    """Returns True if filepath is an indexed version 2.0 pys container
+
+    Files that cannot be read are no containers.
+
+    """
+
+    try:
+        with open(filepath, "rb") as infile:
+            return infile.read(len(CONTAINER_HEADER)) == CONTAINER_HEADER
+
+    except IOError:
+        return False
+
+
+def split_lines(data):
+    """Splits data into lines that keep their line feed like file iteration
+
+    In contrast to str.splitlines, only line feeds end lines.
+
+    """
+
+    lines = [line + "\n" for line in data.split("\n")]
+    lines[-1] = lines[-1][:-1]
+
+    if not lines[-1]:
+        lines.pop()
+
+    return lines
+
+
+def parse_code_line(line):
+    """Returns (key, code) from a line of the pys grid section"""
+
+    row, col, tab, code = line.rstrip("\n").split("\t", 3)
+
+    return (int(row), int(col), int(tab)), unicode(code, encoding='utf-8')
+
+
+def parse_attributes_line(line):
+    """Returns (selection, tab, attrs) from a line of the attributes section"""
+
+    splitline = line.rstrip("\n").split("\t")
+
+    selection_data = map(ast.literal_eval, splitline[:5])
+    selection = Selection(*selection_data)
+
+    tab = int(splitline[5])
+
+    attrs = {}
+    for col, ele in enumerate(splitline[6:]):
+        if not (col % 2):
+            # Odd entries are keys
+            key = ast.literal_eval(ele)
+
+        else:
+            # Even cols are values
+            attrs[key] = ast.literal_eval(ele)
+
+    return selection, tab, attrs
+
+
+def parse_code_lines(lines):
+    """Returns list of (key, code) from lines of the pys grid section"""
+
+    return map(parse_code_line, lines)
+
+
+def parse_attributes_lines(lines):
+    """Returns list of (selection, tab, attrs) from attributes lines"""
+
+    return map(parse_attributes_line, lines)
+
+
+def read_blocks(infile, block_queue, stop_event, block_size=2 ** 20):
+    """Reads infile in blocks and puts them into block_queue
+
+    This function is meant to be run in a separate thread so that
+    decompression does not block parsing. The end of the file is marked by
+    an empty block. Exceptions are put into block_queue.
+
+    Parameters
+    ----------
+    infile: File like object
+    \tFile that is read via read(block_size)
+    block_queue: Queue.Queue
+    \tQueue that receives the blocks
+    stop_event: threading.Event
+    \tReading is stopped when this event is set
+    block_size: Integer, defaults to 2 ** 20
+    \tNumber of bytes that are read at once
+
+    """
+
+    while not stop_event.is_set():
+        try:
+            block = infile.read(block_size)
+
+        except Exception, err:
+            block = err
+
+        while not stop_event.is_set():
+            try:
+                block_queue.put(block, timeout=0.1)
+                break
+
+            except Queue.Full:
+                pass
+
+        if not block or isinstance(block, Exception):
+            return
+
 
 class Pys(object):
     """Interface between code_array and pys file
@@ -70,10 +206,16 @@ class Pys(object):
 
     """
 
+    # Number of lines that a parser process handles at once
+    parallel_chunk_size = 10000
+
     def __init__(self, code_array, pys_file):
         self.code_array = code_array
         self.pys_file = pys_file
 
+        # Parsed section data in bulk load mode, see to_code_array
+        self._bulk_data = None
+
         if config["font_save_enabled"]:
             # Clean up fonts used info
             self.fonts_used = []
@@ -99,6 +241,14 @@ class Pys(object):
             ("[macros]\n", self._macros2pys),
         ])
 
+        # Sections that are split into blocks per table in containers
+        self._table_section2lines = OrderedDict([
+            ("[grid]\n", self._code2lines),
+            ("[attributes]\n", self._attributes2lines),
+            ("[row_heights]\n", self._row_heights2lines),
+            ("[col_widths]\n", self._col_widths2lines),
+        ])
+
         # Update sections for font handling if it is activated
         if config["font_save_enabled"]:
             self._section2reader["[fonts]\n"] = self._pys2fonts
@@ -150,47 +300,73 @@ class Pys(object):
 
         self.code_array.shape = self._get_key(*self._split_tidy(line))
 
-    def _code2pys(self):
-        """Writes code to pys file
+    def _code2lines(self, keys=None):
+        """Generator of (tab, line) for the code section
 
         Format: <row>\t<col>\t<tab>\t<code>\n
 
+        Parameters
+        ----------
+        keys: Iterable of 3-tuple of Integer, defaults to None
+        \tKeys of the cells that are written, all cells if None
+
         """
 
-        for key in self.code_array:
+        if keys is None:
+            keys = self.code_array
+
+        for key in keys:
             key_str = u"\t".join(repr(ele) for ele in key)
             code_str = self.code_array(key)
             if code_str is not None:
                 out_str = key_str + u"\t" + code_str + u"\n"
 
-                self.pys_file.write(out_str.encode("utf-8"))
+                yield key[2], out_str.encode("utf-8")
+
+    def _code2pys(self):
+        """Writes code to pys file"""
+
+        for __, line in self._code2lines():
+            self.pys_file.write(line)
 
     def _pys2code(self, line):
         """Updates code in pys code_array"""
 
-        row, col, tab, code = self._split_tidy(line, maxsplit=3)
-        key = self._get_key(row, col, tab)
+        key, code = parse_code_line(line)
 
-        self.code_array.dict_grid[key] = unicode(code, encoding='utf-8')
+        if self._bulk_data is None:
+            self.code_array.dict_grid[key] = code
+        else:
+            self._bulk_data["code"][key] = code
 
-    def _attributes2pys(self):
-        """Writes attributes to pys file
+    def _attributes2lines(self, cell_attributes=None):
+        """Generator of (tab, line) for the attributes section
 
         Format:
         <selection[0]>\t[...]\t<tab>\t<key>\t<value>\t[...]\n
 
+        Parameters
+        ----------
+        cell_attributes: List of cell attributes, defaults to None
+        \tCell attributes that are written, all if None
+
         """
 
+        if cell_attributes is None:
+            cell_attributes = self.code_array.cell_attributes
+
         # Remove doublettes
         purged_cell_attributes = []
         purged_cell_attributes_keys = []
-        for selection, tab, attr_dict in self.code_array.cell_attributes:
+        for selection, tab, attr_dict in cell_attributes:
             if purged_cell_attributes_keys and \
                (selection, tab) == purged_cell_attributes_keys[-1]:
                 purged_cell_attributes[-1][2].update(attr_dict)
             else:
                 purged_cell_attributes_keys.append((selection, tab))
-                purged_cell_attributes.append([selection, tab, attr_dict])
+                # Copy because later attributes are merged into it
+                purged_cell_attributes.append([selection, tab,
+                                               dict(attr_dict)])
 
         for selection, tab, attr_dict in purged_cell_attributes:
             sel_list = [selection.block_tl, selection.block_br,
@@ -208,43 +384,51 @@ class Pys(object):
 
             line_list = map(repr, sel_list + tab_list + attr_dict_list)
 
-            self.pys_file.write(u"\t".join(line_list) + u"\n")
-
-    def _pys2attributes(self, line):
-        """Updates attributes in code_array"""
-
-        splitline = self._split_tidy(line)
+            yield tab, u"\t".join(line_list) + u"\n"
 
-        selection_data = map(ast.literal_eval, splitline[:5])
-        selection = Selection(*selection_data)
+    def _attributes2pys(self):
+        """Writes attributes to pys file"""
 
-        tab = int(splitline[5])
+        for __, line in self._attributes2lines():
+            self.pys_file.write(line)
 
-        attrs = {}
-        for col, ele in enumerate(splitline[6:]):
-            if not (col % 2):
-                # Odd entries are keys
-                key = ast.literal_eval(ele)
+    def _pys2attributes(self, line):
+        """Updates attributes in code_array"""
 
-            else:
-                # Even cols are values
-                attrs[key] = ast.literal_eval(ele)
+        selection, tab, attrs = parse_attributes_line(line)
 
-        self.code_array.cell_attributes.append((selection, tab, attrs))
+        if self._bulk_data is None:
+            self.code_array.cell_attributes.append((selection, tab, attrs))
+        else:
+            self._bulk_data["attributes"].append((selection, tab, attrs))
 
-    def _row_heights2pys(self):
-        """Writes row_heights to pys file
+    def _row_heights2lines(self, keys=None):
+        """Generator of (tab, line) for the row_heights section
 
         Format: <row>\t<tab>\t<value>\n
 
+        Parameters
+        ----------
+        keys: Iterable of 2-tuple of Integer, defaults to None
+        \tKeys of the row heights that are written, all if None
+
         """
 
-        for row, tab in self.code_array.dict_grid.row_heights:
+        if keys is None:
+            keys = self.code_array.dict_grid.row_heights
+
+        for row, tab in keys:
             if row < self.code_array.shape[0] and \
                tab < self.code_array.shape[2]:
                 height = self.code_array.dict_grid.row_heights[(row, tab)]
                 height_strings = map(repr, [row, tab, height])
-                self.pys_file.write(u"\t".join(height_strings) + u"\n")
+                yield tab, u"\t".join(height_strings) + u"\n"
+
+    def _row_heights2pys(self):
+        """Writes row_heights to pys file"""
+
+        for __, line in self._row_heights2lines():
+            self.pys_file.write(line)
 
     def _pys2row_heights(self, line):
         """Updates row_heights in code_array"""
@@ -258,24 +442,41 @@ class Pys(object):
 
         try:
             if row < shape[0] and tab < shape[2]:
-                self.code_array.row_heights[key] = height
+                if self._bulk_data is None:
+                    self.code_array.row_heights[key] = height
+                else:
+                    self._bulk_data["row_heights"][key] = height
 
         except ValueError:
             pass
 
-    def _col_widths2pys(self):
-        """Writes col_widths to pys file
+    def _col_widths2lines(self, keys=None):
+        """Generator of (tab, line) for the col_widths section
 
         Format: <col>\t<tab>\t<value>\n
 
+        Parameters
+        ----------
+        keys: Iterable of 2-tuple of Integer, defaults to None
+        \tKeys of the column widths that are written, all if None
+
         """
 
-        for col, tab in self.code_array.dict_grid.col_widths:
+        if keys is None:
+            keys = self.code_array.dict_grid.col_widths
+
+        for col, tab in keys:
             if col < self.code_array.shape[1] and \
                tab < self.code_array.shape[2]:
                 width = self.code_array.dict_grid.col_widths[(col, tab)]
                 width_strings = map(repr, [col, tab, width])
-                self.pys_file.write(u"\t".join(width_strings) + u"\n")
+                yield tab, u"\t".join(width_strings) + u"\n"
+
+    def _col_widths2pys(self):
+        """Writes col_widths to pys file"""
+
+        for __, line in self._col_widths2lines():
+            self.pys_file.write(line)
 
     def _pys2col_widths(self, line):
         """Updates col_widths in code_array"""
@@ -289,11 +490,63 @@ class Pys(object):
 
         try:
             if col < shape[1] and tab < shape[2]:
-                self.code_array.col_widths[key] = width
+                if self._bulk_data is None:
+                    self.code_array.col_widths[key] = width
+                else:
+                    self._bulk_data["col_widths"][key] = width
 
         except ValueError:
             pass
 
+    def _deleted2lines(self, journal):
+        """Generator of (tab, line) for the deleted journal section
+
+        Format: <store>\t<key element>\t[...]\n
+
+        store is grid, row_heights or col_widths. The lines list the
+        journal keys that are not present any more.
+
+        Parameters
+        ----------
+        journal: Dict
+        \tJournal of changes, see DataArray.get_journal
+
+        """
+
+        dict_grid = self.code_array.dict_grid
+
+        stores = [
+            ("grid", dict_grid),
+            ("row_heights", dict_grid.row_heights),
+            ("col_widths", dict_grid.col_widths),
+        ]
+
+        for store_name, store in stores:
+            for key in sorted(journal[store_name]):
+                if key not in store:
+                    key_strings = map(repr, key)
+                    yield key[-1], u"\t".join([store_name] + key_strings) + \
+                        u"\n"
+
+    def _pys2deleted(self, line):
+        """Removes cell code, row height or column width in code_array"""
+
+        split_line = self._split_tidy(line)
+        store_name = split_line[0]
+        key = self._get_key(*split_line[1:])
+
+        if store_name == "grid":
+            store = self.code_array.dict_grid
+            bulk_name = "code"
+        else:
+            store = getattr(self.code_array, store_name)
+            bulk_name = store_name
+
+        if self._bulk_data is not None:
+            self._bulk_data[bulk_name].pop(key, None)
+
+        store.pop(key, None)
+
     def _macros2pys(self):
         """Writes macros to pys file
 
@@ -371,8 +624,21 @@ class Pys(object):
     # Access via model.py data
     # ------------------------
 
-    def from_code_array(self):
-        """Replaces everything in pys_file from code_array"""
+    def from_code_array(self, container=False):
+        """Replaces everything in pys_file from code_array
+
+        Parameters
+        ----------
+        container: Bool, defaults to False
+        \tIf True then an indexed version 2.0 container is written, which
+        \trequires an uncompressed pys_file. Otherwise a version 0.1 file
+        \tis written.
+
+        """
+
+        if container:
+            self._write_container()
+            return
 
         for key in self._section2writer:
             self.pys_file.write(key)
@@ -389,8 +655,99 @@ class Pys(object):
             # Clean up fonts used info
             self.fonts_used = []
 
-    def to_code_array(self):
-        """Replaces everything in code_array from pys_file"""
+    def _install_bulk_data(self):
+        """Installs parsed bulk data in code_array in one step
+
+        The data is installed without undo records. Cell attribute caches
+        are rebuilt once.
+
+        """
+
+        code_array = self.code_array
+
+        code_array.dict_grid.update(self._bulk_data["code"])
+
+        if self._bulk_data["attributes"]:
+            code_array._replace_cell_attributes(
+                list(code_array.cell_attributes) +
+                self._bulk_data["attributes"])
+
+        dict.update(code_array.row_heights, self._bulk_data["row_heights"])
+        dict.update(code_array.col_widths, self._bulk_data["col_widths"])
+
+    def to_code_array(self, bulk=True, tables=None):
+        """Replaces everything in code_array from pys_file
+
+        Parameters
+        ----------
+        bulk: Bool, defaults to True
+        \tIf True then the code, attribute, row height and column width
+        \tsections are parsed into plain lists and dicts first, which are
+        \tinstalled in one step at the end. No undo records are created.
+        tables: Iterable of Integer, defaults to None
+        \tTables that are loaded from version 2.0 containers, all if None.
+        \tOnly the blocks of these tables are read and decompressed.
+
+        """
+
+        container = self.is_container()
+
+        if not bulk:
+            if container:
+                self._read_container(tables)
+            else:
+                self._read_sections()
+            return
+
+        processes = config["pys_parser_processes"] or \
+            multiprocessing.cpu_count()
+
+        if container:
+            self._load_bulk(self._read_container, tables)
+        elif processes > 1:
+            self._load_bulk(self._read_sections_parallel, processes)
+        else:
+            self._load_bulk(self._read_sections)
+
+    def load_tables(self, tables):
+        """Loads tables that to_code_array has skipped in bulk mode
+
+        Only the table blocks of the version 2.0 container pys_file are
+        read. Shape, macros and fonts are not touched.
+
+        Parameters
+        ----------
+        tables: Iterable of Integer
+        \tTables that are loaded
+
+        """
+
+        self._load_bulk(self._read_container, tables, False)
+
+    def _load_bulk(self, read, *args):
+        """Calls read(*args) in bulk mode and installs the parsed data
+
+        Loaded data is neither recorded for undo nor in the journal.
+
+        """
+
+        self._bulk_data = {
+            "code": {},
+            "attributes": [],
+            "row_heights": {},
+            "col_widths": {},
+        }
+
+        try:
+            with undo.suspended(), self.code_array.journal_suspended():
+                read(*args)
+                self._install_bulk_data()
+
+        finally:
+            self._bulk_data = None
+
+    def _read_sections(self):
+        """Reads pys_file and dispatches lines to the section readers"""
 
         state = None
 
@@ -414,3 +771,552 @@ class Pys(object):
 
             elif state is not None:
                 self._section2reader[state](line)
+
+    def _read_sections_parallel(self, processes):
+        """Reads pys_file in bulk mode with parallel parsing
+
+        A thread decompresses pys_file. Lines of the grid and attributes
+        sections are parsed in chunks by a process pool. The pool is only
+        used if a section has more than parallel_chunk_size lines. It is
+        created before the reader thread starts because forking a process
+        with running threads is unsafe. Parsed chunks are merged in file
+        order so that the result equals _read_sections.
+
+        Parameters
+        ----------
+        processes: Integer
+        \tNumber of parser processes
+
+        """
+
+        chunk_parsers = {
+            "[grid]\n": (parse_code_lines, self._bulk_data["code"].update),
+            "[attributes]\n": (parse_attributes_lines,
+                               self._bulk_data["attributes"].extend),
+        }
+
+        # Parsed chunks as (async result, merge function) in file order
+        pending = deque()
+
+        def merge_pending(max_pending=0):
+            """Merges parsed chunks until max_pending chunks are left"""
+
+            while len(pending) > max_pending:
+                result, merge = pending.popleft()
+                merge(result.get())
+
+        def submit_chunk(chunk):
+            """Parses chunk in the pool or directly if there is no pool"""
+
+            parse, merge = chunk_parsers[state]
+
+            if pool is None:
+                merge(parse(chunk))
+            else:
+                pending.append((pool.apply_async(parse, (chunk,)), merge))
+                # Limit memory of unmerged chunks
+                merge_pending(2 * processes)
+
+        def lines():
+            """Generator of lines from pys_file, which is read in a thread"""
+
+            block_queue = Queue.Queue(maxsize=16)
+            stop_event = threading.Event()
+            reader = threading.Thread(target=read_blocks,
+                                      args=(self.pys_file, block_queue,
+                                            stop_event))
+            reader.daemon = True
+            reader.start()
+
+            rest = ""
+
+            try:
+                while True:
+                    block = block_queue.get()
+
+                    if isinstance(block, Exception):
+                        raise block
+
+                    if not block:
+                        break
+
+                    block_lines = (rest + block).split("\n")
+                    rest = block_lines.pop()
+
+                    for line in block_lines:
+                        yield line + "\n"
+
+                if rest:
+                    yield rest
+
+            finally:
+                stop_event.set()
+
+        # Progress display and abort handling of AOpen files
+        progress_status = getattr(self.pys_file, "progress_status", None)
+
+        # Fork the parser processes before lines starts the reader thread
+        process_pool = multiprocessing.Pool(processes)
+
+        pool = None
+        chunk = []
+        state = None
+
+        # Check if version section starts with first line
+        first_line = True
+
+        # Reset pys_file to start to enable multiple calls of this method
+        self.pys_file.seek(0)
+
+        try:
+            for line in lines():
+                if progress_status is not None:
+                    progress_status()
+                    if self.pys_file.aborted:
+                        break
+
+                if first_line:
+                    # If Version section does not start with first line then
+                    # the file is invalid.
+                    if line == "[Pyspread save file version]\n":
+                        first_line = False
+                    else:
+                        raise ValueError(_("File format unsupported."))
+
+                if state in chunk_parsers and \
+                   (line in self._section2reader or
+                    len(chunk) >= self.parallel_chunk_size):
+                    # Large sections are parsed in the pool
+                    if line not in self._section2reader and pool is None:
+                        pool = process_pool
+
+                    submit_chunk(chunk)
+                    chunk = []
+
+                if line in self._section2reader:
+                    state = line
+
+                elif state in chunk_parsers:
+                    chunk.append(line)
+
+                elif state is not None:
+                    self._section2reader[state](line)
+
+            if chunk:
+                submit_chunk(chunk)
+
+            merge_pending()
+
+        finally:
+            process_pool.terminate()
+            process_pool.join()
+
+    # Indexed version 2.0 containers
+    # ------------------------------
+
+    # Maximum number of lines in a compressed container block
+    container_block_lines = 10000
+
+    def is_container(self):
+        """Returns True if pys_file is an indexed version 2.0 container"""
+
+        self.pys_file.seek(0)
+
+        try:
+            return self.pys_file.read(len(CONTAINER_HEADER)) == \
+                CONTAINER_HEADER
+
+        finally:
+            self.pys_file.seek(0)
+
+    def read_index(self):
+        """Returns index of version 2.0 container pys_file
+
+        The index is a dict with the keys:
+         * shape: 3-tuple of Integer, grid shape
+         * codec: String, compression of the blocks
+         * blocks: List of (section, tab, offset, length, no. lines)
+           tab is None for sections that are not split per table
+         * journal_offset: Integer, offset of the first block that has been
+           appended by append_journal, only present after append_journal
+
+        """
+
+        self.pys_file.seek(self._read_index_offset())
+
+        return ast.literal_eval(self.pys_file.read())
+
+    def _read_index_offset(self):
+        """Returns index offset from the header of the container pys_file"""
+
+        self.pys_file.seek(len(CONTAINER_HEADER))
+
+        return int(self.pys_file.read(CONTAINER_OFFSET_WIDTH + 1))
+
+    def _read_container(self, tables=None, shared=True):
+        """Reads version 2.0 container pys_file via its index
+
+        Parameters
+        ----------
+        tables: Iterable of Integer, defaults to None
+        \tTables for which blocks are read, all if None
+        shared: Bool, defaults to True
+        \tIf False then shape and blocks without table are skipped
+
+        """
+
+        index = self.read_index()
+        codec = get_codec(index["codec"])
+
+        if shared:
+            self.code_array.shape = index["shape"]
+
+        if tables is not None:
+            tables = set(tables)
+
+        for section, tab, offset, length, __ in index["blocks"]:
+            if tab is None and not shared or \
+               tab is not None and tables is not None and tab not in tables:
+                continue
+
+            self.pys_file.seek(offset)
+            data = codec.decompress(self.pys_file.read(length))
+
+            if section == "[deleted]\n":
+                # Journal section, see append_journal
+                reader = self._pys2deleted
+            else:
+                reader = self._section2reader[section]
+
+            for line in split_lines(data):
+                reader(line)
+
+    def _section_blocks(self, section, tab_lines):
+        """Generator of (section, tab, lines) for the blocks of a section
+
+        Lines are split into blocks per table and into blocks of at most
+        container_block_lines lines. Lines are encoded to byte strings.
+
+        Parameters
+        ----------
+        section: String
+        \tSection of the lines
+        tab_lines: Iterable of (tab, line)
+        \tLines with their table, tab is None for lines without table
+
+        """
+
+        def encode(lines):
+            """Returns list of UTF-8 encoded lines"""
+
+            return [line.encode("utf-8") if isinstance(line, unicode)
+                    else line for line in lines]
+
+        tab2lines = {}
+
+        for tab, line in tab_lines:
+            try:
+                tab2lines[tab].append(line)
+            except KeyError:
+                tab2lines[tab] = [line]
+
+            if len(tab2lines[tab]) >= self.container_block_lines:
+                yield section, tab, encode(tab2lines.pop(tab))
+
+        for tab in sorted(tab2lines):
+            yield section, tab, encode(tab2lines[tab])
+
+    def _section_lines(self, section):
+        """Returns list of the lines that the writer of section writes"""
+
+        pys_file = self.pys_file
+
+        self.pys_file = StringIO()
+        try:
+            self._section2writer[section]()
+            return split_lines(self.pys_file.getvalue())
+
+        finally:
+            self.pys_file = pys_file
+
+    def _container_blocks(self):
+        """Generator of (section, tab, lines) for the container blocks
+
+        Sections that hold table data are split into blocks per table and
+        into blocks of at most container_block_lines lines. tab is None for
+        the other sections. Lines are byte strings.
+
+        """
+
+        for section, get_lines in self._table_section2lines.iteritems():
+            for block in self._section_blocks(section, get_lines()):
+                yield block
+
+        # Sections without tables are captured from their writers
+        for section in self._section2writer:
+            if section in self._table_section2lines or \
+               section in ("[Pyspread save file version]\n", "[shape]\n"):
+                continue
+
+            lines = self._section_lines(section)
+
+            for block in self._section_blocks(section,
+                                              ((None, line) for line in lines)):
+                yield block
+
+    def _journal_blocks(self, journal):
+        """Generator of (section, tab, lines) for the blocks of a journal
+
+        Parameters
+        ----------
+        journal: Dict
+        \tJournal of changes, see DataArray.get_journal
+
+        """
+
+        dict_grid = self.code_array.dict_grid
+
+        def present(store_name, store):
+            """Returns sorted journal keys that are present in store"""
+
+            return sorted(key for key in journal[store_name] if key in store)
+
+        section_lines = [
+            ("[grid]\n", self._code2lines(present("grid", dict_grid))),
+            ("[attributes]\n",
+             self._attributes2lines(journal["attributes"])),
+            ("[row_heights]\n", self._row_heights2lines(
+                present("row_heights", dict_grid.row_heights))),
+            ("[col_widths]\n", self._col_widths2lines(
+                present("col_widths", dict_grid.col_widths))),
+            ("[deleted]\n", self._deleted2lines(journal)),
+        ]
+
+        if journal["macros"]:
+            lines = self._section_lines("[macros]\n")
+            section_lines.append(("[macros]\n",
+                                  ((None, line) for line in lines)))
+
+        for section, tab_lines in section_lines:
+            for block in self._section_blocks(section, tab_lines):
+                yield block
+
+    def append_journal(self, journal):
+        """Appends changes to the version 2.0 container pys_file
+
+        Blocks of changed cells, appended cell attributes, changed row
+        heights and column widths and removed keys are appended behind the
+        index. They are read after the blocks of previous saves. Changed
+        macros replace the macros blocks. Then the header is pointed to a
+        new index, which is written at the end of the file.
+
+        pys_file must be opened in r+b mode. The blocks are compressed with
+        the codec of the container.
+
+        Parameters
+        ----------
+        journal: Dict
+        \tJournal of changes since the last save, see DataArray.get_journal
+
+        """
+
+        index = self.read_index()
+        codec = get_codec(index["codec"])
+        level = codec.get_level(config["pys_codec_level"])
+
+        journal_offset = index.get("journal_offset",
+                                   self._read_index_offset())
+
+        self.pys_file.seek(0, os.SEEK_END)
+        end = self.pys_file.tell()
+
+        blocks = self._write_blocks(self._journal_blocks(journal), end,
+                                    codec, level)
+        if blocks is None:
+            # Aborted, the previous index is still valid
+            self.pys_file.truncate(end)
+            return
+
+        old_blocks = index["blocks"]
+        if journal["macros"]:
+            old_blocks = [block for block in old_blocks
+                          if block[0] != "[macros]\n"]
+
+        index = {
+            "shape": tuple(self.code_array.shape),
+            "codec": codec.name,
+            "blocks": old_blocks + blocks,
+            "journal_offset": journal_offset,
+        }
+
+        self._write_index(index)
+
+    def get_journal_ratio(self, journal=None):
+        """Returns the journal size relative to the size of the other data
+
+        The size of the appended journal is measured in bytes. If journal
+        is given then its changes are added relative to the number of lines
+        of the other data.
+
+        Parameters
+        ----------
+        journal: Dict, defaults to None
+        \tJournal of changes that would be appended, see append_journal
+
+        """
+
+        index = self.read_index()
+        journal_offset = index.get("journal_offset")
+
+        ratio = 0.0
+        base_blocks = index["blocks"]
+
+        if journal_offset is not None:
+            self.pys_file.seek(0, os.SEEK_END)
+            ratio += float(self.pys_file.tell() - journal_offset) / \
+                journal_offset
+
+            base_blocks = [block for block in base_blocks
+                           if block[2] < journal_offset]
+
+        if journal is not None:
+            no_changes = sum(len(journal[key]) for key in
+                             ["grid", "attributes", "row_heights",
+                              "col_widths"])
+            no_lines = sum(block[4] for block in base_blocks)
+            ratio += float(no_changes) / max(no_lines, 1)
+
+        return ratio
+
+    def _write_container(self):
+        """Writes code_array as version 2.0 container into pys_file
+
+        The container consists of the header, independently compressed
+        blocks and the index. The header ends with the index offset.
+
+        Blocks are compressed with the codec pys_codec at the level
+        pys_codec_level.
+
+        """
+
+        codec = get_codec(config["pys_codec"])
+        level = codec.get_level(config["pys_codec_level"])
+
+        # The index offset is filled in after the blocks have been written
+        header = CONTAINER_HEADER + "0" * CONTAINER_OFFSET_WIDTH + "\n"
+        self.pys_file.write(header)
+
+        blocks = self._write_blocks(self._container_blocks(), len(header),
+                                    codec, level)
+        if blocks is None:
+            return
+
+        index = {
+            "shape": tuple(self.code_array.shape),
+            "codec": codec.name,
+            "blocks": blocks,
+        }
+
+        self._write_index(index)
+
+        if config["font_save_enabled"]:
+            # Clean up fonts used info
+            self.fonts_used = []
+
+    def _write_index(self, index):
+        """Writes index at the end of pys_file and its offset into the header
+
+        The header is updated last so that the previous index stays valid
+        until the new index has been written completely.
+
+        """
+
+        self.pys_file.seek(0, os.SEEK_END)
+        index_offset = self.pys_file.tell()
+
+        self.pys_file.write(repr(index))
+        self.pys_file.flush()
+
+        self.pys_file.seek(len(CONTAINER_HEADER))
+        self.pys_file.write(str(index_offset).zfill(CONTAINER_OFFSET_WIDTH))
+        self.pys_file.seek(0, os.SEEK_END)
+
+    def _write_blocks(self, container_blocks, offset, codec, level):
+        """Compresses and writes blocks, returns their index entries
+
+        Blocks are compressed concurrently by a thread pool with
+        pys_compression_threads threads and written in order. None is
+        returned if writing has been aborted.
+
+        Parameters
+        ----------
+        container_blocks: Iterable of (section, tab, lines)
+        \tBlocks that are written
+        offset: Integer
+        \tOffset in pys_file at which the first block is written
+        codec: compression.Codec
+        \tCodec that compresses the blocks
+        level: Integer or None
+        \tCompression level
+
+        """
+
+        threads = config["pys_compression_threads"] or \
+            multiprocessing.cpu_count()
+
+        # The compression libraries release the GIL while compressing
+        pool = ThreadPool(threads) if threads > 1 else None
+
+        # Index entries of the written blocks
+        blocks = []
+
+        # Blocks that are compressed as (section, tab, no. lines, block)
+        pending = deque()
+
+        def get_end():
+            """Returns offset behind the last written block"""
+
+            if blocks:
+                return blocks[-1][2] + blocks[-1][3]
+
+            return offset
+
+        def write_pending_block():
+            """Writes the first pending block when it is compressed"""
+
+            section, tab, no_lines, block = pending.popleft()
+            if pool is not None:
+                block = block.get()
+
+            blocks.append((section, tab, get_end(), len(block), no_lines))
+            self.pys_file.write(block)
+
+        try:
+            for section, tab, lines in container_blocks:
+                data = "".join(lines)
+
+                if pool is None:
+                    block = codec.compress(data, level)
+                else:
+                    block = pool.apply_async(codec.compress, (data, level))
+
+                pending.append((section, tab, len(lines), block))
+
+                # Write finished blocks in order, limit compressed backlog
+                while pending and (pool is None or
+                                   len(pending) > 2 * threads or
+                                   pending[0][3].ready()):
+                    write_pending_block()
+
+                if getattr(self.pys_file, "aborted", False):
+                    return
+
+            while pending:
+                write_pending_block()
+
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        return blocks
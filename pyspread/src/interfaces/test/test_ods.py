@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+test_ods
+========
+
+Unit tests for ods.py
+
+"""
+
+from cStringIO import StringIO
+import os
+import sys
+import zipfile
+
+import pytest
+import wx
+app = wx.App()
+
+TESTPATH = os.sep.join(os.path.realpath(__file__).split(os.sep)[:-1]) + os.sep
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 3)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
+
+from src.interfaces.ods import Ods
+from src.lib.selection import Selection
+from src.lib.testlib import params, pytest_generate_tests
+from src.lib.undo import stack as undo_stack
+from src.model.model import CodeArray
+from src.sysvars import get_dpi
+
+
+def get_ods_data(cells):
+    """Returns ods file data with one table row of cells in content.xml"""
+
+    content = \
+        '<?xml version="1.0" encoding="UTF-8"?>' \
+        '<office:document-content ' \
+        'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" ' \
+        'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" ' \
+        'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">' \
+        '<office:body><office:spreadsheet><table:table><table:table-row>' \
+        '{}</table:table-row></table:table></office:spreadsheet>' \
+        '</office:body></office:document-content>'.format(cells)
+
+    ods_file = StringIO()
+    with zipfile.ZipFile(ods_file, "w") as ods_zip:
+        ods_zip.writestr("content.xml", content)
+
+    return ods_file.getvalue()
+
+
+class TestOds(object):
+    """Unit tests for Ods"""
+
+    def setup_method(self, method):
+        """Creates Ods class with code_array and test ods file"""
+
+        self.code_array = CodeArray((1000, 100, 3))
+        self.ods_infile = open(TESTPATH + "ods_test1.ods", "rb")
+        self.ods_in = Ods(self.code_array, self.ods_infile)
+
+    def teardown_method(self, method):
+        self.ods_infile.close()
+
+    def test_to_code_array(self):
+        """Test to_code_array method"""
+
+        undo_stack().clear()
+        self.ods_in.to_code_array()
+        assert not undo_stack().canundo()
+
+        assert self.code_array.shape == (6, 4, 2)
+        assert self.code_array.dict_grid == {
+            (0, 0, 0): u"'Test'",
+            (0, 1, 0): u"1",
+            (5, 1, 0): u"2 + 3",
+            (0, 3, 1): u"Hi",
+        }
+        assert self.code_array[5, 1, 0] == 5
+
+    param_to_code_array_invalid = [
+        {'data': ""},
+        {'data': "No zip file"},
+        {'data': open(TESTPATH + "ods_test1.ods", "rb").read()[:-100]},
+        {'data': get_ods_data(
+            '<table:table-cell table:number-columns-repeated="x">'
+            '<text:p>1</text:p></table:table-cell>')},
+    ]
+
+    @params(param_to_code_array_invalid)
+    def test_to_code_array_invalid(self, data):
+        """Invalid ods files raise ValueError"""
+
+        with pytest.raises(ValueError):
+            Ods(self.code_array, StringIO(data)).to_code_array()
+
+        assert self.code_array.shape == (1000, 100, 3)
+
+    def test_from_code_array(self):
+        """Test from_code_array method"""
+
+        code_array = CodeArray((1000000, 1000, 2))
+        code_array[0, 0, 0] = u"'Test'"
+        code_array[0, 1, 0] = u"1.5"
+        code_array[999999, 999, 0] = u"2 + 3"
+        code_array[3, 2, 1] = u"  Line 1\nLine 2"
+
+        code_array.cell_attributes.append(
+            (Selection([], [], [], [2], []), 0, {"fontweight": wx.BOLD}))
+        code_array.cell_attributes.append(
+            (Selection([], [], [], [], [(0, 0)]), 0, {"underline": True}))
+        code_array.row_heights[5, 0] = 72.0
+        code_array.col_widths[1, 0] = 144.0
+
+        ods_file = StringIO()
+        Ods(code_array, ods_file).from_code_array()
+
+        ods_file.seek(0)
+        with zipfile.ZipFile(ods_file) as ods_zip:
+            content = ods_zip.read("content.xml")
+
+        assert len(content) < 10000
+        assert 'office:value-type="float" office:value="1.5"' in content
+        assert 'table:number-rows-repeated="999993"' in content
+        dpi_x, dpi_y = get_dpi()
+        assert 'style:row-height="{:.4f}in"'.format(72.0 / dpi_y) in content
+        assert 'style:column-width="{:.4f}in"'.format(144.0 / dpi_x) \
+            in content
+        assert content.count('style:family="table-cell"') == 2
+        assert 'fo:font-weight="bold"' in content
+        assert 'style:text-underline-style="solid"' in content
+
+        ods_file.seek(0)
+        Ods(self.code_array, ods_file).to_code_array()
+
+        assert self.code_array.shape == (1000000, 1000, 2)
+        assert self.code_array.dict_grid == code_array.dict_grid
+
+    def test_from_code_array_style_runs(self):
+        """Rows that reset a style attribute split runs of formatted rows"""
+
+        code_array = CodeArray((10, 1, 1))
+        cell_attributes = code_array.cell_attributes
+        default_bgcolor = cell_attributes.default_cell_attributes["bgcolor"]
+
+        cell_attributes.append(
+            (Selection([(0, 0)], [(9, 0)], [], [], []), 0,
+             {"bgcolor": 0xff0000}))
+        cell_attributes.append(
+            (Selection([(2, 0)], [(3, 0)], [], [], []), 0,
+             {"bgcolor": default_bgcolor}))
+
+        ods_file = StringIO()
+        Ods(code_array, ods_file).from_code_array()
+
+        ods_file.seek(0)
+        with zipfile.ZipFile(ods_file) as ods_zip:
+            content = ods_zip.read("content.xml")
+
+        assert 'table:number-rows-repeated="10"' not in content
+        assert '<table:table-row table:number-rows-repeated="2">' \
+            '<table:table-cell/></table:table-row>' in content
+        assert content.count('table:style-name="ce1"') == 2
@@ -39,9 +39,12 @@ sys.path.insert(0, TESTPATH)
 sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 3)
 sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
 
-from src.interfaces.pys import Pys
+from src.config import config
+from src.interfaces.pys import Pys, is_container_file
+from src.lib.compression import codecs
 from src.lib.selection import Selection
 from src.lib.testlib import params, pytest_generate_tests
+from src.lib.undo import stack as undo_stack
 from src.model.model import CodeArray
 
 
@@ -304,3 +307,201 @@ class TestPys(object):
         self.pys_in.to_code_array()
 
         assert self.code_array((0, 0, 0)) == '"Hallo"'
+
+    def test_to_code_array_bulk(self):
+        """Bulk loading matches line by line loading and creates no undo"""
+
+        undo_stack().clear()
+        self.pys_in.to_code_array()
+        assert not undo_stack().canundo()
+
+        code_array = CodeArray((1000, 100, 3))
+        Pys(code_array, self.pys_infile).to_code_array(bulk=False)
+
+        assert self.code_array.dict_grid == code_array.dict_grid
+        assert self.code_array.cell_attributes
+        assert list(self.code_array.cell_attributes) == \
+            list(code_array.cell_attributes)
+        assert self.code_array.row_heights == code_array.row_heights
+        assert self.code_array.col_widths == code_array.col_widths
+        assert self.code_array.macros == code_array.macros
+        assert self.code_array.cell_attributes[0, 0, 0] == \
+            code_array.cell_attributes[0, 0, 0]
+
+    def test_to_code_array_parallel(self):
+        """Parallel parsing of small chunks matches line by line loading"""
+
+        self.pys_in.parallel_chunk_size = 2
+        self.pys_in._bulk_data = {"code": {}, "attributes": [],
+                                  "row_heights": {}, "col_widths": {}}
+        self.pys_in._read_sections_parallel(2)
+        self.pys_in._install_bulk_data()
+
+        code_array = CodeArray((1000, 100, 3))
+        Pys(code_array, self.pys_infile).to_code_array(bulk=False)
+
+        assert self.code_array.dict_grid == code_array.dict_grid
+        assert list(self.code_array.cell_attributes) == \
+            list(code_array.cell_attributes)
+        assert self.code_array.row_heights == code_array.row_heights
+        assert self.code_array.macros == code_array.macros
+
+    def test_container(self):
+        """Version 2.0 containers store the same data as version 0.1 files"""
+
+        self.pys_in.to_code_array()
+        self.code_array[(5, 1, 2)] = u"'Table 2'\r"
+
+        outfile = open(self.pys_outfile_path, "wb")
+        pys_out = Pys(self.code_array, outfile)
+        pys_out.container_block_lines = 2
+        pys_out.from_code_array(container=True)
+        outfile.close()
+
+        assert is_container_file(self.pys_outfile_path)
+        assert not is_container_file(TESTPATH + "pys_test1.pys")
+
+        with open(self.pys_outfile_path, "rb") as infile:
+            index = Pys(self.code_array, infile).read_index()
+
+            assert index["shape"] == self.code_array.shape
+            grid_blocks = [block for block in index["blocks"]
+                           if block[0] == "[grid]\n"]
+            assert [block[1] for block in grid_blocks] == [0, 0, 2]
+
+            code_array = CodeArray((1, 1, 1))
+            Pys(code_array, infile).to_code_array()
+
+            assert code_array.shape == self.code_array.shape
+            assert code_array.dict_grid == self.code_array.dict_grid
+            assert list(code_array.cell_attributes) == \
+                list(self.code_array.cell_attributes)
+            assert code_array.row_heights == self.code_array.row_heights
+            assert code_array.col_widths == self.code_array.col_widths
+            assert code_array.macros == self.code_array.macros
+
+            code_array = CodeArray((1, 1, 1))
+            Pys(code_array, infile).to_code_array(tables=[2])
+
+            assert code_array.dict_grid == {(5, 1, 2): u"'Table 2'\r"}
+            assert code_array.macros == self.code_array.macros
+
+            # Skipped tables can be loaded later
+            Pys(code_array, infile).load_tables([0, 1])
+
+            assert code_array.dict_grid == self.code_array.dict_grid
+            assert code_array.row_heights == self.code_array.row_heights
+            assert code_array.macros == self.code_array.macros
+
+        os.remove(self.pys_outfile_path)
+
+    def test_container_compression_threads(self):
+        """Blocks that are compressed in threads are written in order"""
+
+        self.pys_in.to_code_array()
+
+        def get_container(threads):
+            """Returns container data that is compressed in threads"""
+
+            config["pys_compression_threads"] = repr(threads)
+
+            outfile = open(self.pys_outfile_path, "wb")
+            pys_out = Pys(self.code_array, outfile)
+            pys_out.container_block_lines = 1
+            pys_out.from_code_array(container=True)
+            outfile.close()
+
+            with open(self.pys_outfile_path, "rb") as infile:
+                return infile.read()
+
+        try:
+            assert get_container(3) == get_container(1)
+
+        finally:
+            config["pys_compression_threads"] = repr(0)
+            os.remove(self.pys_outfile_path)
+
+    def test_append_journal(self):
+        """Appended journals are read after the container blocks"""
+
+        self.pys_in.to_code_array()
+
+        outfile = open(self.pys_outfile_path, "wb")
+        Pys(self.code_array, outfile).from_code_array(container=True)
+        outfile.close()
+
+        def read_container(tables=None):
+            """Returns CodeArray that is read from the container"""
+
+            code_array = CodeArray((1, 1, 1))
+            with open(self.pys_outfile_path, "rb") as infile:
+                Pys(code_array, infile).to_code_array(tables=tables)
+            return code_array
+
+        try:
+            for i in xrange(2):
+                self.code_array.start_journal()
+
+                self.code_array[(i, 1, 2)] = u"'Journal {}'".format(i)
+                self.code_array.pop((i, 0, 0))
+                self.code_array.set_row_height(3, 1, 20.0 + i)
+                self.code_array.cell_attributes.append(
+                    (Selection([], [], [], [], [(i, 1)]), 2, {"angle": 0.2}))
+                self.code_array.macros += u"\n# {}".format(i)
+
+                journal = self.code_array.get_journal()
+
+                with open(self.pys_outfile_path, "r+b") as outfile:
+                    pys_out = Pys(self.code_array, outfile)
+                    pys_out.append_journal(journal)
+
+                    assert pys_out.get_journal_ratio() > 0
+
+                code_array = read_container()
+
+                assert code_array.dict_grid == self.code_array.dict_grid
+                assert list(code_array.cell_attributes) == \
+                    list(self.code_array.cell_attributes)
+                assert code_array.row_heights == self.code_array.row_heights
+                assert code_array.col_widths == self.code_array.col_widths
+                assert code_array.macros == self.code_array.macros
+
+            # Journal blocks are loaded with their table
+            code_array = read_container(tables=[1])
+            assert (0, 1, 2) not in code_array.dict_grid
+
+            Pys(code_array, open(self.pys_outfile_path, "rb")).load_tables(
+                [0, 2])
+            assert code_array.dict_grid == self.code_array.dict_grid
+
+        finally:
+            os.remove(self.pys_outfile_path)
+
+    def test_container_codecs(self):
+        """Containers are read with the codec that compressed their blocks"""
+
+        self.pys_in.to_code_array()
+
+        try:
+            for name in codecs:
+                config["pys_codec"] = repr(name)
+                config["pys_codec_level"] = repr(1)
+
+                outfile = open(self.pys_outfile_path, "wb")
+                Pys(self.code_array, outfile).from_code_array(container=True)
+                outfile.close()
+
+                with open(self.pys_outfile_path, "rb") as infile:
+                    assert Pys(self.code_array, infile).read_index()["codec"] \
+                        == name
+
+                    code_array = CodeArray((1, 1, 1))
+                    Pys(code_array, infile).to_code_array()
+
+                assert code_array.dict_grid == self.code_array.dict_grid
+                assert code_array.macros == self.code_array.macros
+
+        finally:
+            config["pys_codec"] = repr("bz2")
+            config["pys_codec_level"] = repr(None)
+            os.remove(self.pys_outfile_path)
@@ -54,6 +54,7 @@ sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
 from src.interfaces.xls import Xls
 from src.lib.selection import Selection
 from src.lib.testlib import params, pytest_generate_tests
+from src.lib.undo import stack as undo_stack
 from src.model.model import CodeArray
 from src.sysvars import get_dpi, get_default_font
 
@@ -172,6 +173,38 @@ class TestXls(object):
         worksheet = worksheets[tab]
         assert worksheet.cell_value(row, col) == val
 
+    @pytest.mark.skipif(xlwt is None, reason="requires xlwt")
+    def test_code2xls_formats(self):
+        """Test _code2xls for formatted cells without code in large grids"""
+
+        self.code_array.shape = (5000, 300, 1)
+        cell_attributes = self.code_array.dict_grid.cell_attributes
+        cell_attributes.append((Selection([], [], [], [3], []), 0,
+                                {"bgcolor": 52377}))
+        cell_attributes.append((Selection([], [], [], [], [(4500, 7)]), 0,
+                                {"underline": True}))
+
+        wb = xlwt.Workbook()
+        xls_out = Xls(self.code_array, wb)
+        worksheets = []
+        xls_out._shape2xls(worksheets)
+        self.write_xls_out(xls_out, wb, "_code2xls", worksheets)
+        workbook = self.read_xls_out()
+
+        worksheet = workbook.sheets()[0]
+
+        # Formats below row 4000 are exported as well
+        assert worksheet.nrows == 5000
+        assert worksheet.ncols == 8
+
+        fill_xf_index = worksheet.cell_xf_index(4999, 3)
+        assert workbook.xf_list[fill_xf_index].background.pattern_colour_index
+
+        assert worksheet.cell_type(4500, 7) == xlrd.XL_CELL_BLANK
+
+        # Cells without attributes are not written
+        assert worksheet.cell_type(4500, 6) == xlrd.XL_CELL_EMPTY
+
     param_xls2code = [
         {'key': (5, 2, 0), 'res': "34.234"},
         {'key': (6, 2, 0), 'res': "2.0"},
@@ -334,6 +367,54 @@ class TestXls(object):
         assert getattr(getattr(xfstyle, sec_key), subsec_key) == \
             getattr(getattr(style, sec_key), subsec_key)
 
+    @pytest.mark.skipif(xlwt is None, reason="requires xlwt")
+    def test_get_xfstyle_cache(self):
+        """Test that _get_xfstyle reuses XFStyle objects of equal styles"""
+
+        cell_attributes = self.code_array.dict_grid.cell_attributes
+        selection = Selection([(20, 2)], [(21, 3)], [], [], [])
+        cell_attributes.append((selection, 0, {"bgcolor": 52377}))
+
+        xfstyle_1 = self.xls_in._get_xfstyle([], (21, 2, 0))
+        xfstyle_2 = self.xls_in._get_xfstyle([], (21, 3, 0))
+        xfstyle_3 = self.xls_in._get_xfstyle([], (22, 3, 0))
+
+        assert xfstyle_1 is xfstyle_2
+        assert xfstyle_1 is not xfstyle_3
+
+        # Borders of the cell above are part of the effective style
+        selection = Selection([], [], [], [], [(20, 2)])
+        cell_attributes.append((selection, 0, {"borderwidth_bottom": 7}))
+
+        xfstyle_4 = self.xls_in._get_xfstyle([], (21, 2, 0))
+
+        assert xfstyle_4 is not xfstyle_2
+        assert xfstyle_4.borders.top == xlwt.Borders.THICK
+        assert self.xls_in._get_xfstyle([], (21, 3, 0)) is xfstyle_2
+
+    def test_get_xf_blocks(self):
+        """Test _get_xf_blocks method"""
+
+        worksheet = self.xls_in.workbook.sheet_by_name("Sheet1")
+
+        xf_blocks = self.xls_in._get_xf_blocks(worksheet)
+
+        cell_xfs = {}
+        for xfid, blocks in xf_blocks.iteritems():
+            for top, left, bottom, right in blocks:
+                for row in xrange(top, bottom + 1):
+                    for col in xrange(left, right + 1):
+                        assert (row, col) not in cell_xfs
+                        cell_xfs[row, col] = xfid
+
+        assert len(cell_xfs) == worksheet.nrows * worksheet.ncols
+        for (row, col), xfid in cell_xfs.iteritems():
+            assert worksheet.cell_xf_index(row, col) == xfid
+
+        # Identical adjacent formats are merged into few blocks
+        assert sum(len(blocks) for blocks in xf_blocks.values()) < \
+            len(cell_xfs) / 4
+
     param_attributes2xls = [
         {'key': (14, 3, 0), 'attr': 'fontweight', 'val': 92},
         {'key': (14, 3, 0), 'attr': 'fontstyle', 'val': 90},
@@ -358,6 +439,34 @@ class TestXls(object):
         attrs = self.code_array.dict_grid.cell_attributes[key]
 
         assert attrs[attr] == val
+
+    @pytest.mark.skipif(xlwt is None, reason="requires xlwt")
+    def test_xls2attributes_thick_borders(self):
+        """Adjacent borders do not replace thicker borders"""
+
+        wb = xlwt.Workbook()
+        worksheet = wb.add_sheet("0")
+
+        cells = [
+            (0, 0, "borders: bottom thick"), (1, 0, "borders: top medium"),
+            (0, 1, "borders: bottom medium"), (1, 1, "borders: top thick"),
+            (3, 0, "borders: right thick"), (3, 1, "borders: left medium"),
+        ]
+        for row, col, easyxf in cells:
+            worksheet.write(row, col, "", xlwt.easyxf(easyxf))
+
+        wb.save(self.xls_outfile_path)
+        workbook = self.read_xls_out()
+
+        xls_in = Xls(self.code_array, workbook)
+        xls_in._xls2attributes(workbook.sheet_by_index(0), 0)
+
+        cell_attributes = self.code_array.dict_grid.cell_attributes
+
+        assert cell_attributes[0, 0, 0]["borderwidth_bottom"] == 7
+        assert cell_attributes[0, 1, 0]["borderwidth_bottom"] == 7
+        assert cell_attributes[3, 0, 0]["borderwidth_right"] == 7
+        assert cell_attributes[1, 0, 0]["borderwidth_bottom"] == 1
 #
 #    param_cell_attribute_append = [
 #        {'row': 0, 'tab': 0, 'height': 0.1, 'code': "0\t0\t0.1\n"},
@@ -539,3 +648,49 @@ class TestXls(object):
 
         assert self.code_array((3, 4, 0)) == 'Hi'
         assert self.code_array((10, 6, 0)) == '465.0'
+
+    def test_to_code_array_bulk(self):
+        """Bulk loading skips empty cells and creates no undo"""
+
+        undo_stack().clear()
+        self.xls_in.to_code_array()
+        assert not undo_stack().canundo()
+        assert self.xls_in.load_rate > 0
+
+        worksheet = self.xls_in.workbook.sheet_by_name("Sheet1")
+        code_array = CodeArray((1000, 100, 3))
+        xls_in = Xls(code_array, self.xls_infile)
+        xls_in._xls2code(worksheet, 0)
+        xls_in._xls2attributes(worksheet, 0)
+
+        assert self.code_array.dict_grid == code_array.dict_grid
+        assert all(code for code in self.code_array.dict_grid.values())
+
+        for row in xrange(worksheet.nrows):
+            for col in xrange(worksheet.ncols):
+                key = row, col, 0
+                assert self.code_array.cell_attributes[key] == \
+                    code_array.cell_attributes[key]
+
+    def test_to_code_array_tables(self):
+        """Only selected worksheets are loaded"""
+
+        self.xls_in.to_code_array(tables=[1, 2])
+
+        assert self.code_array.shape == (19, 7, 3)
+        assert not self.code_array.dict_grid
+        assert not self.code_array.cell_attributes
+
+        self.xls_in.load_tables([0])
+
+        assert self.code_array((3, 4, 0)) == 'Hi'
+
+    def test_to_code_array_no_formatting_info(self):
+        """Workbooks without formatting info, e.g. xlsx, load code only"""
+
+        workbook = xlrd.open_workbook(TESTPATH + "xls_test1.xls",
+                                      formatting_info=False)
+        Xls(self.code_array, workbook).to_code_array()
+
+        assert self.code_array((3, 4, 0)) == 'Hi'
+        assert not self.code_array.cell_attributes
@@ -28,10 +28,10 @@ This file contains interfaces to Excel xls file format.
 
 """
 
-from copy import copy
 from collections import defaultdict
 from datetime import datetime
-from itertools import product, repeat
+from itertools import groupby, repeat
+import time
 
 try:
     import xlrd
@@ -48,8 +48,9 @@ except ImportError:
 import wx
 
 import src.lib.i18n as i18n
+import src.lib.undo as undo
 
-from src.lib.selection import Selection
+from src.lib.selection import Selection, get_row_intervals
 
 from src.sysvars import get_dpi, get_default_text_extent, get_color
 
@@ -84,6 +85,15 @@ class Xls(object):
         self.xls_max_cols = 256
         self.xls_max_tabs = 256  # Limit tables to 255 to avoid cluttered Excel
 
+        # Interned xlwt.XFStyle objects, keyed by effective style attributes
+        self._xfstyle_cache = {}
+
+        # Parsed sheet data in bulk load mode, see load_tables
+        self._bulk_data = None
+
+        # Rows per second of the last load_tables call
+        self.load_rate = None
+
     def idx2colour(self, idx):
         """Returns wx.Colour"""
 
@@ -170,37 +180,35 @@ class Xls(object):
 
         # Handle cell formatting in cells without code
 
-        # Get bboxes for all cell_attributes
         max_shape = [min(xls_max_shape[0], code_array.shape[0]),
                      min(xls_max_shape[1], code_array.shape[1])]
 
-        # Prevent systems from blocking
-        if max_shape[0] * max_shape[1] > 1024000:
-            # Ignore all cell attributes below row 3999
-            max_shape[0] = 4000
-
+        # Get blocks of all selections with non-default attributes per table
         cell_attributes = code_array.dict_grid.cell_attributes
-        bboxes = []
-        for s, __tab, __ in cell_attributes:
-            if s:
-                bboxes.append((s.get_grid_bbox(code_array.shape), __tab))
-
-        # Get bbox_cell_set from bboxes
-        cells = []
-        for ((bb_top, bb_left), (bb_bottom, bb_right)), __tab in bboxes:
-            __bb_bottom = min(bb_bottom, max_shape[0])
-            __bb_right = min(bb_right, max_shape[1])
-            for __row, __col in product(xrange(bb_top, __bb_bottom + 1),
-                                        xrange(bb_left, __bb_right + 1)):
-                cells.append((__row, __col, __tab))
-
-        cell_set = set(cells)
-        # Loop over those with non-standard attributes
-        for key in cell_set:
-            if key not in code_array and all(ele >= 0 for ele in key):
-                row, col, tab = key
-                style = self._get_xfstyle(worksheets, key)
-                worksheets[tab].write(row, col, label="", style=style)
+        default_attributes = cell_attributes.default_cell_attributes
+        table_blocks = defaultdict(list)
+
+        for selection, tab, attrs in cell_attributes:
+            if tab >= xls_max_shape[2] or \
+               all(default_attributes.get(attr) == attrs[attr]
+                   for attr in attrs):
+                continue
+
+            table_blocks[tab].extend(selection.get_grid_blocks(max_shape))
+
+        # Walk the union of blocks row by row via merged column intervals
+        for tab in sorted(table_blocks):
+            worksheet = worksheets[tab]
+            for top, bottom, col_intervals in \
+                    get_row_intervals(table_blocks[tab]):
+                for row in xrange(top, bottom + 1):
+                    for left, right in col_intervals:
+                        for col in xrange(left, right + 1):
+                            key = row, col, tab
+                            if key not in code_array:
+                                style = self._get_xfstyle(worksheets, key)
+                                worksheet.write(row, col, label="",
+                                                style=style)
 
     def _xls2code(self, worksheet, tab):
         """Updates code in xls code_array"""
@@ -226,14 +234,25 @@ class Xls(object):
             6: lambda x: None,  # Blank cell
         }
 
-        rows, cols = worksheet.nrows, worksheet.ncols
-        for row, col in product(xrange(rows), xrange(cols)):
-            cell_type = worksheet.cell_type(row, col)
-            cell_value = worksheet.cell_value(row, col)
+        empty_types = xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK
 
-            key = row, col, tab
-            mapper = type2mapper[cell_type]
-            self.code_array[key] = mapper(cell_value)
+        for row in xrange(worksheet.nrows):
+            cell_types = worksheet.row_types(row)
+            cell_values = worksheet.row_values(row)
+
+            for col, cell_type in enumerate(cell_types):
+                if cell_type in empty_types:
+                    continue
+
+                code = type2mapper[cell_type](cell_values[col])
+                if not code:
+                    continue
+
+                key = row, col, tab
+                if self._bulk_data is None:
+                    self.code_array[key] = code
+                else:
+                    self._bulk_data["code"][key] = code
 
     def _get_font(self, pys_style):
         """Returns xlwt.Font for pyspread style"""
@@ -511,16 +530,60 @@ class Xls(object):
 
         return borders
 
+    def _get_xfstyle_key(self, pys_style, pys_style_above, pys_style_left):
+        """Returns hashable key of all attributes that affect the XFStyle
+
+        Parameters
+        ----------
+        pys_style: Dict
+        \tCell attributes of the cell
+        pys_style_above: Dict
+        \tCell attributes of the cell above, which provide the top border
+        pys_style_left: Dict
+        \tCell attributes of the cell to the left, which provide the left border
+
+        """
+
+        style_keys = [
+            "textfont", "pointsize", "fontweight", "fontstyle", "textcolor",
+            "underline", "strikethrough", "justification", "vertical_align",
+            "angle", "bgcolor", "borderwidth_right", "borderwidth_bottom",
+            "bordercolor_right", "bordercolor_bottom",
+        ]
+        above_keys = ["borderwidth_bottom", "bordercolor_bottom"]
+        left_keys = ["borderwidth_right", "bordercolor_right"]
+
+        def get_items(style, keys):
+            """Returns tuple of (key, value) for keys that are in style"""
+
+            return tuple((key, style[key]) for key in keys if key in style)
+
+        return (get_items(pys_style, style_keys),
+                get_items(pys_style_above, above_keys),
+                get_items(pys_style_left, left_keys))
+
     def _get_xfstyle(self, worksheets, key):
-        """Gets XFStyle for cell key"""
+        """Gets XFStyle for cell key
+
+        Cells with equal effective style attributes share one XFStyle object,
+        which is built only once per export.
+
+        """
 
         row, col, tab = key
-        dict_grid = self.code_array.dict_grid
-        dict_grid.cell_attributes._update_table_cache()
+        cell_attributes = self.code_array.dict_grid.cell_attributes
+
+        pys_style = cell_attributes[key]
+        pys_style_above = cell_attributes[row - 1, col, tab]
+        pys_style_left = cell_attributes[row, col - 1, tab]
+
+        xfstyle_key = self._get_xfstyle_key(pys_style, pys_style_above,
+                                            pys_style_left)
+        try:
+            return self._xfstyle_cache[xfstyle_key]
 
-        pys_style = dict_grid.cell_attributes[key]
-        pys_style_above = dict_grid.cell_attributes[row - 1, col, tab]
-        pys_style_left = dict_grid.cell_attributes[row, col - 1, tab]
+        except KeyError:
+            pass
 
         xfstyle = xlwt.XFStyle()
 
@@ -552,54 +615,80 @@ class Xls(object):
         if borders is not None:
             xfstyle.borders = borders
 
+        self._xfstyle_cache[xfstyle_key] = xfstyle
+
         return xfstyle
 
     def _cell_attribute_append(self, selection, tab, attributes):
-        """Appends to cell_attributes with checks"""
+        """Appends to cell_attributes or to the bulk data in bulk load mode"""
 
-        cell_attributes = self.code_array.cell_attributes
+        if self._bulk_data is None:
+            self.code_array.cell_attributes.append((selection, tab,
+                                                    attributes))
+        else:
+            self._bulk_data["attributes"].append((selection, tab, attributes))
 
-        thick_bottom_cells = []
-        thick_right_cells = []
+    def _get_xf_blocks(self, worksheet):
+        """Returns dict of xf index to list of blocks of cells with this xf
 
-        # Does any cell in selection.cells have a larger bottom border?
+        Adjacent cells in a row with the same xf index form one run. Runs with
+        equal columns in consecutive rows are merged into one block.
+        Blocks are (top, left, bottom, right) tuples.
 
-        if "borderwidth_bottom" in attributes:
-            bwidth = attributes["borderwidth_bottom"]
-            for row, col in selection.cells:
-                __bwidth = cell_attributes[row, col, tab]["borderwidth_bottom"]
-                if __bwidth > bwidth:
-                    thick_bottom_cells.append((row, col))
+        Parameters
+        ----------
+        worksheet: xlrd.sheet.Sheet
+        \tWorksheet, from which the cell formats are read
 
-        # Does any cell in selection.cells have a larger right border?
-        if "borderwidth_right" in attributes:
-            rwidth = attributes["borderwidth_right"]
-            for row, col in selection.cells:
-                __rwidth = cell_attributes[row, col, tab]["borderwidth_right"]
-                if __rwidth > rwidth:
-                    thick_right_cells.append((row, col))
+        """
 
-        for thick_cell in thick_bottom_cells + thick_right_cells:
-            try:
-                selection.cells.remove(thick_cell)
-            except ValueError:
-                pass
+        xf_blocks = defaultdict(list)
+
+        # Maps (xfid, left, right) of runs in the previous row to top row
+        open_blocks = {}
+
+        for row in xrange(worksheet.nrows):
+            runs = []
+            for xfid, cols in groupby(xrange(worksheet.ncols),
+                                      lambda col: worksheet.cell_xf_index(
+                                          row, col)):
+                cols = list(cols)
+                runs.append((xfid, cols[0], cols[-1]))
+
+            for run in set(open_blocks).difference(runs):
+                xfid, left, right = run
+                top = open_blocks.pop(run)
+                xf_blocks[xfid].append((top, left, row - 1, right))
+
+            for run in runs:
+                open_blocks.setdefault(run, row)
+
+        for (xfid, left, right), top in open_blocks.iteritems():
+            xf_blocks[xfid].append((top, left, worksheet.nrows - 1, right))
+
+        return xf_blocks
+
+    def _get_block_selection(self, blocks):
+        """Returns Selection of blocks of (top, left, bottom, right) tuples"""
 
-        cell_attributes.append((selection, tab, attributes))
+        return Selection([(top, left) for top, left, __, __ in blocks],
+                         [(bottom, right) for __, __, bottom, right in blocks],
+                         [], [], [])
 
-        if thick_bottom_cells:
-            bsel = copy(selection)
-            bsel.cells = thick_bottom_cells
-            battrs = copy(attributes)
-            battrs.pop("borderwidth_bottom")
-            cell_attributes.append((bsel, tab, battrs))
+    def _get_block_intersections(self, blocks, other_blocks):
+        """Returns list of the non-empty intersections of two block lists"""
 
-        if thick_right_cells:
-            rsel = copy(selection)
-            rsel.cells = thick_right_cells
-            rattrs = copy(attributes)
-            rattrs.pop("borderwidth_right")
-            cell_attributes.append((rsel, tab, rattrs))
+        intersections = []
+
+        for top, left, bottom, right in blocks:
+            for o_top, o_left, o_bottom, o_right in other_blocks:
+                i_top, i_left = max(top, o_top), max(left, o_left)
+                i_bottom, i_right = min(bottom, o_bottom), min(right, o_right)
+
+                if i_top <= i_bottom and i_left <= i_right:
+                    intersections.append((i_top, i_left, i_bottom, i_right))
+
+        return intersections
 
     def _xls2attributes(self, worksheet, tab):
         """Updates attributes in code_array"""
@@ -609,19 +698,26 @@ class Xls(object):
             attrs = {"merge_area": (top, left, bottom - 1, right - 1)}
             selection = Selection([(top, left)], [(bottom - 1, right - 1)],
                                   [], [], [])
-            self.code_array.cell_attributes.append((selection, tab, attrs))
+            self._cell_attribute_append(selection, tab, attrs)
+
+        # Borders from the top and left borders of adjacent cells are
+        # appended last so that they are not overwritten by default borders
+        border_attributes = []
+
+        # Blocks and attributes of each format for keeping thicker borders
+        block_attributes = []
 
-        # Which cell comprise which format ids
-        xf2cell = dict((xfid, []) for xfid in xrange(self.workbook.xfcount))
-        rows, cols = worksheet.nrows, worksheet.ncols
-        for row, col in product(xrange(rows), xrange(cols)):
-            xfid = worksheet.cell_xf_index(row, col)
-            xf2cell[xfid].append((row, col))
+        xf_blocks = self._get_xf_blocks(worksheet)
 
-        for xfid, xf in enumerate(self.workbook.xf_list):
-            selection = Selection([], [], [], [], xf2cell[xfid])
-            selection_above = selection.shifted(-1, 0)
-            selection_left = selection.shifted(0, -1)
+        for xfid in sorted(xf_blocks):
+            xf = self.workbook.xf_list[xfid]
+            blocks = xf_blocks[xfid]
+            selection = self._get_block_selection(blocks)
+
+            blocks_above = [(top - 1, left, bottom - 1, right)
+                            for top, left, bottom, right in blocks]
+            blocks_left = [(top, left - 1, bottom, right - 1)
+                           for top, left, bottom, right in blocks]
 
             attributes = {}
 
@@ -756,16 +852,34 @@ class Xls(object):
             if left_color_idx in self.workbook.colour_map and \
                self.workbook.colour_map[left_color_idx] is not None:
                 left_color = self.idx2colour(left_color_idx)
-                attributes_above["bordercolor_right"] = left_color.GetRGB()
+                attributes_left["bordercolor_right"] = left_color.GetRGB()
 
-            if attributes_above:
-                self._cell_attribute_append(selection_above, tab,
-                                            attributes_above)
-            if attributes_left:
-                self._cell_attribute_append(selection_left, tab,
-                                            attributes_left)
             if attributes:
                 self._cell_attribute_append(selection, tab, attributes)
+                block_attributes.append((blocks, attributes))
+            if attributes_above:
+                border_attributes.append((blocks_above, attributes_above))
+            if attributes_left:
+                border_attributes.append((blocks_left, attributes_left))
+
+        for blocks, attributes in border_attributes:
+            self._cell_attribute_append(self._get_block_selection(blocks),
+                                        tab, attributes)
+
+            # Cells keep their own border if it is thicker
+            for key in ["borderwidth_bottom", "borderwidth_right"]:
+                if key not in attributes:
+                    continue
+
+                for cell_blocks, cell_attributes in block_attributes:
+                    width = cell_attributes[key]
+                    if width > attributes[key]:
+                        thick_blocks = self._get_block_intersections(
+                            blocks, cell_blocks)
+                        if thick_blocks:
+                            self._cell_attribute_append(
+                                self._get_block_selection(thick_blocks), tab,
+                                {key: width})
 
     def _row_heights2xls(self, worksheets):
         """Writes row_heights to xls file
@@ -855,6 +969,10 @@ class Xls(object):
         worksheets = []
         self._shape2xls(worksheets)
 
+        # Build the table cache once and start with a fresh style cache
+        self.code_array.dict_grid.cell_attributes._update_table_cache()
+        self._xfstyle_cache.clear()
+
         self._code2xls(worksheets)
 
         self._row_heights2xls(worksheets)
@@ -862,16 +980,82 @@ class Xls(object):
 
         return self.workbook
 
-    def to_code_array(self):
-        """Replaces everything in code_array from xls_file"""
+    def to_code_array(self, tables=None):
+        """Replaces everything in code_array from xls_file
+
+        Parameters
+        ----------
+        tables: Iterable of Integer, defaults to None
+        \tWorksheets that are loaded, all if None
+
+        """
+
+        with undo.suspended():
+            self._xls2shape()
+
+        self.load_tables(tables)
+
+    def load_tables(self, tables=None):
+        """Loads worksheets into code_array without changing its shape
+
+        Code and cell attributes of the worksheets are collected in plain
+        dicts and lists first, which are installed in one step at the end.
+        Empty and blank cells are skipped. No undo records are created.
+        The rows per second are stored in load_rate.
+
+        Parameters
+        ----------
+        tables: Iterable of Integer, defaults to None
+        \tWorksheets that are loaded, all if None
 
-        self._xls2shape()
+        """
+
+        start_time = time.time()
+        no_rows = 0
+
+        self._bulk_data = {
+            "code": {},
+            "attributes": [],
+        }
 
         worksheets = self.workbook.sheet_names()
 
-        for tab, worksheet_name in enumerate(worksheets):
-            worksheet = self.workbook.sheet_by_name(worksheet_name)
-            self._xls2code(worksheet, tab)
-            self._xls2attributes(worksheet, tab)
-            self._xls2row_heights(worksheet, tab)
-            self._xls2col_widths(worksheet, tab)
+        try:
+            with undo.suspended(), self.code_array.journal_suspended():
+                for tab, worksheet_name in enumerate(worksheets):
+                    if tables is not None and tab not in tables:
+                        continue
+
+                    worksheet = self.workbook.sheet_by_name(worksheet_name)
+                    self._xls2code(worksheet, tab)
+                    if self.workbook.formatting_info:
+                        # xlsx files are opened without formatting info
+                        self._xls2attributes(worksheet, tab)
+                    self._xls2row_heights(worksheet, tab)
+                    self._xls2col_widths(worksheet, tab)
+
+                    no_rows += worksheet.nrows
+
+                self._install_bulk_data()
+
+        finally:
+            self._bulk_data = None
+
+        self.load_rate = no_rows / max(time.time() - start_time, 1e-6)
+
+    def _install_bulk_data(self):
+        """Installs collected bulk data in code_array in one step
+
+        The data is installed without undo records. Cell attribute caches
+        are rebuilt once.
+
+        """
+
+        code_array = self.code_array
+
+        code_array.dict_grid.update(self._bulk_data["code"])
+
+        if self._bulk_data["attributes"]:
+            code_array._replace_cell_attributes(
+                list(code_array.cell_attributes) +
+                self._bulk_data["attributes"])
@@ -27,10 +27,15 @@ Provides
 --------
 
  * sniff: Sniffs CSV dialect and header info
+ * profile: Profiles dialect, header, column types and size of CSV file
+ * sample_lines_gen: Generator of line lists from evenly spread file chunks
+ * infer_digest_types: Infers column digest types from rows
  * get_first_line
  * csv_digest_gen
  * cell_key_val_gen
  * Digest: Converts any object to target type as good as possible
+ * get_cell_converter: Returns converter from csv cell strings to cell code
+ * convert_rows: Converts batch of csv rows column by column
  * CsvInterface
  * TxtGenerator
 
@@ -39,9 +44,12 @@ Provides
 import ast
 import csv
 import datetime
+from itertools import chain, imap, izip, izip_longest
+import mmap
 import os
 import types
 
+import numpy
 import wx
 
 from src.config import config
@@ -63,14 +71,175 @@ def sniff(filepath):
 
     """
 
+    dialect, has_header, __, __ = profile(filepath)
+
+    return dialect, has_header
+
+
+def sample_lines_gen(filepath, chunk_size, no_chunks):
+    """Generator of lists of complete lines from evenly spread file chunks
+
+    The chunks are evenly spread from the start to the end of the file.
+    Lines that are cut by a chunk border are omitted.
+    Files that are not larger than all chunks together are read completely
+    as one chunk.
+
+    Parameters
+    ----------
+    filepath: String
+    \tFile path of csv file to read
+    chunk_size: Integer
+    \tNumber of bytes of each chunk
+    no_chunks: Integer
+    \tNumber of chunks
+
+    """
+
+    size = os.path.getsize(filepath)
+
     with open(filepath, "rb") as csvfile:
-        sample = csvfile.read(config["sniff_size"])
+        if size <= chunk_size * no_chunks or no_chunks < 2:
+            yield csvfile.readlines()
+            return
+
+        for i in xrange(no_chunks):
+            position = i * (size - chunk_size) // (no_chunks - 1)
+            csvfile.seek(position)
+            data = csvfile.read(chunk_size)
+
+            lines = data.split("\n")
+
+            # The last line is cut unless it is the last line of the file
+            last_line = lines.pop()
+            if position:
+                lines = lines[1:]
+
+            lines = [line + "\n" for line in lines]
+
+            if last_line and position + len(data) >= size:
+                lines.append(last_line)
+
+            yield lines
+
+
+def infer_digest_types(rows):
+    """Returns list of digest types for the columns in rows
+
+    Columns that only contain integers become IntType, columns that
+    only contain numbers become FloatType. All other columns become
+    UnicodeType. Empty cells are ignored.
+
+    Parameters
+    ----------
+    rows: Iterable of lists of strings
+    \tCsv rows, which are consumed in one pass
+
+    """
+
+    candidates = [types.IntType, types.FloatType, types.UnicodeType]
+    parsers = [int, float]
+
+    # Index of the most specific candidate that fits each column
+    levels = []
+
+    for row in rows:
+        if len(row) > len(levels):
+            levels.extend([0] * (len(row) - len(levels)))
+
+        for col, value in enumerate(row):
+            level = levels[col]
+
+            if level == len(parsers) or not value:
+                continue
+
+            while level < len(parsers):
+                try:
+                    parsers[level](value)
+                    break
+
+                except ValueError:
+                    level += 1
+
+            levels[col] = level
+
+    return [candidates[level] for level in levels]
+
+
+def profile(filepath):
+    """
+    Profiles a CSV file in one pass from samples across the file
+
+    The file is sampled in config["csv_sample_chunks"] evenly spread chunks
+    of config["sniff_size"] bytes. Memory usage is bounded by the samples.
+
+    Returns a tuple of dialect, has_header, digest_types and no_lines.
+    no_lines is the number of lines of the file, which is estimated from
+    the sample line lengths unless the file is read completely.
+
+    Parameters
+    ----------
+    filepath: String
+    \tFile path of csv file to profile
+
+    """
+
+    chunk_size = config["sniff_size"]
+    no_chunks = config["csv_sample_chunks"]
+
+    chunks = list(sample_lines_gen(filepath, chunk_size, no_chunks))
+
+    # The dialect sample takes its share of lines from each chunk
+    sample_lines = []
+    for lines in chunks:
+        sample_size = 0
+        for line in lines:
+            if sample_size >= chunk_size // len(chunks):
+                break
+            sample_lines.append(line)
+            sample_size += len(line)
+
+    sample = "".join(sample_lines)
 
     sniffer = csv.Sniffer()
     dialect = sniffer.sniff(sample)()
-    has_header = sniffer.has_header(sample)
 
-    return dialect, has_header
+    # The first line of the first chunk is the first line of the file
+    rows = csv.reader((line for lines in chunks for line in lines), dialect)
+
+    first_line = []
+    for first_line in rows:
+        break
+
+    digest_types = infer_digest_types(rows)
+
+    # A header does not fit the column type of numeric columns
+    has_header = None
+    for value, digest_type in zip(first_line, digest_types):
+        if digest_type is not types.UnicodeType and value:
+            try:
+                digest_type(value)
+
+            except ValueError:
+                has_header = True
+                break
+
+            has_header = False
+
+    if has_header is None:
+        head_sample = "".join(chunks[0])[:chunk_size]
+        has_header = sniffer.has_header(head_sample)
+
+    # Line count
+    size = os.path.getsize(filepath)
+    no_sample_lines = sum(len(lines) for lines in chunks)
+    sample_size = sum(len(line) for lines in chunks for line in lines)
+
+    if sample_size == size or not no_sample_lines:
+        no_lines = no_sample_lines
+    else:
+        no_lines = int(round(size * no_sample_lines / float(sample_size)))
+
+    return dialect, has_header, digest_types, no_lines
 
 
 def get_first_line(filepath, dialect):
@@ -354,18 +523,114 @@ class Digest(object):
 # end of class Digest
 
 
+def get_cell_converter(digest_type, encoding="utf-8"):
+    """Returns function that converts csv cell strings to cell code
+
+    The converter is built once per column. Its results equal the results
+    of CsvInterface._get_csv_cells_gen for the digest_type. None is
+    converted to None.
+
+    Parameters
+    ----------
+    digest_type: Type or None
+    \tTarget type of the column, None for header cells
+    encoding: String, defaults to "utf-8"
+    \tEncoding of the csv cell strings
+
+    """
+
+    # Frequent types are converted without Digest object
+
+    if digest_type is None or digest_type is types.UnicodeType:
+        parse = lambda value: value.decode(encoding)
+
+    elif digest_type is types.IntType:
+        parse = int
+
+    elif digest_type is types.FloatType:
+        parse = float
+
+    else:
+        parse = Digest(acceptable_types=[digest_type], encoding=encoding)
+
+    is_code = digest_type is types.CodeType
+
+    def convert(value):
+        """Returns cell code for csv cell string value"""
+
+        if value is None:
+            return
+
+        try:
+            digest_res = parse(value)
+
+            if digest_res == "\b":
+                return
+
+            elif is_code:
+                return digest_res
+
+            return repr(digest_res)
+
+        except Exception:
+            return ""
+
+    return convert
+
+
+def convert_rows(rows, converters):
+    """Returns list of converted rows, conversion is done column by column
+
+    Parameters
+    ----------
+    rows: List of lists of strings
+    \tCsv rows
+    converters: List of functions
+    \tConverters of the columns, the first one is used for further columns
+
+    """
+
+    if not rows:
+        return []
+
+    lengths = map(len, rows)
+    max_length = max(lengths)
+
+    if not max_length:
+        return [()] * len(rows)
+
+    columns = izip_longest(*rows)
+    converters = converters + converters[:1] * (max_length - len(converters))
+
+    converted_rows = zip(*[map(converter, column)
+                           for converter, column in izip(converters, columns)])
+
+    if min(lengths) < max_length:
+        # Padding cells of shorter rows are removed
+        return [row[:length] for row, length in izip(converted_rows, lengths)]
+
+    return converted_rows
+
+
 class CsvInterface(StatusBarEventMixin):
     """CSV interface class
 
     Provides
     --------
      * __iter__: CSV reader - generator of generators of csv data cell content
-     * write: CSV writer
+     * iter_batches: CSV reader - generator of lists of rows of cell content
+     * write: Streaming CSV writer
 
     """
 
+    # Number of csv rows that are converted at once
+    batch_size = 10000
+
+    # Buffer size of the file that is written in bytes
+    write_buffer_size = 2 ** 20
+
     def __init__(self, main_window, path, dialect, digest_types, has_header,
-                 encoding='utf-8'):
+                 encoding='utf-8', total_lines=None):
         self.main_window = main_window
         self.path = path
         self.csvfilename = os.path.split(path)[1]
@@ -376,28 +641,58 @@ class CsvInterface(StatusBarEventMixin):
 
         self.encoding = encoding
 
+        # Number of lines for progress messages, None if unknown
+        self.total_lines = total_lines
+
         self.first_line = False
 
     def __iter__(self):
-        """Generator of generators that yield csv data"""
+        """Generator of rows that yield csv data"""
 
-        with AOpen(self.path, "rb", main_window=self.main_window) as csv_file:
-            csv_reader = csv.reader(csv_file, self.dialect)
+        for batch in self.iter_batches():
+            for row in batch:
+                yield row
+
+        msg = _("File {filename} imported successfully.").format(
+            filename=self.csvfilename)
+        post_command_event(self.main_window, self.StatusBarMsg, text=msg)
 
-            self.first_line = self.has_header
+    def _get_converters(self):
+        """Returns list of cell converters, one for each digest type"""
 
-            for line in csv_reader:
-                yield self._get_csv_cells_gen(line)
-                break
+        return [get_cell_converter(digest_type, encoding=self.encoding)
+                for digest_type in self.digest_types]
 
-            self.first_line = False
+    def iter_batches(self):
+        """Generator of lists of up to batch_size rows of cell code
+
+        The rows are converted column by column with one converter per
+        column. A header row is converted to unicode code.
+
+        """
+
+        converters = self._get_converters()
+
+        with AOpen(self.path, "rb", **self._get_aopen_kwargs()) as csv_file:
+            csv_reader = csv.reader(csv_file, self.dialect)
 
+            if self.has_header:
+                for line in csv_reader:
+                    header_converter = get_cell_converter(
+                        None, encoding=self.encoding)
+                    yield convert_rows([line], [header_converter])
+                    break
+
+            batch = []
             for line in csv_reader:
-                yield self._get_csv_cells_gen(line)
+                batch.append(line)
 
-        msg = _("File {filename} imported successfully.").format(
-            filename=self.csvfilename)
-        post_command_event(self.main_window, self.StatusBarMsg, text=msg)
+                if len(batch) == self.batch_size:
+                    yield convert_rows(batch, converters)
+                    batch = []
+
+            if batch:
+                yield convert_rows(batch, converters)
 
     def _get_csv_cells_gen(self, line):
         """Generator of values in a csv line"""
@@ -431,21 +726,44 @@ class CsvInterface(StatusBarEventMixin):
 
             yield digest_res
 
+    def _get_aopen_kwargs(self):
+        """Returns AOpen keyword arguments for progress messages"""
+
+        aopen_kwargs = {"main_window": self.main_window}
+        if self.total_lines is not None:
+            aopen_kwargs["total_lines"] = self.total_lines
+
+        return aopen_kwargs
+
     def write(self, iterable):
-        """Writes values from iterable into CSV file"""
+        """Writes values from iterable into CSV file
+
+        The rows of iterable are consumed one by one and written through a
+        buffered file that shows progress and that can be aborted.
+        Returns False if the file cannot be written or if it is aborted.
+
+        """
 
         io_error_text = _("Error writing to file {filepath}.")
         io_error_text = io_error_text.format(filepath=self.path)
 
         try:
 
-            with open(self.path, "wb") as csvfile:
+            with AOpen(self.path, "wb", self.write_buffer_size,
+                       **self._get_aopen_kwargs()) as csvfile:
                 csv_writer = csv.writer(csvfile, self.dialect)
 
                 for line in iterable:
                     csv_writer.writerow(
                         list(encode_gen(line, encoding=self.encoding)))
 
+                    if csvfile.aborted:
+                        return False
+
+            msg = _("File {filename} exported successfully.").format(
+                filename=self.csvfilename)
+            post_command_event(self.main_window, self.StatusBarMsg, text=msg)
+
         except IOError:
             txt = \
                 _("Error opening file {filepath}.").format(filepath=self.path)
@@ -460,26 +778,113 @@ class CsvInterface(StatusBarEventMixin):
 
 
 class TxtGenerator(StatusBarEventMixin):
-    """Generator of generators of Whitespace separated txt file cell content"""
+    """Generator of generators of Whitespace separated txt file cell content
+
+    The file is memory-mapped and read in blocks of about block_size bytes.
+    Line boundaries are found with one search per block, and the lines of
+    each block are split at once. Progress is tracked in bytes.
+
+    Provides
+    --------
+     * __iter__: Generator of generators of the cell content of each line
+     * iter_batches: Generator of batches of rows of one block each
+     * get_progress: Returns the share of the file that has been read
+
+    """
+
+    # Number of bytes that are split at once
+    block_size = 2 ** 22
+
+    # Maximum cell content length in bytes of array batches, which is the
+    # width of the column storage of the grid (ColumnStore.max_width)
+    max_width = 64
 
     def __init__(self, main_window, path):
         self.main_window = main_window
+        self.path = path
+
+        # Number of bytes that have been read
+        self.offset = 0
+
         try:
-            self.infile = open(path)
+            self.size = os.path.getsize(path)
 
-        except IOError:
+        except OSError:
             statustext = "Error opening file " + path + "."
             post_command_event(self.main_window, self.StatusBarMsg,
                                text=statustext)
-            self.infile = None
+            self.size = None
 
     def __iter__(self):
+        for batch in self.iter_batches():
+            if isinstance(batch, numpy.ndarray):
+                batch = batch.tolist()
+
+            for row in batch:
+                yield (col for col in row)
 
-        # If self.infile is None then stopiteration is reached immediately
-        if self.infile is None:
+    def get_progress(self):
+        """Returns share of the file that has been read as float in [0, 1]"""
+
+        if not self.size:
+            return 1.0
+
+        return self.offset / float(self.size)
+
+    def _is_utf8(self, data):
+        """Returns True if the byte string data is UTF-8 encoded"""
+
+        try:
+            data.decode("utf-8")
+
+        except UnicodeDecodeError:
+            return False
+
+        return True
+
+    def iter_batches(self):
+        """Generator of batches of rows of cell content of one block each
+
+        A batch, in which all rows have the same number of cells, in which no
+        cell is longer than max_width bytes and which is UTF-8 encoded, is a
+        2D numpy byte string array. Such a batch can be inserted directly
+        into the column storage of the grid. Other batches are lists of
+        lists of strings.
+
+        """
+
+        self.offset = 0
+
+        # If the file is missing or empty then stopiteration is reached
+        if not self.size:
             return
 
-        for line in self.infile:
-            yield (col for col in line.split())
+        with open(self.path, "rb") as infile:
+            txt_map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
 
-        self.infile.close()
+            try:
+                while self.offset < self.size:
+                    end = min(self.offset + self.block_size, self.size)
+
+                    if end < self.size:
+                        # Only complete lines are split
+                        line_end = txt_map.rfind("\n", self.offset, end)
+                        if line_end == -1:
+                            line_end = txt_map.find("\n", end)
+                        end = self.size if line_end == -1 else line_end + 1
+
+                    data = txt_map[self.offset:end]
+                    self.offset = end
+
+                    rows = [line.split() for line in data.splitlines()]
+
+                    lengths = set(imap(len, rows))
+                    if len(lengths) == 1 and lengths != set([0]) and \
+                       max(imap(len, chain.from_iterable(rows))) <= \
+                       self.max_width and self._is_utf8(data):
+                        yield numpy.array(rows)
+                    else:
+                        yield rows
+
+            finally:
+                txt_map.close()
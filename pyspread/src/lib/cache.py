@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+Cache
+=====
+
+cache.py contains size bounded caches for the model.
+
+"""
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """Dict-like cache that evicts the least recently used items
+
+    The attributes hits and misses count successful and failed lookups
+    via __getitem__ and get.
+
+    Parameters
+    ----------
+    maxsize: Integer
+    \tMaximum number of items in the cache
+
+    """
+
+    def __init__(self, maxsize):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1")
+
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __getitem__(self, key):
+        """Returns value for key and marks key as most recently used"""
+
+        try:
+            value = self._data.pop(key)
+
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self._data[key] = value
+        self.hits += 1
+
+        return value
+
+    def __setitem__(self, key, value):
+        """Sets value for key and evicts the least recently used items"""
+
+        self._data.pop(key, None)
+        self._data[key] = value
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        """Returns value for key or default if key is not cached"""
+
+        try:
+            return self[key]
+
+        except KeyError:
+            return default
+
+    def pop(self, key, *args):
+        """Removes key and returns its value"""
+
+        return self._data.pop(key, *args)
+
+    def clear(self):
+        """Removes all items"""
+
+        self._data.clear()
+
+    def reset_counters(self):
+        """Sets hits and misses to 0"""
+
+        self.hits = 0
+        self.misses = 0
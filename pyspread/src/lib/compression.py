@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+
+compression
+===========
+
+This module provides the compression codecs of pyspread save files.
+
+Codecs compress the blocks of pys containers. Compressed streams and blocks
+are recognized by the magic bytes at their start.
+
+
+Provides
+--------
+
+ * Codec: Base class of compression codecs
+ * codecs: OrderedDict of the available codecs by name
+ * get_codec: Returns available codec by name
+ * detect_codec: Returns name of the codec that compressed data
+ * detect_file_codec: Returns name of the codec that compressed a file
+
+"""
+
+import bz2
+from collections import OrderedDict
+import zlib
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+import src.lib.i18n as i18n
+
+#use ugettext instead of getttext to avoid unicode errors
+_ = i18n.language.ugettext
+
+
+class Codec(object):
+    """Base class of compression codecs
+
+    Attributes
+    ----------
+
+    name: String
+    \tCodec name in the configuration and in pys container indices
+    magic: Tuple of String
+    \tByte strings that compressed data starts with
+    levels: 2-Tuple of Integer or None
+    \tLowest and highest compression level, None if there are no levels
+    default_level: Integer or None
+    \tCompression level that is used if no level is given
+
+    """
+
+    name = None
+    magic = ()
+    levels = None
+    default_level = None
+
+    def get_level(self, level=None):
+        """Returns level clipped to the codec levels, default if None"""
+
+        if self.levels is None:
+            return None
+
+        if level is None:
+            return self.default_level
+
+        return min(max(level, self.levels[0]), self.levels[1])
+
+    def compress(self, data, level=None):
+        """Returns compressed byte string data"""
+
+        raise NotImplementedError
+
+    def decompress(self, data):
+        """Returns decompressed byte string data"""
+
+        raise NotImplementedError
+
+
+class NoneCodec(Codec):
+    """Codec that leaves data uncompressed"""
+
+    name = "none"
+
+    def compress(self, data, level=None):
+        return data
+
+    def decompress(self, data):
+        return data
+
+
+class ZlibCodec(Codec):
+    """Codec for zlib streams, fast at low levels"""
+
+    name = "zlib"
+    magic = ("\x78\x01", "\x78\x5e", "\x78\x9c", "\x78\xda")
+    levels = (1, 9)
+    default_level = 6
+
+    def compress(self, data, level=None):
+        return zlib.compress(data, self.get_level(level))
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class GzipCodec(Codec):
+    """Codec for gzip streams, which are zlib streams with gzip header"""
+
+    name = "gzip"
+    magic = ("\x1f\x8b",)
+    levels = (1, 9)
+    default_level = 6
+
+    # zlib window bits that select the gzip header
+    wbits = 16 + zlib.MAX_WBITS
+
+    def compress(self, data, level=None):
+        compressor = zlib.compressobj(self.get_level(level), zlib.DEFLATED,
+                                      self.wbits)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data):
+        return zlib.decompress(data, self.wbits)
+
+
+class Bz2Codec(Codec):
+    """Codec for bz2 streams, small but slow"""
+
+    name = "bz2"
+    magic = ("BZh",)
+    levels = (1, 9)
+    default_level = 9
+
+    def compress(self, data, level=None):
+        return bz2.compress(data, self.get_level(level))
+
+    def decompress(self, data):
+        return bz2.decompress(data)
+
+
+class LzmaCodec(Codec):
+    """Codec for xz streams, smallest but slowest, requires lzma"""
+
+    name = "lzma"
+    magic = ("\xfd7zXZ\x00",)
+    levels = (0, 9)
+    default_level = 6
+
+    def compress(self, data, level=None):
+        return lzma.compress(data, preset=self.get_level(level))
+
+    def decompress(self, data):
+        return lzma.decompress(data)
+
+
+codecs = OrderedDict((codec.name, codec) for codec in (
+    NoneCodec(), ZlibCodec(), GzipCodec(), Bz2Codec()))
+
+if lzma is not None:
+    codecs["lzma"] = LzmaCodec()
+
+# Longest magic byte string of all codecs including unavailable ones
+MAGIC_LENGTH = max(len(magic) for codec in (ZlibCodec, GzipCodec, Bz2Codec,
+                                            LzmaCodec)
+                   for magic in codec.magic)
+
+
+def get_codec(name):
+    """Returns codec by name, raises ValueError if it is unavailable"""
+
+    try:
+        return codecs[name]
+
+    except KeyError:
+        msg = _("Compression {codec} unsupported.").format(codec=name)
+        raise ValueError(msg)
+
+
+def detect_codec(data):
+    """Returns name of the codec that compressed data, "none" if unknown
+
+    Codecs that are unavailable in this Python build are detected, too.
+    get_codec raises ValueError for them.
+
+    Parameters
+    ----------
+    data: String
+    \tCompressed data, only the first MAGIC_LENGTH bytes are considered
+
+    """
+
+    for codec in (GzipCodec, Bz2Codec, LzmaCodec, ZlibCodec):
+        if data.startswith(codec.magic):
+            return codec.name
+
+    return "none"
+
+
+def detect_file_codec(filepath):
+    """Returns name of the codec that compressed the file at filepath"""
+
+    with open(filepath, "rb") as infile:
+        return detect_codec(infile.read(MAGIC_LENGTH))
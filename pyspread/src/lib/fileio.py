@@ -32,15 +32,20 @@ Provides
 --------
 
  * AOpen: Read and write files with status messages and abort option
+ * Bz2AOpen: AOpen for bz2 compressed files
+ * GzipAOpen: AOpen for gzip compressed files
+ * LzmaAOpen: AOpen for xz compressed files, None if lzma is unavailable
 
 """
 
 import bz2
+import gzip
 import i18n
 
 import wx
 
-from src.gui._events import post_command_event
+from src.gui._events import post_command_event, DeadObjectError
+from src.lib.compression import lzma
 from src.sysvars import is_gtk
 
 #use ugettext instead of getttext to avoid unicode errors
@@ -82,8 +87,12 @@ class AOpenMixin(object):
         # Line counter
         self.line = 0
 
+        # Files in worker threads must not access the GUI directly
+        self.background = kwargs.pop("background", False)
+
         # Bindings
-        self.main_window.Bind(wx.EVT_KEY_DOWN, self.on_key)
+        if not self.background:
+            self.main_window.Bind(wx.EVT_KEY_DOWN, self.on_key)
 
     def next(self):
 
@@ -121,12 +130,12 @@ class AOpenMixin(object):
             text = self.statustext.format(nele=self.line,
                                           totalele=self.total_lines)
 
-            if self.main_window.grid.actions.pasting:
+            if self.background or self.main_window.grid.actions.pasting:
                 try:
                     post_command_event(self.main_window,
                                        self.main_window.StatusBarMsg,
                                        text=text)
-                except TypeError:
+                except (TypeError, DeadObjectError):
                     # The main window does not exist any more
                     pass
             else:
@@ -136,7 +145,7 @@ class AOpenMixin(object):
                 self.main_window.GetStatusBar().SetStatusText(text)
 
             # Now wait for the statusbar update to be written on screen
-            if is_gtk():
+            if is_gtk() and not self.background:
                 try:
                     wx.Yield()
                 except:
@@ -147,7 +156,9 @@ class AOpenMixin(object):
     def on_key(self, event):
         """Sets aborted state if escape is pressed"""
 
-        if self.main_window.grid.actions.pasting and \
+        actions = self.main_window.grid.actions
+
+        if (actions.pasting or actions.saving or actions.exporting) and \
            event.GetKeyCode() == wx.WXK_ESCAPE:
             self.aborted = True
 
@@ -168,6 +179,9 @@ class AOpen(AOpenMixin, file):
     \tThe number of elements that have to be processed
     freq: Integer, defaults to 1000
     \tNo. operations between two abort possibilities
+    background: Bool, defaults to False
+    \tIf True then progress is only posted as event, which is thread safe.
+    \tSuch files are used in worker threads and cannot be aborted.
 
     """
 
@@ -194,6 +208,9 @@ class Bz2AOpen(AOpenMixin, bz2.BZ2File):
     \tThe number of elements that have to be processed
     freq: Integer, defaults to 1000
     \tNo. operations between two abort possibilities
+    background: Bool, defaults to False
+    \tIf True then progress is only posted as event, which is thread safe.
+    \tSuch files are used in worker threads and cannot be aborted.
 
     """
 
@@ -204,3 +221,65 @@ class Bz2AOpen(AOpenMixin, bz2.BZ2File):
         self.set_initial_state(kwargs)
 
         bz2.BZ2File.__init__(self, *args, **kwargs)
+
+
+class GzipAOpen(AOpenMixin, gzip.GzipFile):
+    """Read and write gzip files with status messages and abort option
+
+    Extra Key Word Parameters (extends open)
+    ----------------------------------------
+
+    main_window: Object
+    \tMain window object, must be set
+    statustext: String, defaults to ""
+    \tLeft text in statusbar to be displayed
+    total_lines: Integer, defaults to None
+    \tThe number of elements that have to be processed
+    freq: Integer, defaults to 1000
+    \tNo. operations between two abort possibilities
+    background: Bool, defaults to False
+    \tIf True then progress is only posted as event, which is thread safe.
+    \tSuch files are used in worker threads and cannot be aborted.
+
+    """
+
+    parent_cls = gzip.GzipFile
+
+    def __init__(self, *args, **kwargs):
+
+        self.set_initial_state(kwargs)
+
+        gzip.GzipFile.__init__(self, *args, **kwargs)
+
+
+if lzma is None:
+    LzmaAOpen = None
+
+else:
+    class LzmaAOpen(AOpenMixin, lzma.LZMAFile):
+        """Read and write xz files with status messages and abort option
+
+        Extra Key Word Parameters (extends open)
+        ----------------------------------------
+
+        main_window: Object
+        \tMain window object, must be set
+        statustext: String, defaults to ""
+        \tLeft text in statusbar to be displayed
+        total_lines: Integer, defaults to None
+        \tThe number of elements that have to be processed
+        freq: Integer, defaults to 1000
+        \tNo. operations between two abort possibilities
+        background: Bool, defaults to False
+        \tIf True then progress is only posted as event, which is thread
+        \tsafe. Such files are used in worker threads and cannot be aborted.
+
+        """
+
+        parent_cls = lzma.LZMAFile
+
+        def __init__(self, *args, **kwargs):
+
+            self.set_initial_state(kwargs)
+
+            lzma.LZMAFile.__init__(self, *args, **kwargs)
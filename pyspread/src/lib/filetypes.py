@@ -62,11 +62,6 @@ try:
 except ImportError:
     cairo = None
 
-try:
-    import odf
-except ImportError:
-    odf = None
-
 import src.lib.i18n as i18n
 # use ugettext instead of gettext to avoid unicode errors
 _ = i18n.language.ugettext
@@ -94,7 +89,6 @@ FILETYPE_AVAILABILITY = {
     "xlsx": xlrd is not None,
     "pdf": cairo is not None,
     "svg": cairo is not None,
-    "ods": odf is not None
 }
 
 
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+ods_reader
+==========
+
+Streaming reader for the cell text of OpenDocument spreadsheet files
+
+The content.xml member of the ods zip file is fed in chunks into an
+incremental expat parser with SAX style callbacks. Cells are yielded while
+parsing so that the document tree is never built. Repeated empty rows and
+columns only advance counters.
+
+Provides
+--------
+
+ * OdsContentHandler: Parser callbacks that collect non-empty cells
+ * OdsReader: Iterable of cell keys and cell text of an ods file
+
+"""
+
+from contextlib import closing
+from xml.parsers import expat
+import zipfile
+
+OFFICE_NS = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+TABLE_NS = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+TEXT_NS = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+# Expat joins namespace and local name with this separator
+NS_SEPARATOR = " "
+
+
+def _qualify(namespace, localname):
+    """Returns name of element or attribute as reported by expat"""
+
+    return namespace + NS_SEPARATOR + localname
+
+
+def _get_count(attrs, name):
+    """Returns positive count of attribute name in attrs, 1 if missing
+
+    Raises ValueError if the attribute is no positive integer.
+
+    """
+
+    value = attrs.get(name, 1)
+
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        count = 0
+
+    if count < 1:
+        localname = name.split(NS_SEPARATOR)[-1]
+        raise ValueError("Invalid {} value {!r}".format(localname, value))
+
+    return count
+
+
+ANNOTATION = _qualify(OFFICE_NS, "annotation")
+TABLE = _qualify(TABLE_NS, "table")
+TABLE_ROW = _qualify(TABLE_NS, "table-row")
+CELLS = _qualify(TABLE_NS, "table-cell"), \
+    _qualify(TABLE_NS, "covered-table-cell")
+PARAGRAPHS = _qualify(TEXT_NS, "p"), _qualify(TEXT_NS, "h")
+SPACE = _qualify(TEXT_NS, "s")
+TAB = _qualify(TEXT_NS, "tab")
+LINE_BREAK = _qualify(TEXT_NS, "line-break")
+
+TABLE_NAME = _qualify(TABLE_NS, "name")
+ROWS_REPEATED = _qualify(TABLE_NS, "number-rows-repeated")
+COLS_REPEATED = _qualify(TABLE_NS, "number-columns-repeated")
+SPACE_COUNT = _qualify(TEXT_NS, "c")
+
+
+class OdsContentHandler(object):
+    """Parser callbacks for ods content.xml that collect non-empty cells
+
+    The text of the paragraphs of each cell is joined by newlines.
+    Annotations are ignored as are cells that start with #.
+    Collected cells are appended to the list cells as (key, text) tuples.
+
+    """
+
+    def __init__(self):
+        self.cells = []
+        self.table_names = []
+
+        # Number of rows and columns that contain non-empty cells
+        self.no_rows = 0
+        self.no_cols = 0
+
+        self.tab = -1
+        self.row = 0
+        self.col = 0
+        self.rows_repeated = 1
+        self.cols_repeated = 1
+
+        # (col, text) tuples of the current row
+        self.row_cells = []
+
+        # Paragraph texts of the current cell, None outside of cells
+        self.paragraphs = None
+
+        # Text fragments of the current paragraph, None outside of paragraphs
+        self.fragments = None
+
+        self.annotation_depth = 0
+
+    def get_parser(self):
+        """Returns incremental expat parser that calls the handler methods"""
+
+        parser = expat.ParserCreate(namespace_separator=NS_SEPARATOR)
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start_element
+        parser.EndElementHandler = self.end_element
+        parser.CharacterDataHandler = self.characters
+
+        return parser
+
+    def start_element(self, name, attrs):
+        """Handles start of element name with attribute dict attrs"""
+
+        if name in CELLS:
+            self.paragraphs = []
+            self.cols_repeated = _get_count(attrs, COLS_REPEATED)
+
+        elif name == TABLE_ROW:
+            self.col = 0
+            self.row_cells = []
+            self.rows_repeated = _get_count(attrs, ROWS_REPEATED)
+
+        elif self.paragraphs is None:
+            if name == TABLE:
+                self.tab += 1
+                self.row = 0
+                self.table_names.append(attrs.get(TABLE_NAME, u""))
+
+        elif name == ANNOTATION:
+            self.annotation_depth += 1
+
+        elif self.annotation_depth:
+            pass
+
+        elif name in PARAGRAPHS:
+            self.fragments = []
+
+        elif self.fragments is None:
+            pass
+
+        elif name == SPACE:
+            self.fragments.append(u" " * _get_count(attrs, SPACE_COUNT))
+
+        elif name == TAB:
+            self.fragments.append(u"\t")
+
+        elif name == LINE_BREAK:
+            self.fragments.append(u"\n")
+
+    def end_element(self, name):
+        """Handles end of element name"""
+
+        if name in CELLS:
+            self._end_cell()
+
+        elif name == TABLE_ROW:
+            self._end_row()
+
+        elif name == ANNOTATION:
+            self.annotation_depth -= 1
+
+        elif name in PARAGRAPHS and self.fragments is not None and \
+                not self.annotation_depth:
+            self.paragraphs.append(u"".join(self.fragments))
+            self.fragments = None
+
+    def characters(self, content):
+        """Handles character data content"""
+
+        if self.fragments is not None and not self.annotation_depth:
+            self.fragments.append(content)
+
+    def _end_cell(self):
+        """Stores text of the finished cell for each repeated column"""
+
+        paragraphs = self.paragraphs
+        self.paragraphs = None
+
+        if paragraphs:
+            text = u"\n".join(paragraphs)
+
+            if text and text[0] != "#":
+                for col in xrange(self.col, self.col + self.cols_repeated):
+                    self.row_cells.append((col, text))
+
+        self.col += self.cols_repeated
+
+    def _end_row(self):
+        """Collects cells of the finished row for each repeated row"""
+
+        row_cells = self.row_cells
+
+        if row_cells:
+            tab = self.tab
+            for row in xrange(self.row, self.row + self.rows_repeated):
+                self.cells.extend(((row, col, tab), text)
+                                  for col, text in row_cells)
+
+            self.no_rows = max(self.no_rows, self.row + self.rows_repeated)
+            self.no_cols = max(self.no_cols, row_cells[-1][0] + 1)
+
+        self.row += self.rows_repeated
+        self.row_cells = []
+
+
+class OdsReader(object):
+    """Iterable of ((row, col, tab), text) for the non-empty cells of ods file
+
+    After iteration, shape holds the grid shape that contains all cells and
+    table_names holds the names of all tables.
+
+    Parameters
+    ----------
+    ods_file: File or String
+    \tFile like object or path of ods file
+
+    """
+
+    chunk_size = 2 ** 16
+
+    def __init__(self, ods_file):
+        self.ods_file = ods_file
+
+        self.shape = None
+        self.table_names = None
+
+    def __iter__(self):
+        handler = OdsContentHandler()
+        parser = handler.get_parser()
+
+        with closing(zipfile.ZipFile(self.ods_file)) as ods_zip:
+            with closing(ods_zip.open("content.xml")) as content_file:
+                while True:
+                    data = content_file.read(self.chunk_size)
+                    if not data:
+                        break
+
+                    parser.Parse(data, False)
+
+                    cells = handler.cells
+                    handler.cells = []
+                    for cell in cells:
+                        yield cell
+
+                parser.Parse("", True)
+
+        for cell in handler.cells:
+            yield cell
+
+        handler.cells = []
+
+        self.table_names = handler.table_names
+        self.shape = (max(1, handler.no_rows), max(1, handler.no_cols),
+                      max(1, len(handler.table_names)))
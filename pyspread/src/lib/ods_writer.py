@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright Martin Manns
+# Distributed under the terms of the GNU General Public License
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+"""
+ods_writer
+==========
+
+Streaming writer for OpenDocument spreadsheet files
+
+Rows are written to a temporary file while the tables are filled. Runs of
+equal empty cells and of equal rows are written once with a repeat count.
+Cell styles are deduplicated. Because automatic styles have to precede the
+tables in content.xml, the content.xml zip entry is deflated on close from
+the automatic styles followed by the rows of the temporary file.
+
+Provides
+--------
+
+ * ZipEntryWriter: File like object that deflates one zip entry while writing
+ * get_text_xml: Returns text:p elements for multi-line cell text
+ * OdsWriter: Writes tables row by row into an ods file
+
+"""
+
+from functools import partial
+import re
+import struct
+import tempfile
+import time
+from xml.sax.saxutils import escape, quoteattr
+import zipfile
+import zlib
+
+MIMETYPE = "application/vnd.oasis.opendocument.spreadsheet"
+
+NAMESPACES = \
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" ' \
+    'xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0" ' \
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" ' \
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" ' \
+    'xmlns:fo="urn:oasis:names:tc:opendocument:xmlns:' \
+    'xsl-fo-compatible:1.0" ' \
+    'office:version="1.2"'
+
+MANIFEST = \
+    '<?xml version="1.0" encoding="UTF-8"?>\n' \
+    '<manifest:manifest xmlns:manifest=' \
+    '"urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" ' \
+    'manifest:version="1.2">' \
+    '<manifest:file-entry manifest:full-path="/" manifest:version="1.2" ' \
+    'manifest:media-type="{mimetype}"/>' \
+    '<manifest:file-entry manifest:full-path="content.xml" ' \
+    'manifest:media-type="text/xml"/>' \
+    '<manifest:file-entry manifest:full-path="styles.xml" ' \
+    'manifest:media-type="text/xml"/>' \
+    '</manifest:manifest>'.format(mimetype=MIMETYPE)
+
+SPACES_REGEX = re.compile(u" +")
+
+# Order of style property elements as required by the OpenDocument schema
+PROPERTY_ELEMENTS = [
+    "style:table-column-properties",
+    "style:table-row-properties",
+    "style:table-cell-properties",
+    "style:paragraph-properties",
+    "style:text-properties",
+]
+
+
+class ZipEntryWriter(object):
+    """File like object that deflates one zip entry while it is written
+
+    The sizes and the CRC of the entry are written in a data descriptor
+    after the data. Therefore, the entry is never held in memory.
+    No other entry may be written to zip_file before close is called.
+
+    Parameters
+    ----------
+    zip_file: zipfile.ZipFile
+    \tZip file in write mode
+    name: String
+    \tName of the zip entry
+
+    """
+
+    def __init__(self, zip_file, name):
+        self.zip_file = zip_file
+
+        zinfo = zipfile.ZipInfo(name, time.localtime()[:6])
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo.external_attr = 0600 << 16
+        zinfo.flag_bits |= 0x08  # Sizes and CRC follow the data
+        zinfo.header_offset = zip_file.fp.tell()
+        zinfo.CRC = zinfo.compress_size = zinfo.file_size = 0
+        self.zinfo = zinfo
+
+        zip_file.fp.write(zinfo.FileHeader(zip64=False))
+
+        self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION,
+                                           zlib.DEFLATED, -15)
+
+    def write(self, data):
+        """Deflates data into the zip entry, unicode is utf-8 encoded"""
+
+        if isinstance(data, unicode):
+            data = data.encode("utf-8")
+
+        zinfo = self.zinfo
+
+        zinfo.CRC = zlib.crc32(data, zinfo.CRC) & 0xffffffff
+        zinfo.file_size += len(data)
+
+        compressed_data = self.compressor.compress(data)
+        zinfo.compress_size += len(compressed_data)
+        self.zip_file.fp.write(compressed_data)
+
+    def close(self):
+        """Finishes the entry and adds it to the zip file directory"""
+
+        zinfo = self.zinfo
+
+        compressed_data = self.compressor.flush()
+        zinfo.compress_size += len(compressed_data)
+        self.zip_file.fp.write(compressed_data)
+
+        if zinfo.file_size > zipfile.ZIP64_LIMIT or \
+           zinfo.compress_size > zipfile.ZIP64_LIMIT:
+            raise zipfile.LargeZipFile("Zip entry exceeds 4 GB")
+
+        self.zip_file.fp.write(struct.pack("<4sLLL", "PK\x07\x08", zinfo.CRC,
+                                           zinfo.compress_size,
+                                           zinfo.file_size))
+
+        self.zip_file.filelist.append(zinfo)
+        self.zip_file.NameToInfo[zinfo.filename] = zinfo
+
+
+def get_text_xml(text):
+    """Returns text:p elements for each line of unicode text
+
+    Spaces that XML would collapse and tabs are written as elements.
+
+    Parameters
+    ----------
+    text: Unicode
+    \tCell text, lines are separated by newlines
+
+    """
+
+    def space_xml(match):
+        """Returns xml for a run of spaces"""
+
+        spaces = match.group()
+        if match.start() == 0:
+            return u'<text:s text:c="{}"/>'.format(len(spaces))
+
+        if len(spaces) == 1:
+            return spaces
+
+        return u' <text:s text:c="{}"/>'.format(len(spaces) - 1)
+
+    paragraphs = []
+
+    for line in text.split(u"\n"):
+        line = escape(line)
+
+        # Single spaces within the line are kept as they are
+        if u"  " in line or line.startswith(u" "):
+            line = SPACES_REGEX.sub(space_xml, line)
+
+        if u"\t" in line:
+            line = line.replace(u"\t", u"<text:tab/>")
+
+        paragraphs.append(u"<text:p>{}</text:p>".format(line))
+
+    return u"".join(paragraphs)
+
+
+class OdsWriter(object):
+    """Writes tables row by row into an ods file
+
+    Tables are started with start_table, filled with write_row and finished
+    with end_table. close writes the file.
+
+    Styles are tuples of (element, attribute, value) triples, e.g.
+    ("style:text-properties", "fo:font-weight", "bold").
+
+    Parameters
+    ----------
+    ods_file: File or String
+    \tFile like object or path of target ods file
+    automatic_styles: List of 3-tuples, defaults to []
+    \tName, family and properties of automatic column and row styles
+
+    """
+
+    # Number of bytes that are copied at once from the temporary file
+    copy_size = 2 ** 20
+
+    def __init__(self, ods_file, automatic_styles=None):
+        self.zip_file = zipfile.ZipFile(ods_file, "w", zipfile.ZIP_DEFLATED)
+
+        # The mimetype has to be the first, uncompressed entry
+        self.zip_file.writestr(zipfile.ZipInfo("mimetype"), MIMETYPE)
+
+        self.automatic_styles = automatic_styles or []
+
+        # Maps cell style properties to style name
+        self.cell_styles = {}
+
+        # Last row xml and number of its repetitions that are not written yet
+        self.row_xml = None
+        self.row_repeat = 0
+
+        # Tables xml until the styles are known on close
+        self.tables_file = tempfile.TemporaryFile()
+
+    def _write(self, xml):
+        """Writes tables xml into the temporary file, unicode is encoded"""
+
+        self.tables_file.write(xml.encode("utf-8"))
+
+    def _get_style_xml(self, name, family, properties):
+        """Returns style:style element xml"""
+
+        element2attributes = {}
+        for element, attribute, value in properties:
+            element2attributes.setdefault(element, []).append(
+                u"{}={}".format(attribute, quoteattr(unicode(value))))
+
+        property_xml = u"".join(
+            u"<{} {}/>".format(element, u" ".join(element2attributes[element]))
+            for element in PROPERTY_ELEMENTS if element in element2attributes)
+
+        return u'<style:style style:name="{}" style:family="{}">{}' \
+               u'</style:style>'.format(name, family, property_xml)
+
+    def get_cell_style(self, properties):
+        """Returns name of cell style with properties, which is created once
+
+        Parameters
+        ----------
+        properties: Tuple of 3-tuples
+        \tStyle properties as (element, attribute, value)
+
+        """
+
+        try:
+            return self.cell_styles[properties]
+
+        except KeyError:
+            name = "ce{}".format(len(self.cell_styles) + 1)
+            self.cell_styles[properties] = name
+            return name
+
+    def start_table(self, name, columns):
+        """Starts table
+
+        Parameters
+        ----------
+        name: Unicode
+        \tTable name
+        columns: Iterable of 2-tuples
+        \tColumn style name or None and number of columns with this style
+
+        """
+
+        self._write(u"<table:table table:name={}>".format(quoteattr(name)))
+
+        for style_name, repeat in columns:
+            attributes = u""
+            if style_name is not None:
+                attributes += u' table:style-name="{}"'.format(style_name)
+            if repeat > 1:
+                attributes += \
+                    u' table:number-columns-repeated="{}"'.format(repeat)
+            self._write(u"<table:table-column{}/>".format(attributes))
+
+    def write_row(self, cells, no_cols, style_name=None, repeat=1):
+        """Writes row, equal consecutive rows are merged
+
+        Parameters
+        ----------
+        cells: Iterable of 4-tuples
+        \tCells as (col, text, value, style_name) ordered by col
+        \ttext is unicode or None, value is a float string or None
+        no_cols: Integer
+        \tNumber of columns of the table
+        style_name: String, defaults to None
+        \tName of row style
+        repeat: Integer, defaults to 1
+        \tNumber of equal rows
+
+        """
+
+        row_xml = self._get_row_xml(cells, no_cols, style_name)
+
+        if row_xml == self.row_xml:
+            self.row_repeat += repeat
+        else:
+            self._flush_rows()
+            self.row_xml = row_xml
+            self.row_repeat = repeat
+
+    def _get_row_xml(self, cells, no_cols, style_name):
+        """Returns cells xml of row and row style name"""
+
+        xml = []
+        next_col = 0
+
+        # Pending run of empty cells as [style_name, repeat]
+        empty_run = [None, 0]
+
+        def flush_empty_run():
+            """Writes pending run of empty cells"""
+
+            run_style, run_repeat = empty_run
+            if run_repeat:
+                xml.append(self._get_cell_xml(None, None, run_style,
+                                              run_repeat))
+            empty_run[:] = [None, 0]
+
+        for col, text, value, cell_style in cells:
+            if col > next_col:
+                if empty_run[0] is not None:
+                    flush_empty_run()
+                empty_run[1] += col - next_col
+
+            if text is None:
+                if empty_run[1] and empty_run[0] != cell_style:
+                    flush_empty_run()
+                empty_run[0] = cell_style
+                empty_run[1] += 1
+
+            else:
+                flush_empty_run()
+                xml.append(self._get_cell_xml(text, value, cell_style, 1))
+
+            next_col = col + 1
+
+        if next_col < no_cols:
+            if empty_run[0] is not None:
+                flush_empty_run()
+            empty_run[1] += no_cols - next_col
+
+        flush_empty_run()
+
+        return style_name, u"".join(xml)
+
+    def _get_cell_xml(self, text, value, style_name, repeat):
+        """Returns table:table-cell element xml"""
+
+        attributes = u""
+
+        if style_name is not None:
+            attributes += u' table:style-name="{}"'.format(style_name)
+
+        if repeat > 1:
+            attributes += u' table:number-columns-repeated="{}"'.format(repeat)
+
+        if text is None:
+            return u"<table:table-cell{}/>".format(attributes)
+
+        if value is None:
+            attributes += u' office:value-type="string"'
+        else:
+            attributes += u' office:value-type="float" office:value="{}"'\
+                .format(value)
+
+        return u"<table:table-cell{}>{}</table:table-cell>".format(
+            attributes, get_text_xml(text))
+
+    def _flush_rows(self):
+        """Writes pending rows"""
+
+        if not self.row_repeat:
+            return
+
+        style_name, cells_xml = self.row_xml
+
+        attributes = u""
+        if style_name is not None:
+            attributes += u' table:style-name="{}"'.format(style_name)
+        if self.row_repeat > 1:
+            attributes += \
+                u' table:number-rows-repeated="{}"'.format(self.row_repeat)
+
+        self._write(u"<table:table-row{}>{}</table:table-row>".format(
+            attributes, cells_xml))
+
+        self.row_xml = None
+        self.row_repeat = 0
+
+    def end_table(self):
+        """Finishes table"""
+
+        self._flush_rows()
+        self._write(u"</table:table>")
+
+    def close(self):
+        """Writes content.xml with all styles, styles.xml and manifest"""
+
+        content = ZipEntryWriter(self.zip_file, "content.xml")
+        content.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<office:document-content {}>'
+            '<office:automatic-styles>'.format(NAMESPACES))
+
+        for name, family, properties in self.automatic_styles:
+            content.write(self._get_style_xml(name, family, properties))
+
+        for properties, name in sorted(self.cell_styles.iteritems(),
+                                       key=lambda item: int(item[1][2:])):
+            content.write(self._get_style_xml(name, "table-cell",
+                                              properties))
+
+        content.write('</office:automatic-styles>'
+                      '<office:body><office:spreadsheet>')
+
+        self.tables_file.seek(0)
+        for data in iter(partial(self.tables_file.read, self.copy_size), ""):
+            content.write(data)
+        self.tables_file.close()
+
+        content.write('</office:spreadsheet></office:body>'
+                      '</office:document-content>')
+        content.close()
+
+        self.zip_file.writestr("styles.xml",
+                               '<?xml version="1.0" encoding="UTF-8"?>\n'
+                               '<office:document-styles {}/>'
+                               .format(NAMESPACES))
+        self.zip_file.writestr("META-INF/manifest.xml", MANIFEST)
+
+        self.zip_file.close()
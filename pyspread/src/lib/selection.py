@@ -378,6 +378,45 @@ class Selection(object):
 
         return ((bb_top, bb_left), (bb_bottom, bb_right))
 
+    def get_grid_blocks(self, shape):
+        """Generator of (top, left, bottom, right) blocks that cover selection
+
+        Open block edges, rows and columns are limited by shape. Blocks
+        outside of shape are omitted. Blocks may overlap.
+
+        Parameters
+        ----------
+
+        shape: 2-Tuple or 3-Tuple of Integer
+        \tGrid shape, only rows and columns are used
+
+        """
+
+        rows, cols = shape[:2]
+
+        blocks = []
+
+        for (top, left), (bottom, right) in izip(self.block_tl, self.block_br):
+            blocks.append((top, left, bottom, right))
+
+        for row in self.rows:
+            blocks.append((row, None, row, None))
+
+        for col in self.cols:
+            blocks.append((None, col, None, col))
+
+        for cell_row, cell_col in self.cells:
+            blocks.append((cell_row, cell_col, cell_row, cell_col))
+
+        for top, left, bottom, right in blocks:
+            top = 0 if top is None else max(0, top)
+            left = 0 if left is None else max(0, left)
+            bottom = rows - 1 if bottom is None else min(rows - 1, bottom)
+            right = cols - 1 if right is None else min(cols - 1, right)
+
+            if top <= bottom and left <= right:
+                yield top, left, bottom, right
+
     def get_access_string(self, shape, table):
         """Returns a string, with which the selection can be accessed
 
@@ -476,3 +515,231 @@ class Selection(object):
         for cell in self.cells:
             grid.SelectBlock(cell[0], cell[1], cell[0], cell[1],
                              addToSelected=True)
+
+
+def merge_intervals(intervals):
+    """Returns sorted list of merged, inclusive (start, stop) intervals
+
+    Overlapping and adjacent intervals are merged into one interval.
+
+    Parameters
+    ----------
+
+    intervals: Iterable of 2-tuples of Integer
+    \tInclusive (start, stop) intervals
+
+    """
+
+    merged = []
+
+    for start, stop in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if stop > merged[-1][1]:
+                merged[-1] = merged[-1][0], stop
+        else:
+            merged.append((start, stop))
+
+    return merged
+
+
+def get_row_intervals(blocks):
+    """Generator of (top, bottom, col_intervals) for the union of blocks
+
+    The rows from top to bottom share the same merged column intervals.
+    Only rows that are covered by blocks are yielded. Therefore, the cells
+    of the union can be walked without expanding the blocks.
+
+    Parameters
+    ----------
+
+    blocks: Iterable of 4-tuples of Integer
+    \tInclusive (top, left, bottom, right) blocks as from get_grid_blocks
+
+    """
+
+    blocks = sorted(blocks)
+
+    boundaries = sorted(set([block[0] for block in blocks] +
+                            [block[2] + 1 for block in blocks]))
+
+    active = []
+    block_idx = 0
+
+    for top, next_top in izip(boundaries, boundaries[1:]):
+        while block_idx < len(blocks) and blocks[block_idx][0] <= top:
+            active.append(blocks[block_idx])
+            block_idx += 1
+
+        active = [block for block in active if block[2] >= top]
+
+        if active:
+            col_intervals = merge_intervals((left, right)
+                                            for __, left, __, right in active)
+            yield top, next_top - 1, col_intervals
+
+
+class SelectionIndex(object):
+    """Spatial index of Selections for looking up the ones that contain a cell
+
+    Selections are added with an integer id, e.g. their position in a list.
+    get_ids returns the sorted ids of all Selections that contain a cell.
+
+    Rows, columns and single cells are kept in dicts. Blocks are kept in
+    buckets on two levels of granularity per axis. A block that spans n rows
+    is stored on the row level log2(n), on which it touches at most two
+    buckets. Each lookup therefore visits one bucket per occupied level pair
+    instead of all Selections.
+
+    """
+
+    # Open block edges (None) are indexed as this value
+    max_index = 2 ** 32
+
+    def __init__(self):
+        self.rows = {}
+        self.cols = {}
+        self.cells = {}
+
+        # Maps (row_level, col_level) to dict of bucket to block list
+        self.blocks = {}
+
+        # Maps id to Selection
+        self.selections = {}
+
+    def __len__(self):
+        return len(self.selections)
+
+    def __contains__(self, sel_id):
+        return sel_id in self.selections
+
+    def _get_blocks(self, selection):
+        """Generator of (top, left, bottom, right) with open edges replaced"""
+
+        max_index = self.max_index
+
+        for (top, left), (bottom, right) in izip(selection.block_tl,
+                                                 selection.block_br):
+            if top is None:
+                top = 0
+
+            if left is None:
+                left = 0
+
+            if bottom is None:
+                bottom = max_index
+
+            if right is None:
+                right = max_index
+
+            yield top, left, bottom, right
+
+    def _get_buckets(self, block):
+        """Returns level pair and list of buckets that block touches"""
+
+        top, left, bottom, right = block
+
+        row_level = max(0, bottom - top).bit_length()
+        col_level = max(0, right - left).bit_length()
+
+        buckets = [(row_bucket, col_bucket)
+                   for row_bucket in xrange(top >> row_level,
+                                            (bottom >> row_level) + 1)
+                   for col_bucket in xrange(left >> col_level,
+                                            (right >> col_level) + 1)]
+
+        return (row_level, col_level), buckets
+
+    def add(self, sel_id, selection):
+        """Adds selection to index
+
+        Parameters
+        ----------
+        sel_id: Integer
+        \tId that is returned by get_ids for cells in selection
+        selection: Selection
+        \tSelection that is indexed
+
+        """
+
+        if sel_id in self.selections:
+            self.remove(sel_id)
+
+        self.selections[sel_id] = selection
+
+        for block in self._get_blocks(selection):
+            levels, buckets = self._get_buckets(block)
+            level_buckets = self.blocks.setdefault(levels, {})
+            for bucket in buckets:
+                level_buckets.setdefault(bucket, []).append((sel_id, block))
+
+        for row in selection.rows:
+            self.rows.setdefault(row, []).append(sel_id)
+
+        for col in selection.cols:
+            self.cols.setdefault(col, []).append(sel_id)
+
+        for cell in selection.cells:
+            self.cells.setdefault(tuple(cell), []).append(sel_id)
+
+    def remove(self, sel_id):
+        """Removes the selection with id sel_id from index"""
+
+        def remove_from(index_dict, key):
+            """Removes sel_id from list index_dict[key]"""
+
+            ids = index_dict[key]
+            ids.remove(sel_id)
+            if not ids:
+                del index_dict[key]
+
+        selection = self.selections.pop(sel_id)
+
+        for block in self._get_blocks(selection):
+            levels, buckets = self._get_buckets(block)
+            level_buckets = self.blocks.get(levels, {})
+            for bucket in buckets:
+                entries = [entry for entry in level_buckets.get(bucket, ())
+                           if entry[0] != sel_id]
+                if entries:
+                    level_buckets[bucket] = entries
+                else:
+                    level_buckets.pop(bucket, None)
+
+            if not level_buckets:
+                self.blocks.pop(levels, None)
+
+        for row in selection.rows:
+            remove_from(self.rows, row)
+
+        for col in selection.cols:
+            remove_from(self.cols, col)
+
+        for cell in selection.cells:
+            remove_from(self.cells, tuple(cell))
+
+    def get_ids(self, row, col):
+        """Returns sorted list of ids of the Selections that contain cell
+
+        Parameters
+        ----------
+        row: Integer
+        \tRow of cell
+        col: Integer
+        \tColumn of cell
+
+        """
+
+        ids = set()
+
+        for (row_level, col_level), level_buckets in self.blocks.iteritems():
+            bucket = row >> row_level, col >> col_level
+            for sel_id, (top, left, bottom, right) in \
+                    level_buckets.get(bucket, ()):
+                if top <= row <= bottom and left <= col <= right:
+                    ids.add(sel_id)
+
+        ids.update(self.rows.get(row, ()))
+        ids.update(self.cols.get(col, ()))
+        ids.update(self.cells.get((row, col), ()))
+
+        return sorted(ids)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for cache.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import os
+import sys
+
+import py.test as pytest
+
+TESTPATH = os.sep.join(os.path.realpath(__file__).split(os.sep)[:-1]) + os.sep
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 3)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
+
+from src.lib.cache import LRUCache
+
+
+class TestLRUCache(object):
+    """Unit tests for LRUCache"""
+
+    def setup_method(self, method):
+        """Creates LRUCache with three slots"""
+
+        self.cache = LRUCache(3)
+
+    def test_init(self):
+        """Unit test for __init__"""
+
+        with pytest.raises(ValueError):
+            LRUCache(0)
+
+    def test_setitem_getitem(self):
+        """Unit test for __setitem__ and __getitem__"""
+
+        self.cache["a"] = 1
+        assert self.cache["a"] == 1
+        assert len(self.cache) == 1
+
+        with pytest.raises(KeyError):
+            self.cache["b"]
+
+    def test_eviction(self):
+        """Least recently used items are evicted first"""
+
+        for i, key in enumerate("abc"):
+            self.cache[key] = i
+
+        # Mark a as recently used so that b is evicted
+        self.cache["a"]
+        self.cache["d"] = 3
+
+        assert len(self.cache) == 3
+        assert "b" not in self.cache
+        assert sorted(self.cache) == ["a", "c", "d"]
+
+    def test_get_pop_clear(self):
+        """Unit test for get, pop and clear"""
+
+        self.cache["a"] = 1
+
+        assert self.cache.get("a") == 1
+        assert self.cache.get("b", 2) == 2
+        assert self.cache.pop("a") == 1
+        assert self.cache.pop("a", None) is None
+
+        self.cache["a"] = 1
+        self.cache.clear()
+        assert len(self.cache) == 0
+
+    def test_counters(self):
+        """Hits and misses are counted"""
+
+        self.cache["a"] = 1
+
+        self.cache["a"]
+        self.cache.get("a")
+        self.cache.get("b")
+
+        with pytest.raises(KeyError):
+            self.cache["b"]
+
+        assert self.cache.hits == 2
+        assert self.cache.misses == 2
+
+        self.cache.reset_counters()
+        assert self.cache.hits == self.cache.misses == 0
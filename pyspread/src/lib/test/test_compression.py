@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for compression.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Foobar.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+import bz2
+import gzip
+import os
+import sys
+import zlib
+
+import pytest
+import wx
+app = wx.App()
+
+TESTPATH = os.sep.join(os.path.realpath(__file__).split(os.sep)[:-1]) + os.sep
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 3)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
+
+from src.lib.testlib import params, pytest_generate_tests
+
+from src.lib.compression import codecs, get_codec, detect_codec, \
+    detect_file_codec
+
+DATA = "[Pyspread save file version]\n0.1\n" + \
+    "".join("{}\t0\t0\t'Test {}'\n".format(i, i) for i in xrange(1000))
+
+param_codecs = [{"name": name} for name in codecs]
+
+
+@params(param_codecs)
+def test_codec(name):
+    """Unit test for compress and decompress of all available codecs"""
+
+    codec = get_codec(name)
+
+    if codec.levels is None:
+        levels = [None]
+    else:
+        levels = [None, codec.levels[0], codec.levels[1]]
+
+    for level in levels:
+        data = codec.compress(DATA, level)
+        assert codec.decompress(data) == DATA
+        assert detect_codec(data) == name
+
+
+param_get_level = [
+    {"name": "none", "level": 5, "res": None},
+    {"name": "zlib", "level": None, "res": 6},
+    {"name": "zlib", "level": 0, "res": 1},
+    {"name": "bz2", "level": 3, "res": 3},
+    {"name": "bz2", "level": 12, "res": 9},
+]
+
+
+@params(param_get_level)
+def test_get_level(name, level, res):
+    """Unit test for get_level"""
+
+    assert get_codec(name).get_level(level) == res
+
+
+def test_get_codec_unsupported():
+    """Unknown codecs raise ValueError"""
+
+    with pytest.raises(ValueError):
+        get_codec("rar")
+
+
+param_detect_codec = [
+    {"data": bz2.compress(DATA), "res": "bz2"},
+    {"data": zlib.compress(DATA), "res": "zlib"},
+    {"data": "\xfd7zXZ\x00\x00\x04", "res": "lzma"},
+    {"data": DATA, "res": "none"},
+    {"data": "", "res": "none"},
+]
+
+
+@params(param_detect_codec)
+def test_detect_codec(data, res):
+    """Unit test for detect_codec"""
+
+    assert detect_codec(data) == res
+
+
+def test_detect_file_codec():
+    """Unit test for detect_file_codec"""
+
+    filepath = TESTPATH + "compression_test.gz"
+
+    outfile = gzip.GzipFile(filepath, "wb")
+    outfile.write(DATA)
+    outfile.close()
+
+    try:
+        assert detect_file_codec(filepath) == "gzip"
+        assert get_codec("gzip").decompress(open(filepath, "rb").read()) \
+            == DATA
+
+    finally:
+        os.remove(filepath)
@@ -40,6 +40,7 @@ sys.path.insert(0, TESTPATH)
 sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 3)
 sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
 
+from src.config import config
 from src.gui._main_window import MainWindow
 from src.lib.testlib import params, pytest_generate_tests
 import src.lib.__csv as __csv
@@ -67,6 +68,95 @@ def test_sniff(filepath, header, delimiter, doublequote, quoting, quotechar,
     assert dialect.skipinitialspace == skipinitialspace
 
 
+param_profile = [
+    {'filepath': TESTPATH + 'test1.csv', 'header': True, 'delimiter': ',',
+     'digest_types': [types.UnicodeType, types.IntType, types.FloatType,
+                      types.UnicodeType],
+     'no_lines': 923},
+]
+
+
+@params(param_profile)
+def test_profile(filepath, header, delimiter, digest_types, no_lines):
+    """Unit test for profile"""
+
+    dialect, __header, __digest_types, __no_lines = __csv.profile(filepath)
+
+    assert dialect.delimiter == delimiter
+    assert __header == header
+    assert __digest_types == digest_types
+    assert __no_lines == no_lines
+
+
+def test_profile_sampled():
+    """Profile of a file that is larger than its samples"""
+
+    filepath = TESTPATH + 'dummy_profile.csv'
+
+    with open(filepath, "wb") as csvfile:
+        csvfile.write("Name;Value;Count\n")
+        for i in xrange(10000):
+            csvfile.write("Name {i};{i}.5;{i}\n".format(i=i))
+
+    sniff_size = config["sniff_size"]
+    config["sniff_size"] = repr(1024)
+
+    try:
+        dialect, has_header, digest_types, no_lines = __csv.profile(filepath)
+
+    finally:
+        config["sniff_size"] = repr(sniff_size)
+        os.remove(filepath)
+
+    assert dialect.delimiter == ";"
+    assert has_header
+    assert digest_types == [types.UnicodeType, types.FloatType,
+                            types.IntType]
+    assert 9000 < no_lines < 11000
+
+
+param_sample_lines_gen = [
+    {'data': "a\nb\nc", 'chunk_size': 100, 'no_chunks': 2,
+     'res': [["a\n", "b\n", "c"]]},
+    {'data': "aa\nbb\ncc\ndd\nee\n", 'chunk_size': 4, 'no_chunks': 3,
+     'res': [["aa\n"], ["cc\n"], ["ee\n"]]},
+    {'data': "aa\nbb\ncc\ndd", 'chunk_size': 4, 'no_chunks': 2,
+     'res': [["aa\n"], ["dd"]]},
+]
+
+
+@params(param_sample_lines_gen)
+def test_sample_lines_gen(data, chunk_size, no_chunks, res):
+    """Unit test for sample_lines_gen"""
+
+    filepath = TESTPATH + 'dummy_sample.csv'
+
+    with open(filepath, "wb") as csvfile:
+        csvfile.write(data)
+
+    try:
+        assert list(__csv.sample_lines_gen(filepath, chunk_size,
+                                           no_chunks)) == res
+    finally:
+        os.remove(filepath)
+
+
+param_infer_digest_types = [
+    {'rows': [["1", "1.5", "a"], ["2", "3", ""]],
+     'res': [types.IntType, types.FloatType, types.UnicodeType]},
+    {'rows': [["1", ""], ["x", "", "2"]],
+     'res': [types.UnicodeType, types.IntType, types.IntType]},
+    {'rows': [], 'res': []},
+]
+
+
+@params(param_infer_digest_types)
+def test_infer_digest_types(rows, res):
+    """Unit test for infer_digest_types"""
+
+    assert __csv.infer_digest_types(iter(rows)) == res
+
+
 param_first_line = [
     {'filepath': TESTPATH + 'test1.csv',
      'first_line': ["Text", "Number", "Float", "Date"]},
@@ -112,6 +202,46 @@ def test_cell_key_val_gen():
         assert col == value
 
 
+param_get_cell_converter = [
+    {'digest_type': types.UnicodeType, 'value': "Gsdfjklj\xc3\xb6",
+     'res': repr(u"Gsdfjkljö")},
+    {'digest_type': types.IntType, 'value': "3", 'res': "3"},
+    {'digest_type': types.IntType, 'value': "3.5", 'res': ""},
+    {'digest_type': types.FloatType, 'value': "3.5", 'res': "3.5"},
+    {'digest_type': types.StringType, 'value': "Test", 'res': "'Test'"},
+    {'digest_type': types.BooleanType, 'value': "1", 'res': "True"},
+    {'digest_type': None, 'value': "Header", 'res': "u'Header'"},
+    {'digest_type': types.FloatType, 'value': None, 'res': None},
+]
+
+
+@params(param_get_cell_converter)
+def test_get_cell_converter(digest_type, value, res):
+    """Unit test for get_cell_converter"""
+
+    converter = __csv.get_cell_converter(digest_type)
+    assert converter(value) == res
+
+
+param_convert_rows = [
+    {'rows': [], 'res': []},
+    {'rows': [["1", "a"], ["2", "b"]], 'res': [("1", "u'a'"), ("2", "u'b'")]},
+    {'rows': [["1"], ["2", "b", "3"], []],
+     'res': [("1",), ("2", "u'b'", "3"), ()]},
+    {'rows': [[], []], 'res': [(), ()]},
+]
+
+
+@params(param_convert_rows)
+def test_convert_rows(rows, res):
+    """Unit test for convert_rows"""
+
+    converters = [__csv.get_cell_converter(types.IntType),
+                  __csv.get_cell_converter(types.UnicodeType)]
+
+    assert __csv.convert_rows(rows, converters) == res
+
+
 class TestDigest(object):
     """Unit tests for Digest"""
 
@@ -167,6 +297,18 @@ class TestCsvInterface(object):
         for ele, rele in zip(data, res):
             assert repr(ele) == rele
 
+    def test_iter_batches(self):
+        """Unit test for iter_batches"""
+
+        self.interface.batch_size = 1
+
+        batches = list(self.interface.iter_batches())
+        rows = list(self.interface)
+
+        assert all(len(batch) == 1 for batch in batches)
+        assert [batch[0] for batch in batches] == rows
+        assert rows[0] == ("u'Text'", "u'Number'", "u'Float'", "u'Date'")
+
     def test_write(self):
         """Unit test for write"""
 
@@ -199,3 +341,47 @@ class TestTxtGenerator(object):
 
         res = [[ele for ele in line] for line in self.txtgen]
         assert res == [["Hallo", "Welt"], ["Test", "2"]]
+
+    def test_iter_batches(self):
+        """Unit test for iter_batches"""
+
+        filepath = TESTPATH + 'test_txt_batches.txt'
+
+        lines = ["{} {}\t{}\n".format(i, i * 2, i * 3) for i in xrange(1000)]
+        lines[500:502] = ["a\n", "\n"]
+        lines[900] = "x" * 100 + " 1 2\n"
+
+        with open(filepath, "wb") as txtfile:
+            txtfile.write("".join(lines) + "1 2 3")
+
+        try:
+            txtgen = TxtGenerator(self.main_window, filepath)
+            txtgen.block_size = 4096
+
+            batches = []
+            for batch in txtgen.iter_batches():
+                batches.append(batch)
+                assert 0 < txtgen.get_progress() <= 1
+
+            assert len(batches) > 2
+            assert txtgen.offset == txtgen.size
+
+            # Blocks with equally long rows are numpy arrays
+            assert batches[0].shape[1] == 3
+            assert batches[0][10].tolist() == ["10", "20", "30"]
+            list_rows = [row for batch in batches
+                         if isinstance(batch, list) for row in batch]
+            assert ["a"] in list_rows
+
+            # Cells that do not fit into the column storage are kept in lists
+            assert ["x" * 100, "1", "2"] in list_rows
+
+            rows = [list(line) for line in txtgen]
+            assert len(rows) == 1001
+            assert rows[500:502] == [["a"], []]
+            assert rows[999] == ["999", "1998", "2997"]
+            assert rows[900][0] == "x" * 100
+            assert rows[-1] == ["1", "2", "3"]
+
+        finally:
+            os.remove(filepath)
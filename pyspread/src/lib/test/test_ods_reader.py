@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for ods_reader.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+from cStringIO import StringIO
+import os
+import sys
+import zipfile
+
+import pytest
+import wx
+app = wx.App()
+
+TESTPATH = os.sep.join(os.path.realpath(__file__).split(os.sep)[:-1]) + os.sep
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 3)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
+
+from src.lib.testlib import params, pytest_generate_tests
+
+from src.lib.ods_reader import OdsReader
+
+CONTENT_TEMPLATE = \
+    '<?xml version="1.0" encoding="UTF-8"?>' \
+    '<office:document-content ' \
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" ' \
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" ' \
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">' \
+    '<office:body><office:spreadsheet>{}</office:spreadsheet></office:body>' \
+    '</office:document-content>'
+
+
+def get_ods_file(tables):
+    """Returns ods file object with tables in content.xml"""
+
+    ods_file = StringIO()
+
+    with zipfile.ZipFile(ods_file, "w") as ods_zip:
+        ods_zip.writestr("mimetype",
+                         "application/vnd.oasis.opendocument.spreadsheet")
+        ods_zip.writestr("content.xml", CONTENT_TEMPLATE.format(tables))
+
+    ods_file.seek(0)
+
+    return ods_file
+
+
+def table(name, *rows):
+    """Returns table xml"""
+
+    return '<table:table table:name="{}">{}</table:table>'.format(
+        name, "".join(rows))
+
+
+def row(*cells, **kwargs):
+    """Returns table row xml, repeated if kwarg repeat is given"""
+
+    repeat = kwargs.get("repeat")
+    if repeat is None:
+        return '<table:table-row>{}</table:table-row>'.format("".join(cells))
+
+    return '<table:table-row table:number-rows-repeated="{}">{}' \
+           '</table:table-row>'.format(repeat, "".join(cells))
+
+
+def cell(*paragraphs, **kwargs):
+    """Returns table cell xml, repeated if kwarg repeat is given"""
+
+    content = "".join("<text:p>{}</text:p>".format(p) for p in paragraphs)
+    repeat = kwargs.get("repeat")
+    if repeat is None:
+        return '<table:table-cell>{}</table:table-cell>'.format(content)
+
+    return '<table:table-cell table:number-columns-repeated="{}">{}' \
+           '</table:table-cell>'.format(repeat, content)
+
+
+param_ods_reader = [
+    {'tables': table("T", row(cell("1"), cell("Test"))),
+     'res': [((0, 0, 0), u"1"), ((0, 1, 0), u"Test")],
+     'shape': (1, 2, 1)},
+    {'tables': table("T", row(cell("a", repeat=2), cell(repeat=16000),
+                              cell("b"))),
+     'res': [((0, 0, 0), u"a"), ((0, 1, 0), u"a"), ((0, 16002, 0), u"b")],
+     'shape': (1, 16003, 1)},
+    {'tables': table("T", row(cell("a")), row(cell(), repeat=1000),
+                     row(cell(), cell("b"), repeat=2),
+                     row(cell(repeat=1024), repeat=1048000)),
+     'res': [((0, 0, 0), u"a"), ((1001, 1, 0), u"b"), ((1002, 1, 0), u"b")],
+     'shape': (1003, 2, 1)},
+    {'tables': table("T", row(cell("x", "y"), cell("# Comment"),
+                              cell("a<text:s text:c=\"3\"/>b<text:tab/>c"),
+                              cell('<text:span>s</text:span>pan'))),
+     'res': [((0, 0, 0), u"x\ny"), ((0, 2, 0), u"a   b\tc"),
+             ((0, 3, 0), u"span")],
+     'shape': (1, 4, 1)},
+    {'tables': table("T", row('<table:table-cell>'
+                              '<office:annotation><text:p>Note</text:p>'
+                              '</office:annotation><text:p>1</text:p>'
+                              '</table:table-cell>',
+                              '<table:covered-table-cell/>', cell("2"))),
+     'res': [((0, 0, 0), u"1"), ((0, 2, 0), u"2")],
+     'shape': (1, 3, 1)},
+    {'tables': table("T1", row(cell("1"))) + table("T2") +
+        table("T3", row(), row(cell("3"))),
+     'res': [((0, 0, 0), u"1"), ((1, 0, 2), u"3")],
+     'shape': (2, 1, 3)},
+    {'tables': table("T", row(cell(u"Ä".encode("utf-8")))),
+     'res': [((0, 0, 0), u"Ä")],
+     'shape': (1, 1, 1)},
+]
+
+
+@params(param_ods_reader)
+def test_ods_reader(tables, res, shape):
+    """Unit test for OdsReader"""
+
+    reader = OdsReader(get_ods_file(tables))
+
+    assert list(reader) == res
+    assert reader.shape == shape
+
+
+def test_ods_reader_chunks():
+    """Cells are yielded while content.xml is parsed"""
+
+    no_rows = 2000
+    rows = [row(cell(str(i))) for i in xrange(no_rows)]
+    reader = OdsReader(get_ods_file(table("T", *rows)))
+    reader.chunk_size = 1024
+
+    cells = iter(reader)
+
+    assert next(cells) == ((0, 0, 0), u"0")
+    assert reader.shape is None
+
+    assert len(list(cells)) == no_rows - 1
+    assert reader.shape == (no_rows, 1, 1)
+    assert reader.table_names == [u"T"]
+
+
+param_ods_reader_invalid = [
+    {'tables': table("T", row(cell("a", repeat="x")))},
+    {'tables': table("T", row(cell("a"), repeat=0))},
+    {'tables': table("T", row(cell('a<text:s text:c="-1"/>b')))},
+]
+
+
+@params(param_ods_reader_invalid)
+def test_ods_reader_invalid(tables):
+    """Invalid repeat counts raise ValueError"""
+
+    with pytest.raises(ValueError):
+        list(OdsReader(get_ods_file(tables)))
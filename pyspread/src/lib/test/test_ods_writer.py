@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Unit test for ods_writer.py"""
+
+# --------------------------------------------------------------------
+# pyspread is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pyspread is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pyspread.  If not, see <http://www.gnu.org/licenses/>.
+# --------------------------------------------------------------------
+
+from cStringIO import StringIO
+import os
+import sys
+import zipfile
+
+import wx
+app = wx.App()
+
+TESTPATH = os.sep.join(os.path.realpath(__file__).split(os.sep)[:-1]) + os.sep
+sys.path.insert(0, TESTPATH)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 3)
+sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
+
+from src.lib.testlib import params, pytest_generate_tests
+
+from src.lib.ods_reader import OdsReader
+from src.lib.ods_writer import ZipEntryWriter, OdsWriter, get_text_xml
+
+
+def test_zip_entry_writer():
+    """Streamed zip entries can be read with zipfile"""
+
+    zip_file_obj = StringIO()
+    data = "".join(str(i) for i in xrange(100000))
+
+    with zipfile.ZipFile(zip_file_obj, "w") as zip_file:
+        zip_file.writestr("first", "1")
+
+        entry = ZipEntryWriter(zip_file, "data")
+        for i in xrange(0, len(data), 1000):
+            entry.write(data[i:i + 1000])
+        entry.write(u"Ä")
+        entry.close()
+
+        zip_file.writestr("last", "2")
+
+    zip_file_obj.seek(0)
+
+    with zipfile.ZipFile(zip_file_obj) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == ["first", "data", "last"]
+        assert zip_file.read("data") == data + u"Ä".encode("utf-8")
+        assert zip_file.getinfo("data").compress_size < len(data)
+
+
+param_get_text_xml = [
+    {'text': u"Test", 'res': u"<text:p>Test</text:p>"},
+    {'text': u"a\nb", 'res': u"<text:p>a</text:p><text:p>b</text:p>"},
+    {'text': u"<&>", 'res': u"<text:p>&lt;&amp;&gt;</text:p>"},
+    {'text': u"  a b   c\td",
+     'res': u'<text:p><text:s text:c="2"/>a b <text:s text:c="2"/>c'
+            u'<text:tab/>d</text:p>'},
+]
+
+
+@params(param_get_text_xml)
+def test_get_text_xml(text, res):
+    """Unit test for get_text_xml"""
+
+    assert get_text_xml(text) == res
+
+
+def test_ods_writer():
+    """Written cells are read back and empty cells are run-length encoded"""
+
+    ods_file = StringIO()
+
+    writer = OdsWriter(ods_file)
+    style_name = writer.get_cell_style(
+        (("style:text-properties", "fo:font-weight", "bold"),))
+
+    writer.start_table(u"0", [(None, 16000)])
+    writer.write_row([(0, u"'a'", None, None), (3, u"1", "1.0", style_name),
+                      (9, None, None, style_name),
+                      (10, None, None, style_name)], 16000)
+    for __ in xrange(3):
+        writer.write_row([(1, u"x\ny", None, None)], 16000)
+    writer.write_row([], 16000, repeat=1000000)
+    writer.end_table()
+
+    writer.start_table(u"1", [(None, 1)])
+    writer.write_row([], 1)
+    writer.write_row([(0, u"2", "2.0", None)], 1)
+    writer.end_table()
+
+    writer.close()
+
+    assert writer.get_cell_style(
+        (("style:text-properties", "fo:font-weight", "bold"),)) == style_name
+
+    ods_file.seek(0)
+
+    with zipfile.ZipFile(ods_file) as ods_zip:
+        assert ods_zip.namelist()[0] == "mimetype"
+        assert ods_zip.getinfo("mimetype").compress_type == zipfile.ZIP_STORED
+
+        content = ods_zip.read("content.xml")
+        assert len(content) < 2500
+        assert 'table:number-columns-repeated="15989"' in content
+        assert 'table:number-columns-repeated="2"' in content
+        assert 'table:number-rows-repeated="3"' in content
+        assert 'table:number-rows-repeated="1000000"' in content
+
+        # Cell styles are automatic styles that precede the tables
+        style_xml = '<style:style style:name="{}"'.format(style_name)
+        assert content.index(style_xml) < content.index("<table:table ")
+        assert content.index("</office:automatic-styles>") < \
+            content.index("<table:table ")
+        assert 'fo:font-weight="bold"' in content
+        assert "<style:style " not in ods_zip.read("styles.xml")
+
+    ods_file.seek(0)
+    reader = OdsReader(ods_file)
+
+    assert list(reader) == [
+        ((0, 0, 0), u"'a'"), ((0, 3, 0), u"1"), ((1, 1, 0), u"x\ny"),
+        ((2, 1, 0), u"x\ny"), ((3, 1, 0), u"x\ny"), ((1, 0, 1), u"2")]
+    assert reader.table_names == [u"0", u"1"]
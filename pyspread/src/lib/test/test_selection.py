@@ -41,7 +41,8 @@ sys.path.insert(0, TESTPATH + (os.sep + os.pardir) * 2)
 
 from src.lib.testlib import params, pytest_generate_tests
 
-from src.lib.selection import Selection
+from src.lib.selection import Selection, SelectionIndex
+from src.lib.selection import merge_intervals, get_row_intervals
 
 from src.gui._main_window import MainWindow
 
@@ -255,6 +256,24 @@ class TestSelection(object):
 
         assert sel.get_bbox() == res
 
+    param_get_grid_blocks = [
+        {'sel': Selection([], [], [], [], [(32, 53), (34, 56)]),
+         'shape': (1000, 100, 3),
+         'res': [(32, 53, 32, 53), (34, 56, 34, 56)]},
+        {'sel': Selection([(None, 3)], [(None, 200)], [4], [5], [(2000, 1)]),
+         'shape': (1000, 100, 3),
+         'res': [(0, 3, 999, 99), (4, 0, 4, 99), (0, 5, 999, 5)]},
+        {'sel': Selection([(-2, 1)], [(3, 2)], [], [], []),
+         'shape': (1000, 100),
+         'res': [(0, 1, 3, 2)]},
+    ]
+
+    @params(param_get_grid_blocks)
+    def test_get_grid_blocks(self, sel, shape, res):
+        """Unit test for get_grid_blocks"""
+
+        assert list(sel.get_grid_blocks(shape)) == res
+
     param_get_access_string = [
         {'sel': Selection([], [], [], [], [(32, 53), (34, 56)]),
          'shape': (1000, 100, 3), 'table': 0,
@@ -335,3 +354,88 @@ class TestSelection(object):
         sel.grid_select(self.grid)
         assert self.grid.IsInSelection(*key) == res
 
+
+
+param_merge_intervals = [
+    {'intervals': [], 'res': []},
+    {'intervals': [(5, 7), (0, 2)], 'res': [(0, 2), (5, 7)]},
+    {'intervals': [(3, 4), (0, 2), (4, 9), (6, 7)], 'res': [(0, 9)]},
+    {'intervals': [(0, 2), (4, 5), (1, 1)], 'res': [(0, 2), (4, 5)]},
+]
+
+
+@params(param_merge_intervals)
+def test_merge_intervals(intervals, res):
+    """Unit test for merge_intervals"""
+
+    assert merge_intervals(intervals) == res
+
+
+param_get_row_intervals = [
+    {'blocks': [], 'res': []},
+    {'blocks': [(2, 0, 4, 1), (3, 1, 5, 3), (8, 5, 8, 5)],
+     'res': [(2, 2, [(0, 1)]), (3, 4, [(0, 3)]), (5, 5, [(1, 3)]),
+             (8, 8, [(5, 5)])]},
+    {'blocks': [(0, 0, 65535, 0), (10, 5, 10, 5)],
+     'res': [(0, 9, [(0, 0)]), (10, 10, [(0, 0), (5, 5)]),
+             (11, 65535, [(0, 0)])]},
+]
+
+
+@params(param_get_row_intervals)
+def test_get_row_intervals(blocks, res):
+    """Unit test for get_row_intervals"""
+
+    assert list(get_row_intervals(blocks)) == res
+
+
+class TestSelectionIndex(object):
+    """Unit tests for SelectionIndex"""
+
+    def setup_method(self, method):
+        self.selections = [
+            Selection([(2, 2)], [(4, 5)], [55], [55, 66], [(34, 56)]),
+            Selection([], [], [], [], [(32, 53), (34, 56)]),
+            Selection([(None, 3)], [(None, 3)], [], [], []),
+            Selection([(10, None)], [(None, None)], [], [], []),
+            Selection([(0, 0)], [(999, 99)], [], [], []),
+        ]
+
+        self.index = SelectionIndex()
+        for sel_id, selection in enumerate(self.selections):
+            self.index.add(sel_id, selection)
+
+    param_test_get_ids = [
+        {'key': (3, 3)},
+        {'key': (34, 56)},
+        {'key': (55, 0)},
+        {'key': (1000, 3)},
+        {'key': (9, 100)},
+        {'key': (10, 100)},
+        {'key': (4000, 4000)},
+    ]
+
+    @params(param_test_get_ids)
+    def test_get_ids(self, key):
+        """Unit test for get_ids"""
+
+        res = [sel_id for sel_id, selection in enumerate(self.selections)
+               if key in selection]
+
+        assert self.index.get_ids(*key) == res
+
+    def test_remove(self):
+        """Unit test for remove"""
+
+        assert self.index.get_ids(3, 3) == [0, 2, 4]
+
+        self.index.remove(2)
+        assert self.index.get_ids(3, 3) == [0, 4]
+        assert len(self.index) == 4
+
+        for sel_id in [0, 1, 3, 4]:
+            self.index.remove(sel_id)
+
+        assert not self.index.blocks
+        assert not self.index.cells
+        assert self.index.get_ids(3, 3) == []
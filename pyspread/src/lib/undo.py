@@ -20,12 +20,29 @@
 __version__ = '0.5.1'
 __author__ = 'David Townshend'
 
-__all__ = ['undoable', 'group', 'Stack', 'stack', 'setstack']
+__all__ = ['undoable', 'record', 'group', 'suspended', 'Stack', 'stack',
+           'setstack']
 
 import contextlib
+import sys
 
 from collections import deque
 
+
+def _getsize(value):
+    ''' Return the approximate memory size of *value* in bytes.
+
+    The items of containers are included but not their own items.
+    '''
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(key) + sys.getsizeof(item)
+                    for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
 class _Action:
     ''' This represents an action which can be done and undone.
 
@@ -40,11 +57,17 @@ class _Action:
         self.args = args
         self.kwargs = kwargs
         self._text = ''
+        self._size = 0
 
     def do(self):
         'Do or redo the action'
         self._runner = self._generator(*self.args, **self.kwargs)
         rets = next(self._runner)
+        # The suspended generator keeps its local variables for undo
+        frame = self._runner.gi_frame
+        if frame is not None:
+            self._size = sum(_getsize(value)
+                             for value in frame.f_locals.values())
         if isinstance(rets, tuple):
             self._text = rets[0]
             return rets[1:]
@@ -68,6 +91,90 @@ class _Action:
         'Return the descriptive text of the action'
         return self._text
 
+    def size(self):
+        'Return the approximate memory size of the undo data in bytes'
+        return self._size
+
+
+class _Batch:
+    ''' This represents a batch of changes of one target.
+
+    Instead of a suspended generator per change, only the changed keys and
+    their old and new values are kept. Undoing calls ``restore(key, value)``
+    with the old values in reverse order, redoing calls it with the new
+    values in the original order.
+    '''
+    def __init__(self, restore, text=''):
+        self.restore = restore
+        self.keys = []
+        self.old_values = []
+        self.new_values = []
+        self._text = text
+        self._size = 0
+
+    def has_target(self, restore):
+        ''' Is *restore* the same function of the same object?
+
+        Bound methods compare their objects by value, so equal stores
+        would share a batch otherwise.
+        '''
+        own = self.restore
+        return getattr(own, '__self__', None) is \
+            getattr(restore, '__self__', None) and \
+            getattr(own, '__func__', own) is \
+            getattr(restore, '__func__', restore)
+
+    def add(self, key, old_value, new_value):
+        'Add a change to the batch'
+        self.keys.append(key)
+        self.old_values.append(old_value)
+        self.new_values.append(new_value)
+        self._size += _getsize(key) + _getsize(old_value) + \
+            _getsize(new_value)
+
+    def do(self):
+        'Redo the changes'
+        restore = self.restore
+        for key, value in zip(self.keys, self.new_values):
+            restore(key, value)
+
+    def undo(self):
+        'Undo the changes'
+        restore = self.restore
+        for key, value in zip(reversed(self.keys),
+                              reversed(self.old_values)):
+            restore(key, value)
+
+    def text(self):
+        'Return the descriptive text of the batch'
+        return self._text
+
+    def size(self):
+        'Return the approximate memory size of the changes in bytes'
+        return self._size
+
+
+def record(restore, key, old_value, new_value, text=''):
+    ''' Record a change that has already been done.
+
+    This is a compact alternative to :func:`undoable` for frequent small
+    changes. *restore* is called as ``restore(key, old_value)`` on undo and
+    as ``restore(key, new_value)`` on redo. Consecutive changes with the same
+    *restore* function inside a group are stored in one batch.
+
+    >>> values = {}
+    >>> def restore(key, value):
+    ...     values[key] = value
+    >>> with group('Set values'):
+    ...     for key in range(3):
+    ...         values[key] = 1
+    ...         record(restore, key, 0, 1)
+    >>> stack().undo()
+    >>> values
+    {0: 0, 1: 0, 2: 0}
+    '''
+    stack().record(restore, key, old_value, new_value, text)
+
 
 def undoable(generator):
     ''' Decorator which creates a new undoable action type.
@@ -121,6 +228,33 @@ class _Group:
     def text(self):
         return self._desc.format(count=len(self._stack))
 
+    def size(self):
+        return sum(undoable.size() for undoable in self._stack)
+
+
+@contextlib.contextmanager
+def suspended():
+    ''' Return a context manager in which no actions are recorded.
+
+    Actions that are done inside the context cannot be undone.
+
+    >>> @undoable
+    ... def operation():
+    ...     yield 'Operation'
+    >>> stack().clear()
+    >>> with suspended():
+    ...     operation()
+    >>> stack().canundo()
+    False
+    '''
+    _stack = stack()
+    receiver = _stack._receiver
+    _stack._receiver = None
+    try:
+        yield
+    finally:
+        _stack._receiver = receiver
+
 
 def group(desc):
     ''' Return a context manager for grouping undoable actions.
@@ -193,13 +327,28 @@ class Stack:
     >>> action()
     >>> stack().haschanged()
     True
+
+    The memory that the history requires can be limited with *maxsize* in
+    bytes. The size of an undoable call is estimated from the local
+    variables of its suspended generator, the size of a batch from
+    :func:`record` from its keys and values and the size of a group as the
+    sum of its members. The oldest history is dropped when the limit is
+    exceeded. The latest action is always kept.
+
+    >>> limited_stack = Stack(maxsize=1)
+    >>> for n in range(3):
+    ...     limited_stack.record(lambda key, value: None, n, None, n)
+    >>> limited_stack.undocount()
+    1
     '''
 
-    def __init__(self):
+    def __init__(self, maxsize=None):
         self._undos = deque()
         self._redos = deque()
         self._receiver = self._undos
         self._savepoint = None
+        self._size = 0
+        self.maxsize = maxsize
         self.undocallback = lambda: None
         self.docallback = lambda: None
 
@@ -227,6 +376,7 @@ class Stack:
                     raise
                 else:
                     self._undos.append(undoable)
+                    self._size += undoable.size()
             self.docallback()
 
     def undo(self):
@@ -241,6 +391,7 @@ class Stack:
                     raise
                 else:
                     self._redos.append(undoable)
+                    self._size -= undoable.size()
             self.undocallback()
 
     def clear(self):
@@ -249,6 +400,7 @@ class Stack:
         self._redos.clear()
         self._savepoint = None
         self._receiver = self._undos
+        self._size = 0
 
     def undocount(self):
         ''' Return the number of undos available. '''
@@ -258,6 +410,15 @@ class Stack:
         ''' Return the number of redos available. '''
         return len(self._undos)
 
+    def lastaction(self):
+        ''' Return the action that is undone next or *None*.
+
+        Each new action is a new object, so the identity of the last action
+        tells whether the state has changed, unlike :func:`undocount`.
+        '''
+        if self.canundo():
+            return self._undos[-1]
+
     def undotext(self):
         ''' Return a description of the next available undo. '''
         if self.canundo():
@@ -294,8 +455,31 @@ class Stack:
             self._receiver.append(action)
         if self._receiver is self._undos:
             self._redos.clear()
+            self._size += action.size()
+            self._trim()
             self.docallback()
 
+    def record(self, restore, key, old_value, new_value, text=''):
+        ''' Add a change to the stack, see :func:`record`. '''
+        receiver = self._receiver
+        if receiver is not self._undos and receiver and \
+           isinstance(receiver[-1], _Batch) and \
+           receiver[-1].has_target(restore):
+            receiver[-1].add(key, old_value, new_value)
+            return
+        batch = _Batch(restore, text)
+        batch.add(key, old_value, new_value)
+        self.append(batch)
+
+    def _trim(self):
+        ''' Drop the oldest history until the size fits *maxsize*. '''
+        if self.maxsize is None:
+            return
+        while self._size > self.maxsize and len(self._undos) > 1:
+            self._size -= self._undos.popleft().size()
+            if self._savepoint is not None:
+                self._savepoint -= 1
+
     def savepoint(self):
         ''' Set the savepoint. '''
         self._savepoint = self.undocount()
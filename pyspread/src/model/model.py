@@ -37,13 +37,16 @@ Layer 0: KeyValueStore
 import ast
 import base64
 import bz2
+from contextlib import contextmanager
 from copy import copy
 import cStringIO
 import datetime
-from itertools import imap, ifilter, product
+from functools import partial
+import heapq
+from itertools import imap, ifilter, izip, product
 import re
 import sys
-from types import SliceType, IntType
+from types import ClassType, CodeType, SliceType, IntType
 
 import numpy
 
@@ -52,9 +55,10 @@ import wx
 from src.config import config
 
 from src.lib.typechecks import is_slice_like, is_string_like, is_generator_like
-from src.lib.selection import Selection
+from src.lib.selection import Selection, SelectionIndex
+from src.lib.cache import LRUCache
 
-from src.lib.undo import undoable
+from src.lib.undo import undoable, record as record_undo
 
 import src.lib.charts as charts
 from src.gui.grid_panels import vlcpanel_factory
@@ -83,33 +87,491 @@ class KeyValueStore(dict):
 
         return self.default_value
 
-    @undoable
-    def __setitem__(self, key, value):
-        old_value = self[key]
+    # Keys of values that have changed since the journal has been started,
+    # None if changes are not recorded, see DataArray.start_journal
+
+    journal = None
+
+    # Storage access without undo that subclasses may replace
+
+    def _set_value(self, key, value):
+        if self.journal is not None:
+            self.journal.add(key)
+
         dict.__setitem__(self, key, value)
 
-        yield "__setitem__"
-        # Undo actions
-        if old_value is None:
-            dict.pop(self, key)
+    def _pop_value(self, key, *args):
+        if self.journal is not None:
+            self.journal.add(key)
+
+        return dict.pop(self, key, *args)
+
+    def _restore_value(self, key, value):
+        """Sets value without undo, None removes the key"""
+
+        if value is None:
+            self._pop_value(key, None)
         else:
-            dict.__setitem__(self, key, old_value)
+            self._set_value(key, value)
+
+    # Changes are recorded as compact undo batches, which consist of
+    # keys and values only
+
+    def __setitem__(self, key, value):
+        old_value = self[key]
+        self._set_value(key, value)
+
+        record_undo(self._restore_value, key, old_value, value, "__setitem__")
 
-    @undoable
     def pop(self, key, *args):
-        res = dict.pop(self, key, *args)
+        res = self._pop_value(key, *args)
 
-        yield "pop", res
+        record_undo(self._restore_value, key, res, None, "pop")
 
-        # Undo actions
-        if res is not None:
-            dict.__setitem__(self, key, res)
+        return res
 
 # End of class KeyValueStore
 
 # -----------------------------------------------------------------------------
 
 
+class ColumnStore(object):
+    """Dense storage of cell code in per table column arrays
+
+    Code is stored UTF-8 encoded in numpy byte string arrays. Each array
+    holds chunk_size consecutive rows of one column of one table. An empty
+    byte string marks an empty cell. Only unicode code that is not longer
+    than max_width bytes can be stored. Other code has to be kept elsewhere.
+
+    Chunks are only created via add_chunk. Cells outside of existing chunks
+    are not stored.
+
+    """
+
+    chunk_size = 4096
+    max_width = 64
+
+    def __init__(self):
+        # Maps (tab, col, chunk_no) to [array, no. filled cells]
+        self.chunks = {}
+
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def _locate(self, key):
+        """Returns chunk id and position in chunk for key"""
+
+        row, col, tab = key
+
+        return (tab, col, row // self.chunk_size), row % self.chunk_size
+
+    def _encode(self, value):
+        """Returns encoded value or None if value cannot be stored"""
+
+        if type(value) is not unicode or not value:
+            return
+
+        encoded_value = value.encode("utf-8")
+
+        if len(encoded_value) <= self.max_width:
+            return encoded_value
+
+    def __contains__(self, key):
+        try:
+            chunk_id, pos = self._locate(key)
+            return bool(self.chunks[chunk_id][0][pos])
+
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def get(self, key, default=None):
+        """Returns code for key or default if cell is not stored"""
+
+        try:
+            chunk_id, pos = self._locate(key)
+            value = self.chunks[chunk_id][0][pos]
+
+        except (KeyError, TypeError, ValueError):
+            return default
+
+        if value:
+            return value.decode("utf-8")
+
+        return default
+
+    def set(self, key, value):
+        """Stores value and returns True if possible else returns False"""
+
+        encoded_value = self._encode(value)
+
+        if encoded_value is None:
+            return False
+
+        try:
+            chunk_id, pos = self._locate(key)
+            chunk = self.chunks[chunk_id]
+
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        array = chunk[0]
+
+        if len(encoded_value) > array.itemsize:
+            array = chunk[0] = array.astype("S{}".format(len(encoded_value)))
+
+        if not array[pos]:
+            chunk[1] += 1
+            self.length += 1
+
+        array[pos] = encoded_value
+
+        return True
+
+    def pop(self, key, default=None):
+        """Removes cell and returns its code or default if not stored"""
+
+        value = self.get(key)
+
+        if value is None:
+            return default
+
+        chunk_id, pos = self._locate(key)
+        chunk = self.chunks[chunk_id]
+
+        chunk[0][pos] = ""
+        chunk[1] -= 1
+        self.length -= 1
+
+        if not chunk[1]:
+            del self.chunks[chunk_id]
+
+        return value
+
+    def add_chunk(self, chunk_id, items):
+        """Creates chunk from dict items that map key to unicode code
+
+        Parameters
+        ----------
+        chunk_id: 3-tuple of Integer
+        \t(tab, col, chunk_no) of the new chunk
+        items: List of 2-tuples
+        \t(key, encoded code) of the cells in the chunk
+
+        """
+
+        width = max(len(encoded_value) for _, encoded_value in items)
+        array = numpy.zeros(self.chunk_size, dtype="S{}".format(width))
+
+        for key, encoded_value in items:
+            array[self._locate(key)[1]] = encoded_value
+
+        self.chunks[chunk_id] = [array, len(items)]
+        self.length += len(items)
+
+    def get_slice(self, chunk_id, start, stop):
+        """Returns copy of the encoded code in rows start to stop of chunk
+
+        Rows of missing chunks are returned as empty byte strings.
+
+        """
+
+        try:
+            return self.chunks[chunk_id][0][start:stop].copy()
+
+        except KeyError:
+            return numpy.zeros(stop - start, dtype="S1")
+
+    def set_slice(self, chunk_id, start, values):
+        """Sets encoded code of consecutive rows of chunk from start on
+
+        The chunk is created if it is missing and removed if it becomes
+        empty. Empty byte strings in values remove cells.
+
+        Parameters
+        ----------
+        chunk_id: 3-tuple of Integer
+        \t(tab, col, chunk_no) of the chunk
+        start: Integer
+        \tFirst row of the slice within the chunk
+        values: 1D numpy byte string array
+        \tEncoded code of the rows, not longer than max_width bytes
+
+        """
+
+        try:
+            chunk = self.chunks[chunk_id]
+
+        except KeyError:
+            if not numpy.count_nonzero(values):
+                return
+
+            array = numpy.zeros(self.chunk_size, dtype=values.dtype)
+            chunk = self.chunks[chunk_id] = [array, 0]
+
+        array = chunk[0]
+
+        if values.itemsize > array.itemsize:
+            array = chunk[0] = array.astype(values.dtype)
+
+        array[start:start + len(values)] = values
+
+        no_filled = numpy.count_nonzero(array)
+        self.length += no_filled - chunk[1]
+        chunk[1] = no_filled
+
+        if not no_filled:
+            del self.chunks[chunk_id]
+
+    def iterkeys(self):
+        """Generator of keys of stored cells"""
+
+        chunk_size = self.chunk_size
+
+        for (tab, col, chunk_no), (array, _) in self.chunks.items():
+            offset = chunk_no * chunk_size
+            for pos in numpy.flatnonzero(array):
+                yield offset + int(pos), col, tab
+
+    def itertablekeys(self, tab):
+        """Generator of keys of stored cells of table tab in row-major order
+
+        Only the cells of one chunk row are held at a time.
+
+        """
+
+        chunk_size = self.chunk_size
+
+        # Maps chunk_no to columns of the chunks of table tab
+        chunk_cols = {}
+        for chunk_tab, col, chunk_no in self.chunks:
+            if chunk_tab == tab:
+                chunk_cols.setdefault(chunk_no, []).append(col)
+
+        for chunk_no in sorted(chunk_cols):
+            cols = sorted(chunk_cols[chunk_no])
+
+            filled = numpy.zeros((chunk_size, len(cols)), dtype=bool)
+            for i, col in enumerate(cols):
+                array = self.chunks[tab, col, chunk_no][0]
+                filled[numpy.flatnonzero(array), i] = True
+
+            offset = chunk_no * chunk_size
+            for pos, i in izip(*numpy.nonzero(filled)):
+                yield offset + int(pos), cols[i], tab
+
+    def iteritems(self):
+        """Generator of (key, code) of stored cells"""
+
+        chunk_size = self.chunk_size
+
+        for (tab, col, chunk_no), (array, _) in self.chunks.items():
+            offset = chunk_no * chunk_size
+            for pos in numpy.flatnonzero(array):
+                yield (offset + int(pos), col, tab), \
+                    array[pos].decode("utf-8")
+
+    def move(self, index, start, offset, size=None, tab=None):
+        """Moves stored cells without undo
+
+        Cells with a key position of at least start are moved by offset.
+        Cells that are overwritten by the move or that leave range(size)
+        are removed. Moves along columns and tables re-key whole chunks.
+        Moves along rows shift the chunk arrays of each column.
+
+        Parameters
+        ----------
+        index: Integer
+        \tIndex of the position in the keys (row, col, tab) that is moved
+        start: Integer
+        \tFirst position that is moved
+        offset: Integer
+        \tNumber of positions by which the cells are moved
+        size: Integer, defaults to None
+        \tNumber of valid positions, no limit if None
+        tab: Integer, defaults to None
+        \tIf given then only cells of this table are moved
+
+        Returns
+        -------
+        removed: Dict
+        \tMaps key to code of the removed cells
+
+        """
+
+        # Positions in front of start are overwritten when moving backwards
+        lowest = start + offset if offset < 0 else start
+
+        removed = {}
+
+        if index == 0:
+            first = lowest // self.chunk_size
+
+            # Maps (tab, col) to chunk_nos of the chunks that are shifted
+            column_chunks = {}
+            for chunk_tab, col, chunk_no in self.chunks:
+                if chunk_no >= first and (tab is None or chunk_tab == tab):
+                    column_chunks.setdefault((chunk_tab, col), []).append(
+                        chunk_no)
+
+            for (chunk_tab, col), chunk_nos in column_chunks.iteritems():
+                self._shift_rows(chunk_tab, col, chunk_nos, start, offset,
+                                 size, removed)
+
+            return removed
+
+        # Chunk ids are (tab, col, chunk_no) whereas keys are (row, col, tab)
+        id_index = 2 - index
+
+        moved = {}
+
+        for chunk_id in self.chunks.keys():
+            pos = chunk_id[id_index]
+            if pos < lowest or tab is not None and chunk_id[0] != tab:
+                continue
+
+            new_pos = pos + offset
+            in_range = size is None or 0 <= new_pos < size
+
+            if not offset and in_range:
+                continue
+
+            chunk = self.chunks.pop(chunk_id)
+
+            if pos < start or not in_range:
+                chunk_tab, col, chunk_no = chunk_id
+                top = chunk_no * self.chunk_size
+                for chunk_pos in numpy.flatnonzero(chunk[0]):
+                    key = top + int(chunk_pos), col, chunk_tab
+                    removed[key] = chunk[0][chunk_pos].decode("utf-8")
+
+                self.length -= chunk[1]
+
+            else:
+                new_chunk_id = list(chunk_id)
+                new_chunk_id[id_index] = new_pos
+                moved[tuple(new_chunk_id)] = chunk
+
+        self.chunks.update(moved)
+
+        return removed
+
+    def _shift_rows(self, tab, col, chunk_nos, start, offset, size, removed):
+        """Shifts rows of one column without undo, see move
+
+        Parameters
+        ----------
+        tab, col: Integer
+        \tTable and column of the shifted chunks
+        chunk_nos: List of Integer
+        \tNumbers of the chunks of the column that contain shifted rows
+        start, offset, size:
+        \tParameters of move
+        removed: Dict
+        \tRemoved cells are added to this dict
+
+        """
+
+        chunk_size = self.chunk_size
+        lowest = start + offset if offset < 0 else start
+
+        old_chunks = {}
+        for chunk_no in chunk_nos:
+            chunk = old_chunks[chunk_no] = self.chunks.pop(
+                (tab, col, chunk_no))
+            self.length -= chunk[1]
+
+        def get_rows(top, bottom):
+            """Returns encoded code of the old rows from top to bottom"""
+
+            parts = []
+            row = top
+            while row < bottom:
+                chunk_no, pos = divmod(row, chunk_size)
+                stop = min(bottom, (chunk_no + 1) * chunk_size)
+                try:
+                    parts.append(old_chunks[chunk_no][0][pos:pos + stop - row])
+                except KeyError:
+                    parts.append(numpy.zeros(stop - row, dtype="S1"))
+                row = stop
+
+            return numpy.concatenate(parts)
+
+        new_chunk_nos = set()
+
+        for chunk_no, (array, _) in old_chunks.iteritems():
+            top = chunk_no * chunk_size
+
+            rows = top + numpy.flatnonzero(array)
+            is_removed = rows >= lowest
+            if size is None:
+                is_removed &= rows < start
+            else:
+                is_removed &= (rows < start) | (rows + offset >= size)
+
+            for row in rows[is_removed]:
+                removed[int(row), col, tab] = \
+                    array[row - top].decode("utf-8")
+
+            if top < lowest:
+                new_chunk_nos.add(chunk_no)
+
+            moved_top = max(top, start) + offset
+            moved_bottom = top + chunk_size - 1 + offset
+            if moved_top <= moved_bottom:
+                new_chunk_nos.update(xrange(moved_top // chunk_size,
+                                            moved_bottom // chunk_size + 1))
+
+        width = max(array.itemsize for array, _ in old_chunks.itervalues())
+
+        for chunk_no in new_chunk_nos:
+            top = chunk_no * chunk_size
+            bottom = top + chunk_size
+            if size is not None and top >= size:
+                continue
+
+            array = numpy.zeros(chunk_size, dtype="S{}".format(width))
+
+            # Rows in front of lowest stay in place
+            kept_bottom = min(lowest, bottom)
+            if kept_bottom > top:
+                array[:kept_bottom - top] = get_rows(top, kept_bottom)
+
+            # Rows from start + offset on are moved rows
+            moved_top = max(top, start + offset)
+            moved_bottom = bottom if size is None else min(bottom, size)
+            if moved_bottom > moved_top:
+                array[moved_top - top:moved_bottom - top] = \
+                    get_rows(moved_top - offset, moved_bottom - offset)
+
+            no_filled = numpy.count_nonzero(array)
+            if no_filled:
+                self.chunks[tab, col, chunk_no] = [array, no_filled]
+                self.length += no_filled
+
+    def clear(self):
+        """Removes all chunks"""
+
+        self.chunks.clear()
+        self.length = 0
+
+    def copy(self):
+        """Returns ColumnStore with copies of the chunk arrays"""
+
+        column_store = ColumnStore()
+        column_store.chunks = dict((chunk_id, [array.copy(), count])
+                                   for chunk_id, (array, count)
+                                   in self.chunks.iteritems())
+        column_store.length = self.length
+
+        return column_store
+
+# End of class ColumnStore
+
+# -----------------------------------------------------------------------------
+
+
 
 class CellAttributes(list):
     """Stores cell formatting attributes in a list of 3 - tuples
@@ -145,6 +607,16 @@ class CellAttributes(list):
         self.reverse = None
         self.sort = None
 
+        # Maps table to SelectionIndex of the attributes' list positions
+        self._table_cache = {}
+
+        # Cache for __getitem__ maps key to attr_dict
+        self._attr_cache = LRUCache(config["attr_cache_size"])
+
+        # Items that have been appended since the journal has been started,
+        # None if changes are not recorded, see DataArray.start_journal
+        self.journal = None
+
     default_cell_attributes = {
         "borderwidth_bottom": 1,
         "borderwidth_right": 1,
@@ -172,57 +644,109 @@ class CellAttributes(list):
         "video_volume": None,
     }
 
-    # Cache for __getattr__ maps key to tuple of len and attr_dict
+    def append(self, value):
+        """Appends value and records it as compact undo batch"""
 
-    _attr_cache = {}
-    _table_cache = {}
+        self._restore_item(len(self), value)
 
-    @undoable
-    def append(self, value):
-        list.append(self, value)
-        self._attr_cache.clear()
-        self._table_cache.clear()
+        record_undo(self._restore_item, len(self) - 1, None, value, "append")
 
-        yield "append"
+    def _restore_item(self, index, value):
+        """Inserts value at index or removes the item at index if value is None
 
-        # Undo actions
+        Items that have been appended without undo records after index,
+        e.g. by lazily loaded tables, are kept.
+        This operation does not create undo records.
 
-        list.pop(self)
-        self._attr_cache.clear()
-        self._table_cache.clear()
+        Parameters
+        ----------
+        index: Integer
+        \tList position of the item
+        value: 3-tuple or None
+        \tCell attribute item that is inserted
+
+        """
+
+        is_last = index == len(self) - (1 if value is None else 0)
+
+        if value is None:
+            value = list.pop(self, index)
+            self._invalidate_attr_cache(value)
+
+            if self.journal is not None:
+                if is_last and self.journal and self.journal[-1] is value:
+                    self.journal.pop()
+                else:
+                    # Only the last journaled item can be removed
+                    self.journal = None
+
+            if is_last and len(self) + 1 == self._len_table_cache():
+                self._remove_from_table_cache(index, value)
+            else:
+                # Indices of subsequent items have changed
+                self._table_cache.clear()
+
+        else:
+            # Only an up to date table cache is updated incrementally
+            table_cache_valid = is_last and \
+                len(self) == self._len_table_cache()
+
+            list.insert(self, index, value)
+            self._invalidate_attr_cache(value)
+
+            if self.journal is not None:
+                if is_last:
+                    self.journal.append(value)
+                else:
+                    self.journal = None
+
+            if table_cache_valid:
+                self._add_to_table_cache(index)
+            else:
+                self._table_cache.clear()
 
     def __getitem__(self, key):
         """Returns attribute dict for a single key"""
 
         assert not any(type(key_ele) is SliceType for key_ele in key)
 
-        if key in self._attr_cache:
-            cache_len, cache_dict = self._attr_cache[key]
-
-            # Use cache result only if no new attrs have been defined
-            if cache_len == len(self):
-                return cache_dict
-
         # Update table cache if it is outdated (e.g. when creating a new grid)
         if len(self) != self._len_table_cache():
             self._update_table_cache()
+            self._attr_cache.clear()
+
+        try:
+            return self._attr_cache[key]
+
+        except KeyError:
+            pass
 
         row, col, tab = key
 
         result_dict = copy(self.default_cell_attributes)
 
         try:
-            for selection, attr_dict in self._table_cache[tab]:
-                if (row, col) in selection:
-                    result_dict.update(attr_dict)
+            for index in self._table_cache[tab].get_ids(row, col):
+                result_dict.update(list.__getitem__(self, index)[2])
         except KeyError:
             pass
 
-        # Upddate cache with current length and dict
-        self._attr_cache[key] = (len(self), result_dict)
+        self._attr_cache[key] = result_dict
 
         return result_dict
 
+    def cache_info(self):
+        """Returns (hits, misses, size) of the cache of __getitem__
+
+        Hits and misses are counted from the creation of the cache on.
+        size is the number of cached cells.
+
+        """
+
+        attr_cache = self._attr_cache
+
+        return attr_cache.hits, attr_cache.misses, len(attr_cache)
+
     @undoable
     def __setitem__(self, key, value):
         """Undoable version of list.__setitem__"""
@@ -234,8 +758,11 @@ class CellAttributes(list):
 
         list.__setitem__(self, key, value)
 
-        self._attr_cache.clear()
-        self._table_cache.clear()
+        self._replace_in_attr_cache(key, old_value, value)
+        self._replace_in_table_cache(key, old_value)
+
+        # Replaced items cannot be journaled
+        self.journal = None
 
         yield "__setitem__"
 
@@ -244,8 +771,40 @@ class CellAttributes(list):
         else:
             list.__setitem__(self, key, old_value)
 
-        self._attr_cache.clear()
-        self._table_cache.clear()
+        self._replace_in_attr_cache(key, value, old_value)
+        self._replace_in_table_cache(key, value)
+
+    def _invalidate_attr_cache(self, value):
+        """Removes cached attributes of the cells that value may alter
+
+        Parameters
+        ----------
+        value: 3-tuple
+        \tCell attribute item (selection, table, attr_dict)
+
+        """
+
+        selection, table, _ = value
+
+        if selection.block_tl or selection.rows or selection.cols:
+            for key in list(self._attr_cache):
+                if key[2] == table and key[:2] in selection:
+                    self._attr_cache.pop(key)
+
+        else:
+            # Only single cells are affected
+            for row, col in selection.cells:
+                self._attr_cache.pop((row, col, table), None)
+
+    def _replace_in_attr_cache(self, key, old_value, new_value):
+        """Updates attribute cache after the item at key has been replaced"""
+
+        if type(key) is not IntType or old_value is None:
+            self._attr_cache.clear()
+            return
+
+        self._invalidate_attr_cache(old_value)
+        self._invalidate_attr_cache(new_value)
 
     def _len_table_cache(self):
         """Returns the length of the table cache"""
@@ -257,18 +816,59 @@ class CellAttributes(list):
 
         return length
 
+    def _add_to_table_cache(self, index):
+        """Adds the cell attribute at list position index to table cache"""
+
+        selection, table, _ = list.__getitem__(self, index)
+
+        try:
+            self._table_cache[table].add(index, selection)
+        except KeyError:
+            self._table_cache[table] = SelectionIndex()
+            self._table_cache[table].add(index, selection)
+
+    def _remove_from_table_cache(self, index, old_value):
+        """Removes old_value at list position index from table cache"""
+
+        table = old_value[1]
+
+        self._table_cache[table].remove(index)
+        if not self._table_cache[table]:
+            del self._table_cache[table]
+
+    def _replace_in_table_cache(self, key, old_value):
+        """Updates table cache after the item at key has been replaced
+
+        Slices and out of sync table caches lead to a full cache reset.
+
+        """
+
+        if type(key) is not IntType or old_value is None or \
+           len(self) != self._len_table_cache():
+            self._table_cache.clear()
+            return
+
+        if key < 0:
+            key += len(self)
+
+        self._remove_from_table_cache(key, old_value)
+        self._add_to_table_cache(key)
+
     def _update_table_cache(self):
         """Clears and updates the table cache to be in sync with self"""
 
         self._table_cache.clear()
-        for sel, tab, val in self:
-            try:
-                self._table_cache[tab].append((sel, val))
-            except KeyError:
-                self._table_cache[tab] = [(sel, val)]
+        for index in xrange(len(self)):
+            self._add_to_table_cache(index)
 
         assert len(self) == self._len_table_cache()
 
+    def get_merging_tables(self):
+        """Returns set of tables that may contain merged cells"""
+
+        return set(table for __, table, attr_dict in self
+                   if attr_dict.get("merge_area"))
+
     def get_merging_cell(self, key):
         """Returns key of cell that merges the cell key
 
@@ -303,6 +903,10 @@ class DictGrid(KeyValueStore):
 
     This class represents layer 1 of the model.
 
+    Cell code is stored in the dict itself. After compact has been called,
+    densely filled column ranges are kept in the ColumnStore columns instead.
+    All dict access methods that the model uses cover both storages.
+
     Parameters
     ----------
     shape: n-tuple of integer
@@ -315,10 +919,16 @@ class DictGrid(KeyValueStore):
 
         self.shape = shape
 
+        # Dense storage for large grids, see compact
+        self.columns = ColumnStore()
+
         self.cell_attributes = CellAttributes()
 
         self.macros = u""
 
+        # Macros at the journal start, see DataArray.start_journal
+        self.journal_macros = None
+
         default_row_height = config["default_row_height"]
         default_col_width = config["default_col_width"]
 
@@ -338,8 +948,200 @@ class DictGrid(KeyValueStore):
                 msg = msg.format(key=key, shape=shape)
                 raise IndexError(msg)
 
+        if self.columns.length:
+            value = self.columns.get(key)
+            if value is not None:
+                return value
+
         return KeyValueStore.__getitem__(self, key)
 
+    def _set_value(self, key, value):
+        """Stores value in column storage if possible else in dict"""
+
+        if self.journal is not None:
+            self.journal.add(key)
+
+        if self.columns.length and self.columns.set(key, value):
+            dict.pop(self, key, None)
+
+        else:
+            self.columns.pop(key)
+            dict.__setitem__(self, key, value)
+
+    def _pop_value(self, key, *args):
+        """Pops value from column storage or from dict"""
+
+        if self.journal is not None:
+            self.journal.add(key)
+
+        if self.columns.length:
+            value = self.columns.pop(key)
+            if value is not None:
+                return value
+
+        return dict.pop(self, key, *args)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self.columns
+
+    def __len__(self):
+        return dict.__len__(self) + len(self.columns)
+
+    def __iter__(self):
+        return self.iterkeys()
+
+    def __eq__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+
+        if not self.columns.length and \
+           not getattr(other, "columns", self.columns).length:
+            return dict.__eq__(self, other)
+
+        return len(self) == len(other) and \
+            all(other.get(key) == value for key, value in self.iteritems())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+
+        if equal is NotImplemented:
+            return equal
+
+        return not equal
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+
+        return default
+
+    def iterkeys(self):
+        for key in dict.iterkeys(self):
+            yield key
+
+        for key in self.columns.iterkeys():
+            yield key
+
+    def keys(self):
+        return list(self.iterkeys())
+
+    def itertablekeys(self, tab):
+        """Generator of keys of cells of table tab in row-major order
+
+        Keys of the dict are sorted. Column storage is walked chunk row by
+        chunk row.
+
+        """
+
+        dict_keys = sorted(key for key in dict.iterkeys(self) if key[2] == tab)
+
+        return heapq.merge(dict_keys, self.columns.itertablekeys(tab))
+
+    def iteritems(self):
+        for item in dict.iteritems(self):
+            yield item
+
+        for item in self.columns.iteritems():
+            yield item
+
+    def items(self):
+        return list(self.iteritems())
+
+    def itervalues(self):
+        for _, value in self.iteritems():
+            yield value
+
+    def values(self):
+        return list(self.itervalues())
+
+    def update(self, *args, **kwargs):
+        """Non-undoable update that considers the column storage"""
+
+        for key, value in dict(*args, **kwargs).iteritems():
+            self._set_value(key, value)
+
+    def clear(self):
+        dict.clear(self)
+        self.columns.clear()
+
+        # Removed keys are unknown
+        self.journal = None
+
+    def _restore_column_slice(self, slice_key, values):
+        """Sets a column slice in column storage without undo
+
+        Parameters
+        ----------
+        slice_key: 2-tuple
+        \tChunk id (tab, col, chunk_no) and first row in chunk
+        values: 1D numpy byte string array
+        \tEncoded code of the rows of the slice
+
+        """
+
+        chunk_id, start = slice_key
+
+        if self.journal is not None:
+            tab, col, chunk_no = chunk_id
+            top = chunk_no * self.columns.chunk_size + start
+            self.journal.update(product(xrange(top, top + len(values)),
+                                        (col,), (tab,)))
+
+        self.columns.set_slice(chunk_id, start, values)
+
+    def _move_column_cells(self, index, start, offset, size=None, tab=None):
+        """Moves cells in column storage without undo, see ColumnStore.move
+
+        Cells that are moved chunk-wise are not journaled. Therefore, the
+        changes are unknown afterwards.
+
+        """
+
+        if not self.columns.length:
+            return {}
+
+        self.journal = None
+
+        return self.columns.move(index, start, offset, size, tab)
+
+    def compact(self, min_density=0.25):
+        """Moves densely filled column ranges into column storage
+
+        Only unicode code that fits into ColumnStore.max_width bytes is moved.
+        This operation does not change the grid content and is not undoable.
+
+        Parameters
+        ----------
+        min_density: Float, defaults to 0.25
+        \tMinimum share of filled rows of a chunk that is moved
+
+        """
+
+        columns = self.columns
+        chunk_size = columns.chunk_size
+
+        # Maps chunk_id to list of (key, encoded code)
+        chunk_candidates = {}
+
+        for key, value in dict.iteritems(self):
+            encoded_value = columns._encode(value)
+            if encoded_value is not None and key[0] >= 0:
+                chunk_id = columns._locate(key)[0]
+                try:
+                    chunk_candidates[chunk_id].append((key, encoded_value))
+                except KeyError:
+                    chunk_candidates[chunk_id] = [(key, encoded_value)]
+
+        for chunk_id, items in chunk_candidates.iteritems():
+            if chunk_id in columns.chunks or \
+               len(items) < chunk_size * min_density:
+                continue
+
+            columns.add_chunk(chunk_id, items)
+
+            for key, _ in items:
+                dict.pop(self, key)
+
 # End of class DictGrid
 
 # -----------------------------------------------------------------------------
@@ -519,6 +1321,7 @@ class DataArray(object):
         # Empty cell_attributes first
         self.cell_attributes[:] = []
         self.cell_attributes.extend(value)
+        self.cell_attributes.journal = None
 
     cell_attributes = attributes = \
         property(_get_cell_attributes, _set_cell_attributes)
@@ -540,6 +1343,108 @@ class DataArray(object):
 
     macros = property(_get_macros, _set_macros)
 
+    def get_snapshot(self):
+        """Returns DataArray with a copy of the data that is saved in files
+
+        Code, cell attributes, row heights, column widths, macros and shape
+        are copied at once without undo records. Therefore, the snapshot
+        can be saved in another thread while the data is edited. Code
+        strings and cell attribute items are shared because they are
+        replaced and not modified on edits.
+
+        """
+
+        snapshot = DataArray(self.shape)
+        dict_grid = snapshot.dict_grid
+
+        dict.update(dict_grid, self.dict_grid)
+        dict_grid.columns = self.dict_grid.columns.copy()
+
+        list.extend(dict_grid.cell_attributes, self.cell_attributes)
+
+        dict.update(dict_grid.row_heights, self.row_heights)
+        dict.update(dict_grid.col_widths, self.col_widths)
+
+        dict_grid.macros = self.macros
+
+        snapshot.safe_mode = self.safe_mode
+
+        return snapshot
+
+    # Change journal for incremental saving
+
+    def _get_journal_stores(self):
+        """Returns list of the stores that record changes"""
+
+        return [self.dict_grid, self.cell_attributes, self.row_heights,
+                self.col_widths]
+
+    def start_journal(self):
+        """Starts recording changes for incremental saving
+
+        Changes are recorded independently from undo. They are retrieved
+        with get_journal.
+
+        """
+
+        self.dict_grid.journal = set()
+        self.cell_attributes.journal = []
+        self.row_heights.journal = set()
+        self.col_widths.journal = set()
+
+        self.dict_grid.journal_macros = self.macros
+
+    def stop_journal(self):
+        """Stops recording changes"""
+
+        for store in self._get_journal_stores():
+            store.journal = None
+
+        self.dict_grid.journal_macros = None
+
+    def get_journal(self):
+        """Returns changes since start_journal, None if they are unknown
+
+        Changes are unknown if the journal has not been started or if a
+        change cannot be recorded, e.g. on replacing cell attributes.
+
+        The journal is a dict with the keys:
+         * grid: Set of keys of changed or removed cells
+         * attributes: List of appended cell attributes
+         * row_heights: Set of keys of changed or removed row heights
+         * col_widths: Set of keys of changed or removed column widths
+         * macros: Bool, True if macros have changed
+
+        """
+
+        if any(store.journal is None for store in self._get_journal_stores()):
+            return
+
+        return {
+            "grid": self.dict_grid.journal,
+            "attributes": self.cell_attributes.journal,
+            "row_heights": self.row_heights.journal,
+            "col_widths": self.col_widths.journal,
+            "macros": self.macros != self.dict_grid.journal_macros,
+        }
+
+    @contextmanager
+    def journal_suspended(self):
+        """Context manager that does not record changes, e.g. for loading"""
+
+        stores = self._get_journal_stores()
+        journals = [store.journal for store in stores]
+
+        for store in stores:
+            store.journal = None
+
+        try:
+            yield
+
+        finally:
+            for store, journal in zip(stores, journals):
+                store.journal = journal
+
     def keys(self):
         """Returns keys in self.dict_grid"""
 
@@ -717,6 +1622,114 @@ class DataArray(object):
                 except (KeyError, TypeError):
                     pass
 
+    def set_cells(self, cells):
+        """Sets code of many single cells
+
+        Unlike __setitem__, slices are not resolved. Each change is recorded
+        as compact undo batch so that a surrounding undo group results in
+        one undo record.
+
+        Parameters
+        ----------
+        cells: Iterable of 2-tuples
+        \tSingle cell keys and code, empty code deletes the cell
+
+        """
+
+        dict_grid = self.dict_grid
+        get_merging_cell = self.cell_attributes.get_merging_cell
+
+        # Merged cells are only looked up in tables that contain them
+        merging_tables = self.cell_attributes.get_merging_tables()
+
+        changed_keys = []
+
+        for key, value in cells:
+            if value:
+                # Never change merged cells
+                if key[2] in merging_tables:
+                    merging_cell = get_merging_cell(key)
+                    if merging_cell is not None and merging_cell != key:
+                        continue
+
+                dict_grid[key] = value
+                changed_keys.append(key)
+
+            elif key in dict_grid:
+                dict_grid.pop(key)
+                changed_keys.append(key)
+
+        return changed_keys
+
+    def set_block(self, top, left, tab, block):
+        """Replaces the code of a block of cells directly in column storage
+
+        The block is written column by column into the chunk arrays of the
+        column storage. Cells of the block that are kept in the dict are
+        removed first. Each chunk slice is recorded as one compact undo
+        batch. Merged cells are not taken into account.
+
+        Parameters
+        ----------
+        top: Integer
+        \tTop row of the block
+        left: Integer
+        \tLeft column of the block
+        tab: Integer
+        \tTable of the block
+        block: 2D numpy byte string array
+        \tUTF-8 encoded code of the rows of the block, empty strings delete
+        \tcells, not longer than ColumnStore.max_width bytes
+
+        """
+
+        dict_grid = self.dict_grid
+        columns = dict_grid.columns
+        chunk_size = columns.chunk_size
+
+        no_rows, no_cols = block.shape
+        bottom, right = top + no_rows, left + no_cols
+
+        if not (0 <= top and bottom <= self.shape[0] and 0 <= left and
+                right <= self.shape[1] and 0 <= tab < self.shape[2]):
+            msg = "Block {block} outside grid shape {shape}.".format(
+                block=(top, left, bottom - 1, right - 1, tab), shape=self.shape)
+            raise IndexError(msg)
+
+        if block.itemsize > columns.max_width:
+            msg = "Block code is longer than {} bytes.".format(
+                columns.max_width)
+            raise ValueError(msg)
+
+        if dict.__len__(dict_grid):
+            in_dict = partial(dict.__contains__, dict_grid)
+            region = product(xrange(top, bottom), xrange(left, right), (tab,))
+            for key in filter(in_dict, region):
+                dict_grid.pop(key)
+
+        restore = dict_grid._restore_column_slice
+
+        for col_no in xrange(no_cols):
+            column = block[:, col_no]
+
+            row = top
+            while row < bottom:
+                # Each slice ends at a chunk border or at the block bottom
+                row_stop = min(bottom, (row // chunk_size + 1) * chunk_size)
+
+                chunk_id, start = columns._locate((row, left + col_no, tab))
+                slice_key = chunk_id, start
+
+                old_values = columns.get_slice(chunk_id, start,
+                                               start + row_stop - row)
+                values = column[row - top:row_stop - top]
+
+                restore(slice_key, values)
+                record_undo(restore, slice_key, old_values, values,
+                            "set_block")
+
+                row = row_stop
+
     def cell_array_generator(self, key):
         """Generator traversing cells specified in key
 
@@ -751,73 +1764,197 @@ class DataArray(object):
 
                 break
 
-    def _shift_rowcol(self, insertion_point, no_to_insert):
-        """Shifts row and column sizes when a table is inserted or deleted"""
+    def _move_keys(self, store, index, start, offset, size=None, tab=None):
+        """Moves entries of a KeyValueStore without undo
+
+        Entries with a key position of at least start are moved by offset.
+        Entries that are overwritten by the move or that leave range(size)
+        are removed.
+
+        Parameters
+        ----------
+        store: KeyValueStore
+        \tStore with tuple keys that end with the table
+        index: Integer
+        \tIndex of the position in the keys that is moved
+        start: Integer
+        \tFirst position that is moved
+        offset: Integer
+        \tNumber of positions by which the entries are moved
+        size: Integer, defaults to None
+        \tNumber of valid positions, no limit if None
+        tab: Integer, defaults to None
+        \tIf given then only entries of this table are moved
+
+        Returns
+        -------
+        removed: Dict
+        \tRemoved entries, which are required for reverting the move
+
+        """
+
+        removed, moved = self._pop_moved_keys(store, index, start, offset,
+                                              size, tab)
 
-        # Shift row heights
+        for key, value in moved.iteritems():
+            store._set_value(key, value)
 
-        new_row_heights = {}
-        del_row_heights = []
+        return removed
 
-        for row, tab in self.row_heights:
-            if tab > insertion_point:
-                new_row_heights[(row, tab + no_to_insert)] = \
-                    self.row_heights[(row, tab)]
-                del_row_heights.append((row, tab))
+    def _pop_moved_keys(self, store, index, start, offset, size=None,
+                        tab=None):
+        """Pops the entries of a KeyValueStore that _move_keys moves
 
-        for row, tab in new_row_heights:
-            self.set_row_height(row, tab, new_row_heights[(row, tab)])
+        Only the dict entries are popped. Cells in the column storage of a
+        DictGrid are moved by _move_cells.
 
-        for row, tab in del_row_heights:
-            if (row, tab) not in new_row_heights:
-                self.set_row_height(row, tab, None)
+        Returns
+        -------
+        removed: Dict
+        \tRemoved entries, which are required for reverting the move
+        moved: Dict
+        \tPopped entries with their new keys
 
-        # Shift column widths
+        """
 
-        new_col_widths = {}
-        del_col_widths = []
+        # Positions in front of start are overwritten when moving backwards
+        lowest = start + offset if offset < 0 else start
 
-        for col, tab in self.col_widths:
-            if tab > insertion_point:
-                new_col_widths[(col, tab + no_to_insert)] = \
-                    self.col_widths[(col, tab)]
-                del_col_widths.append((col, tab))
+        removed = {}
+        moved = {}
 
-        for col, tab in new_col_widths:
-            self.set_col_width(col, tab, new_col_widths[(col, tab)])
+        for key in dict.keys(store):
+            pos = key[index]
+            if pos < lowest or tab is not None and key[-1] != tab:
+                continue
 
-        for col, tab in del_col_widths:
-            if (col, tab) not in new_col_widths:
-                self.set_col_width(col, tab, None)
+            if pos < start:
+                removed[key] = store._pop_value(key)
+                continue
 
-    def _adjust_rowcol(self, insertion_point, no_to_insert, axis, tab=None):
-        """Adjusts row and column sizes on insertion/deletion"""
+            new_pos = pos + offset
+            in_range = size is None or 0 <= new_pos < size
+
+            if not offset and in_range:
+                continue
+
+            value = store._pop_value(key)
+
+            if in_range:
+                new_key = list(key)
+                new_key[index] = new_pos
+                moved[tuple(new_key)] = value
+            else:
+                removed[key] = value
+
+        return removed, moved
+
+    def _restore_keys(self, store, index, start, offset, removed, tab=None):
+        """Reverts _move_keys without undo
+
+        Parameters
+        ----------
+        store, index, start, offset, tab:
+        \tParameters of the _move_keys call that is reverted
+        removed: Dict
+        \tEntries that have been returned from the _move_keys call
+
+        """
+
+        if offset:
+            self._move_keys(store, index, start + offset, -offset, tab=tab)
+
+        for key, value in removed.iteritems():
+            store._set_value(key, value)
+
+    def _move_cells(self, start, offset, axis, tab=None):
+        """Moves cell code without undo, see _move_keys
+
+        Chunks of the column storage are shifted as a whole. Only the cells
+        in the dict are moved one by one.
+
+        """
+
+        dict_grid = self.dict_grid
+        size = self.shape[axis]
+
+        removed, moved = self._pop_moved_keys(dict_grid, axis, start, offset,
+                                              size, tab)
+
+        removed.update(dict_grid._move_column_cells(axis, start, offset,
+                                                    size, tab))
+
+        for key, value in moved.iteritems():
+            dict_grid._set_value(key, value)
+
+        return removed
+
+    def _restore_cells(self, start, offset, axis, removed, tab=None):
+        """Reverts _move_cells without undo"""
+
+        if offset:
+            self._move_cells(start + offset, -offset, axis, tab)
+
+        for key, value in removed.iteritems():
+            self.dict_grid._set_value(key, value)
+
+    def _get_rowcol_stores(self, axis):
+        """Returns list of (store, index) for the cell sizes along axis"""
 
         if axis == 2:
-            self._shift_rowcol(insertion_point, no_to_insert)
-            return
+            return [(self.row_heights, 1), (self.col_widths, 1)]
 
-        assert axis in (0, 1)
+        return [(self.col_widths if axis else self.row_heights, 0)]
 
-        cell_sizes = self.col_widths if axis else self.row_heights
-        set_cell_size = self.set_col_width if axis else self.set_row_height
+    def _move_rowcol(self, start, offset, axis, tab=None):
+        """Moves row heights or column widths without undo
 
-        new_sizes = {}
-        del_sizes = []
+        Row heights and column widths are both moved if axis is 2.
+        Returns list of removed entries for each moved store.
 
-        for pos, table in cell_sizes:
-            if pos > insertion_point and (tab is None or tab == table):
-                if 0 <= pos + no_to_insert < self.shape[axis]:
-                    new_sizes[(pos + no_to_insert, table)] = \
-                        cell_sizes[(pos, table)]
-                del_sizes.append((pos, table))
+        """
+
+        if axis == 2:
+            tab = None
 
-        for pos, table in new_sizes:
-            set_cell_size(pos, table, new_sizes[(pos, table)])
+        return [self._move_keys(store, index, start, offset, self.shape[axis],
+                                tab)
+                for store, index in self._get_rowcol_stores(axis)]
 
-        for pos, table in del_sizes:
-            if (pos, table) not in new_sizes:
-                set_cell_size(pos, table, None)
+    def _restore_rowcol(self, start, offset, axis, removed, tab=None):
+        """Reverts _move_rowcol without undo"""
+
+        if axis == 2:
+            tab = None
+
+        for (store, index), store_removed in \
+                zip(self._get_rowcol_stores(axis), removed):
+            self._restore_keys(store, index, start, offset, store_removed,
+                               tab)
+
+    @undoable
+    def _adjust_rowcol(self, insertion_point, no_to_insert, axis, tab=None):
+        """Adjusts row and column sizes on insertion/deletion
+
+        The undo record only consists of the move parameters and the sizes
+        that have been removed.
+
+        """
+
+        assert axis in (0, 1, 2)
+
+        if no_to_insert < 0:
+            start = insertion_point - no_to_insert
+        else:
+            start = insertion_point + 1
+
+        removed = self._move_rowcol(start, no_to_insert, axis, tab)
+
+        yield "_adjust_rowcol"
+
+        # Undo actions
+
+        self._restore_rowcol(start, no_to_insert, axis, removed, tab)
 
     def _get_adjusted_merge_area(self, attrs, insertion_point, no_to_insert,
                                  axis):
@@ -882,9 +2019,9 @@ class DataArray(object):
 
         return __top, __left, __bottom, __right
 
-    def _adjust_cell_attributes(self, insertion_point, no_to_insert, axis,
-                                tab=None, cell_attrs=None):
-        """Adjusts cell attributes on insertion/deletion
+    def _get_adjusted_cell_attributes(self, insertion_point, no_to_insert,
+                                      axis, tab=None):
+        """Returns list of cell attributes adjusted for insertion/deletion
 
         Parameters
         ----------
@@ -896,18 +2033,9 @@ class DataArray(object):
         \tSpecifies number of dimension, i.e. 0 == row, 1 == col, ...
         tab: Integer, defaults to None
         \tIf given then insertion is limited to this tab for axis < 2
-        cell_attrs: List, defaults to []
-        \tIf not empty then the given cell attributes replace the existing ones
 
         """
 
-        def replace_cell_attributes_table(index, new_table):
-            """Replaces table in cell_attributes item"""
-
-            ca = list(list.__getitem__(self.cell_attributes, index))
-            ca[1] = new_table
-            self.cell_attributes.__setitem__(index, tuple(ca))
-
         def get_ca_with_updated_ma(attrs, merge_area):
             """Returns cell attributes with updated merge area"""
 
@@ -923,66 +2051,104 @@ class DataArray(object):
 
             return new_attrs
 
-        if axis not in range(3):
-            raise ValueError("Axis must be in [0, 1, 2]")
-
-        assert tab is None or tab >= 0
-
-        if cell_attrs is None:
-            cell_attrs = []
+        cell_attributes = []
 
-        if cell_attrs:
-            self.cell_attributes[:] = cell_attrs
+        for selection, table, attrs in self.cell_attributes:
+            if axis < 2:
+                # Adjust selections on given table
 
-        elif axis < 2:
-            # Adjust selections on given table
-
-            ca_updates = {}
-            for i, (selection, table, attrs) in enumerate(
-                                                    self.cell_attributes):
-                selection = copy(selection)
                 if tab is None or tab == table:
+                    selection = copy(selection)
                     selection.insert(insertion_point, no_to_insert, axis)
                     # Update merge area if present
                     merge_area = self._get_adjusted_merge_area(attrs,
                                                                insertion_point,
                                                                no_to_insert,
                                                                axis)
-                    new_attrs = get_ca_with_updated_ma(attrs, merge_area)
+                    attrs = get_ca_with_updated_ma(attrs, merge_area)
+
+            elif no_to_insert < 0 and insertion_point <= table:
+                # Delete tabs
+
+                if insertion_point > table + no_to_insert:
+                    continue
+
+                table += no_to_insert
 
-                    ca_updates[i] = selection, table, new_attrs
+            elif insertion_point < table:
+                # Insert tabs
+
+                table += no_to_insert
+
+            cell_attributes.append((selection, table, attrs))
+
+        return cell_attributes
+
+    def _replace_cell_attributes(self, cell_attributes):
+        """Replaces all cell attributes without undo
+
+        Returns list of the replaced cell attributes.
+
+        """
+
+        old_cell_attributes = list(self.cell_attributes)
+
+        list.__setitem__(self.cell_attributes, slice(None), cell_attributes)
+
+        self.cell_attributes._attr_cache.clear()
+        self.cell_attributes._update_table_cache()
+        self.cell_attributes.journal = None
+
+        return old_cell_attributes
+
+    @undoable
+    def _adjust_cell_attributes(self, insertion_point, no_to_insert, axis,
+                                tab=None, cell_attrs=None):
+        """Adjusts cell attributes on insertion/deletion
+
+        The undo record only consists of the list of replaced attributes,
+        which shares its items with the adjusted list.
+
+        Parameters
+        ----------
+        insertion_point: Integer
+        \tPont on axis, before which insertion takes place
+        no_to_insert: Integer >= 0
+        \tNumber of rows/cols/tabs that shall be inserted
+        axis: Integer in range(3)
+        \tSpecifies number of dimension, i.e. 0 == row, 1 == col, ...
+        tab: Integer, defaults to None
+        \tIf given then insertion is limited to this tab for axis < 2
+        cell_attrs: List, defaults to []
+        \tIf not empty then the given cell attributes replace the existing ones
 
-            for idx in ca_updates:
-                self.cell_attributes[idx] = ca_updates[idx]
+        """
 
-        elif axis == 2:
-            # Adjust tabs
+        if axis not in range(3):
+            raise ValueError("Axis must be in [0, 1, 2]")
 
-            pop_indices = []
+        assert tab is None or tab >= 0
 
-            for i, cell_attribute in enumerate(self.cell_attributes):
-                selection, table, value = cell_attribute
+        if not cell_attrs:
+            cell_attrs = self._get_adjusted_cell_attributes(
+                insertion_point, no_to_insert, axis, tab)
 
-                if no_to_insert < 0 and insertion_point <= table:
-                    if insertion_point > table + no_to_insert:
-                        # Delete later
-                        pop_indices.append(i)
-                    else:
-                        replace_cell_attributes_table(i, table + no_to_insert)
+        old_cell_attributes = self._replace_cell_attributes(cell_attrs)
 
-                elif insertion_point < table:
-                    # Insert
-                    replace_cell_attributes_table(i, table + no_to_insert)
+        yield "_adjust_cell_attributes"
 
-            for i in pop_indices[::-1]:
-                self.cell_attributes.pop(i)
+        # Undo actions
 
-        self.cell_attributes._attr_cache.clear()
-        self.cell_attributes._update_table_cache()
+        self._replace_cell_attributes(old_cell_attributes)
 
+    @undoable
     def insert(self, insertion_point, no_to_insert, axis, tab=None):
         """Inserts no_to_insert rows/cols/tabs/... before insertion_point
 
+        Cells, cell sizes and cell attributes are moved in bulk. The single
+        undo record only consists of the move parameters and the cells and
+        sizes that have been moved out of the grid.
+
         Parameters
         ----------
 
@@ -1004,34 +2170,31 @@ class DataArray(object):
            insertion_point < -self.shape[axis]:
             raise IndexError("Insertion point not in grid")
 
-        new_keys = {}
-        del_keys = []
+        start = insertion_point + 1
 
-        for key in self.dict_grid.keys():
-            if key[axis] > insertion_point and (tab is None or tab == key[2]):
-                new_key = list(key)
-                new_key[axis] += no_to_insert
-                if 0 <= new_key[axis] < self.shape[axis]:
-                    new_keys[tuple(new_key)] = self(key)
-                del_keys.append(key)
+        removed_cells = self._move_cells(start, no_to_insert, axis, tab)
+        removed_sizes = self._move_rowcol(start, no_to_insert, axis, tab)
 
-        # Now re-insert moved keys
+        old_cell_attributes = self._replace_cell_attributes(
+            self._get_adjusted_cell_attributes(insertion_point, no_to_insert,
+                                               axis, tab))
 
-        for key in del_keys:
-            if key not in new_keys and self(key) is not None:
-                self.pop(key)
+        yield "insert"
 
-        self._adjust_rowcol(insertion_point, no_to_insert, axis, tab=tab)
-        self._adjust_cell_attributes(insertion_point, no_to_insert, axis, tab)
+        # Undo actions
 
-        for key in new_keys:
-            self.__setitem__(key, new_keys[key])
+        self._replace_cell_attributes(old_cell_attributes)
+        self._restore_rowcol(start, no_to_insert, axis, removed_sizes, tab)
+        self._restore_cells(start, no_to_insert, axis, removed_cells, tab)
 
+    @undoable
     def delete(self, deletion_point, no_to_delete, axis, tab=None):
         """Deletes no_to_delete rows/cols/... starting with deletion_point
 
         Axis specifies number of dimension, i.e. 0 == row, 1 == col, 2 == tab
 
+        Like insert, this results in one compact undo record.
+
         """
 
         if not 0 <= axis < len(self.shape):
@@ -1047,33 +2210,22 @@ class DataArray(object):
            deletion_point <= -self.shape[axis]:
             raise IndexError("Deletion point not in grid")
 
-        new_keys = {}
-        del_keys = []
-
-        # Note that the loop goes over a list that copies all dict keys
-        for key in self.dict_grid.keys():
-            if tab is None or tab == key[2]:
-                if deletion_point <= key[axis] < deletion_point + no_to_delete:
-                    del_keys.append(key)
+        start = deletion_point + no_to_delete
 
-                elif key[axis] >= deletion_point + no_to_delete:
-                    new_key = list(key)
-                    new_key[axis] -= no_to_delete
+        removed_cells = self._move_cells(start, -no_to_delete, axis, tab)
+        removed_sizes = self._move_rowcol(start, -no_to_delete, axis, tab)
 
-                    new_keys[tuple(new_key)] = self(key)
-                    del_keys.append(key)
+        old_cell_attributes = self._replace_cell_attributes(
+            self._get_adjusted_cell_attributes(deletion_point, -no_to_delete,
+                                               axis, tab))
 
-        # Now re-insert moved keys
+        yield "delete"
 
-        for key in new_keys:
-            self.__setitem__(key, new_keys[key])
-
-        for key in del_keys:
-            if key not in new_keys and self(key) is not None:
-                self.pop(key)
+        # Undo actions
 
-        self._adjust_rowcol(deletion_point, -no_to_delete, axis, tab=tab)
-        self._adjust_cell_attributes(deletion_point, -no_to_delete, axis)
+        self._replace_cell_attributes(old_cell_attributes)
+        self._restore_rowcol(start, -no_to_delete, axis, removed_sizes, tab)
+        self._restore_cells(start, -no_to_delete, axis, removed_cells, tab)
 
     def set_row_height(self, row, tab, height):
         """Sets row height"""
@@ -1108,6 +2260,119 @@ class DataArray(object):
 # -----------------------------------------------------------------------------
 
 
+# Marker for names that are not bound in an environment
+_unbound = object()
+
+
+class DependencyGraph(object):
+    """Reverse dependency graph of cell results
+
+    Nodes are the repr strings of cell keys (or of slice keys), i.e. the keys
+    of CodeArray.result_cache. An edge from a precedent to a dependent node
+    is recorded each time the dependent's evaluation reads the precedent via
+    S[...]. Global names that are loaded by cell code are tracked as well so
+    that cells that assign to a global only invalidate the cells that use it.
+
+    """
+
+    def __init__(self):
+        # Maps node to set of nodes that read it
+        self.dependents = {}
+
+        # Maps node to set of nodes that have been read during its evaluation
+        self.precedents = {}
+
+        # Maps global name to set of nodes whose code loads it
+        self.name_dependents = {}
+
+        # Maps node to the global names that its code loads
+        self.names = {}
+
+    def add_dependency(self, precedent, dependent):
+        """Records that dependent has read precedent during its evaluation"""
+
+        if precedent == dependent:
+            return
+
+        try:
+            self.dependents[precedent].add(dependent)
+        except KeyError:
+            self.dependents[precedent] = set([dependent])
+
+        try:
+            self.precedents[dependent].add(precedent)
+        except KeyError:
+            self.precedents[dependent] = set([precedent])
+
+    def clear_precedents(self, node):
+        """Removes all edges to node before it is (re-)evaluated"""
+
+        for precedent in self.precedents.pop(node, ()):
+            try:
+                self.dependents[precedent].discard(node)
+                if not self.dependents[precedent]:
+                    del self.dependents[precedent]
+            except KeyError:
+                pass
+
+    def set_names(self, node, names):
+        """Sets the global names that are loaded by the code of node"""
+
+        for name in self.names.pop(node, ()):
+            try:
+                self.name_dependents[name].discard(node)
+                if not self.name_dependents[name]:
+                    del self.name_dependents[name]
+            except KeyError:
+                pass
+
+        if names:
+            self.names[node] = names
+
+            for name in names:
+                try:
+                    self.name_dependents[name].add(node)
+                except KeyError:
+                    self.name_dependents[name] = set([node])
+
+    def get_dependents(self, nodes):
+        """Returns set of all transitive dependents of the given nodes
+
+        The given nodes are not part of the result unless they depend on
+        each other. Cyclic dependencies are visited only once.
+
+        """
+
+        result = set()
+        pending = list(nodes)
+
+        while pending:
+            node = pending.pop()
+            for dependent in self.dependents.get(node, ()):
+                if dependent not in result:
+                    result.add(dependent)
+                    pending.append(dependent)
+
+        return result
+
+    def get_name_dependents(self, name):
+        """Returns set of nodes whose code loads the global name"""
+
+        return set(self.name_dependents.get(name, ()))
+
+    def clear(self):
+        """Removes all nodes and edges"""
+
+        self.dependents.clear()
+        self.precedents.clear()
+        self.name_dependents.clear()
+        self.names.clear()
+
+# End of class DependencyGraph
+
+# -----------------------------------------------------------------------------
+
+
 class CodeArray(DataArray):
     """CodeArray provides objects when accessing cells via __getitem__
 
@@ -1126,8 +2391,26 @@ class CodeArray(DataArray):
     # Custom font storage
     custom_fonts = {}
 
+    def __init__(self, shape):
+        DataArray.__init__(self, shape)
+
+        # Cache for results from __getitem__ calls
+        self.result_cache = {}
+
+        # Reverse dependencies between cached results
+        self.dependencies = DependencyGraph()
+
+        # Stack of result cache keys of the cells that are being evaluated
+        self._eval_stack = []
+
+        # Cache for parsed and compiled cell code
+        self.code_cache = LRUCache(config["code_cache_size"])
+
+        # Global environment of cell code and macros
+        self.env = self._get_base_environment()
+
     def __setitem__(self, key, value):
-        """Sets cell code and resets result cache"""
+        """Sets cell code and invalidates the results that depend on it"""
 
         # Prevent unchanged cells from being recalculated on cursor movement
 
@@ -1141,36 +2424,192 @@ class CodeArray(DataArray):
         DataArray.__setitem__(self, key, value)
 
         if not unchanged:
-            # Reset result cache
-            self.result_cache = {}
+            if any(is_slice_like(key_ele) for key_ele in key):
+                # Slice keys are not tracked cell-wise
+                self.result_cache.clear()
+            else:
+                self.invalidate_results([repr_key])
+
+    def set_cells(self, cells):
+        """Sets code of many single cells and invalidates results once
+
+        Parameters
+        ----------
+        cells: Iterable of 2-tuples
+        \tSingle cell keys and code, empty code deletes the cell
+
+        """
+
+        changed_keys = DataArray.set_cells(self, cells)
+
+        # Without cached results, there is nothing that may depend on cells
+        if self.result_cache:
+            self.invalidate_results(imap(repr, changed_keys))
+
+        return changed_keys
+
+    def set_block(self, top, left, tab, block):
+        """Replaces code of a block of cells and invalidates results once
+
+        See DataArray.set_block for the parameters.
+
+        """
+
+        DataArray.set_block(self, top, left, tab, block)
+
+        if self.result_cache:
+            no_rows, no_cols = block.shape
+            region = product(xrange(top, top + no_rows),
+                             xrange(left, left + no_cols), (tab,))
+            self.invalidate_results(imap(repr, region))
 
     def __getitem__(self, key):
         """Returns _eval_cell"""
 
+        repr_key = repr(key)
+
+        # Record that the currently evaluated cell reads this one
+        if self._eval_stack:
+            self.dependencies.add_dependency(repr_key, self._eval_stack[-1])
+
         # Frozen cell handling
         if all(type(k) is not SliceType for k in key):
             frozen_res = self.cell_attributes[key]["frozen"]
             if frozen_res:
-                if repr(key) in self.frozen_cache:
-                    return self.frozen_cache[repr(key)]
+                if repr_key in self.frozen_cache:
+                    return self.frozen_cache[repr_key]
                 else:
                     # Frozen cache is empty.
                     # Maybe we have a reload without the frozen cache
                     result = self._eval_cell(key, self(key))
-                    self.frozen_cache[repr(key)] = result
+                    self.frozen_cache[repr_key] = result
                     return result
 
         # Normal cell handling
 
-        if repr(key) in self.result_cache:
-            return self.result_cache[repr(key)]
+        if repr_key in self.result_cache:
+            return self.result_cache[repr_key]
 
         elif self(key) is not None:
-            result = self._eval_cell(key, self(key))
-            self.result_cache[repr(key)] = result
+            # Dependencies are re-recorded while evaluating
+            self.dependencies.clear_precedents(repr_key)
+
+            self._eval_stack.append(repr_key)
+            try:
+                result = self._eval_cell(key, self(key))
+            finally:
+                self._eval_stack.pop()
+
+            self.result_cache[repr_key] = result
 
             return result
 
+    def invalidate_results(self, repr_keys):
+        """Removes results of given cells and of their dependents from cache
+
+        Parameters
+        ----------
+        repr_keys: Iterable of strings
+        \tResult cache keys, i. e. repr of the cell keys, that have changed
+
+        """
+
+        repr_keys = set(repr_keys)
+        repr_keys.update(self.dependencies.get_dependents(repr_keys))
+
+        for repr_key in repr_keys:
+            self.result_cache.pop(repr_key, None)
+
+    def result_row_gen(self, top, bottom, left, right, tab, chunk_size=1000):
+        """Generator of lists of cell results for the rows top to bottom - 1
+
+        Rows are evaluated in chunks of chunk_size rows. Results that have
+        not been cached before are removed from the result cache after the
+        next chunk has been evaluated. Therefore, memory usage does not grow
+        with the number of rows. See _drop_results for dependencies.
+
+        Parameters
+        ----------
+        top, bottom: Integer
+        \tFirst row and row after the last row
+        left, right: Integer
+        \tFirst column and column after the last column
+        tab: Integer
+        \tTable
+        chunk_size: Integer, defaults to 1000
+        \tNumber of rows that are evaluated before they are yielded
+
+        """
+
+        result_cache = self.result_cache
+        cols = xrange(left, right)
+
+        # Result cache keys that are dropped after the next chunk
+        dropped_keys = []
+
+        # Dropped keys that other cells still read
+        kept_keys = []
+
+        try:
+            for chunk_top in xrange(top, bottom, chunk_size):
+                chunk_bottom = min(chunk_top + chunk_size, bottom)
+
+                chunk_keys = []
+                chunk = []
+
+                for row in xrange(chunk_top, chunk_bottom):
+                    results = []
+                    for col in cols:
+                        key = row, col, tab
+                        repr_key = repr(key)
+                        if repr_key not in result_cache:
+                            chunk_keys.append(repr_key)
+                        results.append(self[key])
+                    chunk.append(results)
+
+                kept_keys = self._drop_results(kept_keys + dropped_keys)
+                dropped_keys = chunk_keys
+
+                for results in chunk:
+                    yield results
+
+        finally:
+            self._drop_results(kept_keys + dropped_keys)
+
+    def _drop_results(self, repr_keys):
+        """Removes results and dependency graph nodes of cells
+
+        A node stays in the dependency graph while other cells read it so
+        that their results are still invalidated via the node. Keys are
+        processed in reverse order because later cells tend to read
+        earlier ones.
+
+        Returns the list of keys whose nodes have been kept.
+
+        Parameters
+        ----------
+        repr_keys: List of strings
+        \tResult cache keys in evaluation order
+
+        """
+
+        dependencies = self.dependencies
+
+        kept_keys = []
+
+        for repr_key in reversed(repr_keys):
+            self.result_cache.pop(repr_key, None)
+
+            if repr_key in dependencies.dependents:
+                kept_keys.append(repr_key)
+            else:
+                dependencies.clear_precedents(repr_key)
+                dependencies.set_names(repr_key, None)
+
+        kept_keys.reverse()
+
+        return kept_keys
+
     def _make_nested_list(self, gen):
         """Makes nested list from generator for creating numpy.array"""
 
@@ -1211,8 +2650,153 @@ class CodeArray(DataArray):
 
         return -1
 
+    def _get_loaded_names(self, ast_module):
+        """Returns frozenset of names that are read in ast_module"""
+
+        return frozenset(node.id for node in ast.walk(ast_module)
+                         if type(node) is ast.Name and
+                         type(node.ctx) is ast.Load)
+
+    def _compile_cell_code(self, code):
+        """Returns parsed and compiled cell code
+
+        The result is a tuple (error, glob_var, expression, names):
+        error is None or the exception that replaces the cell result,
+        glob_var is None or the name of the assigned global variable,
+        expression is the compiled code object that is evaluated and
+        names is a frozenset of the global names that the code loads.
+
+        Results are kept in code_cache so that unchanged code is neither
+        parsed nor compiled again.
+
+        Parameters
+        ----------
+        code: String
+        \tCell code
+
+        """
+
+        try:
+            return self.code_cache[code]
+
+        except KeyError:
+            pass
+
+        assignment_target_error = None
+        glob_var = None
+        expression = None
+        names = None
+
+        # If only 1 term in front of the "=" --> global
+
+        try:
+            module = ast.parse(code)
+            assignment_target_end = self._get_assignment_target_end(module)
+            names = self._get_loaded_names(module)
+
+        except ValueError, err:
+            assignment_target_error = ValueError(err)
+
+        except AttributeError, err:
+            # Attribute Error includes RunTimeError
+            assignment_target_error = AttributeError(err)
+
+        except Exception, err:
+            assignment_target_error = Exception(err)
+
+        if assignment_target_error is None:
+            if assignment_target_end != -1:
+                glob_var = code[:assignment_target_end]
+                expression_code = code.split("=", 1)[1]
+                expression_code = expression_code.strip()
+
+            else:
+                expression_code = code
+
+            try:
+                expression = compile(expression_code, "<string>", "eval")
+
+            except Exception, err:
+                # Statements such as imports are not valid expressions
+                assignment_target_error = Exception(err)
+
+        compiled_code = assignment_target_error, glob_var, expression, names
+        self.code_cache[code] = compiled_code
+
+        return compiled_code
+
+    def _get_code_names(self, code):
+        """Returns set of names that code and its nested code objects use"""
+
+        names = set(code.co_names)
+
+        for const in code.co_consts:
+            if type(const) is CodeType:
+                names.update(self._get_code_names(const))
+
+        return names
+
+    def _is_read_indirectly(self, name):
+        """Returns True if the global name may be read by functions
+
+        Only names that are read directly by cell code are tracked in the
+        dependency graph. Functions in the global environment, e.g. from
+        macros, and methods of classes from macros may read the name when
+        they are called.
+
+        Parameters
+        ----------
+        name: String
+        \tGlobal variable name
+
+        """
+
+        for function in self._get_env_functions():
+            code = getattr(function, "func_code", None)
+            if type(code) is CodeType and name in self._get_code_names(code):
+                return True
+
+        return False
+
+    def _get_env_functions(self):
+        """Generator of functions and macro class methods in the environment
+
+        Class methods are only included if they have been defined in the
+        environment, i.e. in macros.
+
+        """
+
+        for value in self.env.itervalues():
+            if not isinstance(value, (type, ClassType)):
+                yield value
+                continue
+
+            for member in value.__dict__.itervalues():
+                if isinstance(member, property):
+                    methods = member.fget, member.fset, member.fdel
+                else:
+                    # Static and class methods wrap their function
+                    methods = getattr(member, "__func__", member),
+
+                for method in methods:
+                    if getattr(method, "func_globals", None) is self.env:
+                        yield method
+
+    def _get_base_environment(self):
+        """Returns new global environment with 'magic' variable S
+
+        The environment is a copy of the module globals so that cell code
+        and macros do not change the module namespace.
+
+        """
+
+        env = globals().copy()
+        env['S'] = self
+
+        return env
+
     def _get_updated_environment(self, env_dict=None):
-        """Returns globals environment with 'magic' variable
+        """Returns copy of the global environment with 'magic' variable
 
         Parameters
         ----------
@@ -1224,11 +2808,46 @@ class CodeArray(DataArray):
         if env_dict is None:
             env_dict = {'S': self}
 
-        env = globals().copy()
+        env = self.env.copy()
         env.update(env_dict)
 
         return env
 
+    def _overlay_environment(self, env, env_dict):
+        """Sets the items of env_dict in env and returns a backup
+
+        The backup maps each name from env_dict to the value that it has
+        replaced or to _unbound if the name has not been present in env.
+        This allows evaluating cells in the shared global environment
+        without copying it.
+
+        Parameters
+        ----------
+        env: Dict
+        \tEnvironment that is updated in place
+        env_dict: Dict
+        \tDict that maps the per cell variable names to values
+
+        """
+
+        env_backup = {}
+
+        for name in env_dict:
+            env_backup[name] = env.get(name, _unbound)
+
+        env.update(env_dict)
+
+        return env_backup
+
+    def _restore_environment(self, env, env_backup):
+        """Restores env from a backup of _overlay_environment"""
+
+        for name, value in env_backup.iteritems():
+            if value is _unbound:
+                env.pop(name, None)
+            else:
+                env[name] = value
+
     def _eval_cell(self, key, code):
         """Evaluates one cell and returns its result"""
 
@@ -1248,7 +2867,6 @@ class CodeArray(DataArray):
                     'base64': base64, 'charts': charts, 'nn': nn,
                     'R': key[0], 'C': key[1], 'T': key[2], 'S': self,
                     'vlcpanel_factory': vlcpanel_factory}
-        env = self._get_updated_environment(env_dict=env_dict)
 
         #_old_code = self(key)
 
@@ -1267,39 +2885,40 @@ class CodeArray(DataArray):
 
             return numpy.array(self._make_nested_list(code), dtype="O")
 
-        # If only 1 term in front of the "=" --> global
-
-        try:
-            assignment_target_error = None
-            module = ast.parse(code)
-            assignment_target_end = self._get_assignment_target_end(module)
-
-        except ValueError, err:
-            assignment_target_error = ValueError(err)
-
-        except AttributeError, err:
-            # Attribute Error includes RunTimeError
-            assignment_target_error = AttributeError(err)
+        assignment_target_error, glob_var, expression, names = \
+            self._compile_cell_code(code)
 
-        except Exception, err:
-            assignment_target_error = Exception(err)
+        # Track global names so that global assignments from other
+        # cells only invalidate the cells that use them
+        self.dependencies.set_names(repr(key), names)
 
-        if assignment_target_error is None and assignment_target_end != -1:
-            glob_var = code[:assignment_target_end]
-            expression = code.split("=", 1)[1]
-            expression = expression.strip()
+        if glob_var is None:
+            pass
 
-            # Delete result cache because assignment changes results
+        elif self._is_read_indirectly(glob_var):
+            # Functions may read the global in cells that do not load it
             self.result_cache.clear()
 
         else:
-            glob_var = None
-            expression = code
+            # Assignment changes results of cells that use the global
+            name_dependents = self.dependencies.get_name_dependents(glob_var)
+            name_dependents.discard(repr(key))
+            self.invalidate_results(name_dependents)
 
         if assignment_target_error is not None:
             result = assignment_target_error
 
         else:
+            if any(type(const) is CodeType
+                   for const in expression.co_consts):
+                # Lambdas and generator expressions look up X, Y, ... when
+                # they are called. Therefore, they get their own environment.
+                env = self._get_updated_environment(env_dict=env_dict)
+                env_backup = None
+
+            else:
+                env = self.env
+                env_backup = self._overlay_environment(env, env_dict)
 
             try:
                 import signal
@@ -1331,11 +2950,14 @@ class CodeArray(DataArray):
                     # No POSIX system
                     pass
 
+                if env_backup is not None:
+                    self._restore_environment(env, env_backup)
+
         # Change back cell value for evaluation from other cells
         #self.dict_grid[key] = _old_code
 
         if glob_var is not None:
-            globals().update({glob_var: result})
+            self.env[glob_var] = result
 
         return result
 
@@ -1349,14 +2971,34 @@ class CodeArray(DataArray):
 
         """
 
-        try:
-            self.result_cache.pop(repr(key))
+        repr_key = repr(key)
 
-        except KeyError:
-            pass
+        self.invalidate_results([repr_key])
+
+        # The popped cell reads nothing but its dependents still read it
+        self.dependencies.clear_precedents(repr_key)
+        self.dependencies.set_names(repr_key, None)
 
         return DataArray.pop(self, key)
 
+    def _move_cells(self, start, offset, axis, tab=None):
+        """Moves cell code without undo and clears all results"""
+
+        removed = DataArray._move_cells(self, start, offset, axis, tab)
+
+        self.result_cache.clear()
+        self.dependencies.clear()
+
+        return removed
+
+    def _restore_cells(self, start, offset, axis, removed, tab=None):
+        """Reverts _move_cells without undo and clears all results"""
+
+        DataArray._restore_cells(self, start, offset, axis, removed, tab)
+
+        self.result_cache.clear()
+        self.dependencies.clear()
+
     def reload_modules(self):
         """Reloads modules that are available in cells"""
 
@@ -1370,23 +3012,12 @@ class CodeArray(DataArray):
     def clear_globals(self):
         """Clears all newly assigned globals"""
 
-        base_keys = ['cStringIO', 'IntType', 'KeyValueStore', 'undoable',
-                     'is_generator_like', 'is_string_like', 'bz2', 'base64',
-                     '__package__', 're', 'config', '__doc__', 'SliceType',
-                     'CellAttributes', 'product', 'ast', '__builtins__',
-                     '__file__', 'charts', 'sys', 'is_slice_like', '__name__',
-                     'copy', 'imap', 'wx', 'ifilter', 'Selection', 'DictGrid',
-                     'numpy', 'CodeArray', 'DataArray', 'datetime',
-                     'vlcpanel_factory']
-
-        for key in globals().keys():
-            if key not in base_keys:
-                globals().pop(key)
+        self.env = self._get_base_environment()
 
     def get_globals(self):
         """Returns globals dict"""
 
-        return globals()
+        return self.env
 
     def execute_macros(self):
         """Executes all macros and returns result string
@@ -1402,7 +3033,7 @@ class CodeArray(DataArray):
         self.macros = self.macros.replace('\r\n', '\n')
 
         # Set up environment for evaluation
-        globals().update(self._get_updated_environment())
+        self.env['S'] = self
 
         # Create file-like string to capture output
         code_out = cStringIO.StringIO()
@@ -1424,7 +3055,7 @@ class CodeArray(DataArray):
             pass
 
         try:
-            exec(self.macros, globals())
+            exec(self.macros, self.env)
             try:
                 signal.alarm(0)
             except:
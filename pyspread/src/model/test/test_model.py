@@ -50,8 +50,10 @@ from src.lib.testlib import params, pytest_generate_tests, undotest_model
 
 from src.model.model import KeyValueStore, CellAttributes, DictGrid
 from src.model.model import DataArray, CodeArray
+import src.model.model as model
 
 from src.lib.selection import Selection
+from src.lib.undo import group as undo_group
 from src.lib.undo import stack as undo_stack
 
 
@@ -73,6 +75,79 @@ class TestKeyValueStore(object):
 
         assert self.k_v_store[key] == 7
 
+    def test_undo_batch(self):
+        """Changes in a group are undone and redone as one batch"""
+
+        self.k_v_store[0] = "keep"
+        undo_stack().clear()
+
+        with undo_group("Test"):
+            for key in xrange(100):
+                self.k_v_store[key] = key
+            self.k_v_store.pop(5)
+
+        assert undo_stack().undocount() == 1
+        assert len(undo_stack()._undos[0]._stack) == 1
+
+        undo_stack().undo()
+        assert self.k_v_store == {0: "keep"}
+
+        undo_stack().redo()
+        assert len(self.k_v_store) == 99
+        assert self.k_v_store[5] is None
+
+    def test_undo_batch_equal_stores(self):
+        """Equal stores are not merged into one batch"""
+
+        other_store = KeyValueStore()
+        undo_stack().clear()
+
+        with undo_group("Test"):
+            self.k_v_store[0] = 1
+            other_store[0] = 1
+            self.k_v_store[1] = 2
+
+        assert len(undo_stack()._undos[0]._stack) == 3
+
+        undo_stack().undo()
+        assert self.k_v_store == {}
+        assert other_store == {}
+
+    def test_undo_last_action(self):
+        """The last action differs after an undo and a new change"""
+
+        undo_stack().clear()
+        self.k_v_store[0] = 1
+        last_action = undo_stack().lastaction()
+
+        undo_stack().undo()
+        self.k_v_store[0] = 2
+
+        assert undo_stack().undocount() == 1
+        assert undo_stack().lastaction() is not last_action
+
+    def test_undo_maxsize(self):
+        """The undo history is limited by the memory of the changes"""
+
+        stack = undo_stack()
+        stack.clear()
+        stack.maxsize = 5000
+
+        try:
+            self.k_v_store[0] = "x" * 3000
+            self.k_v_store[1] = 1
+            assert stack.undocount() == 2
+
+            self.k_v_store[2] = "y" * 3000
+            assert stack.undocount() == 2
+
+            stack.undo()
+            stack.undo()
+            assert self.k_v_store == {0: "x" * 3000}
+
+        finally:
+            stack.maxsize = None
+
 
 class TestCellAttributes(object):
     """Unit tests for CellAttributes"""
@@ -94,7 +169,7 @@ class TestCellAttributes(object):
 
         # Check if 1 item - the actual action has been added
         assert undo_stack().undocount() == 1
-        assert not self.cell_attr._attr_cache
+        assert self.cell_attr.cache_info()[2] == 0
 
     def test_getitem(self):
         """Test __getitem__"""
@@ -108,6 +183,55 @@ class TestCellAttributes(object):
         assert self.cell_attr[32, 53, 0]["testattr"] == 2
         assert self.cell_attr[2, 2, 0]["testattr"] == 3
 
+    def test_table_cache_update(self):
+        """Table cache is updated incrementally on append and undo"""
+
+        selection_1 = Selection([(2, 2)], [(4, 5)], [], [], [])
+        selection_2 = Selection([], [], [3], [], [])
+
+        self.cell_attr.append((selection_1, 0, {"testattr": 3}))
+        assert self.cell_attr[3, 3, 0]["testattr"] == 3
+
+        table_index = self.cell_attr._table_cache[0]
+
+        self.cell_attr.append((selection_2, 0, {"testattr": 2}))
+        self.cell_attr.append((selection_2, 1, {"testattr": 1}))
+
+        assert self.cell_attr._table_cache[0] is table_index
+        assert self.cell_attr[3, 3, 0]["testattr"] == 2
+        assert self.cell_attr[3, 3, 1]["testattr"] == 1
+
+        undo_stack().undo()
+        undo_stack().undo()
+
+        assert 1 not in self.cell_attr._table_cache
+        assert self.cell_attr[3, 3, 0]["testattr"] == 3
+
+    def test_attr_cache_invalidation(self):
+        """Appending only invalidates cached cells in the new selection"""
+
+        selection_1 = Selection([(2, 2)], [(4, 5)], [], [], [])
+        selection_2 = Selection([], [], [], [], [(2, 2)])
+
+        self.cell_attr.append((selection_1, 0, {"testattr": 3}))
+
+        for key in [(2, 2, 0), (3, 3, 0), (2, 2, 1)]:
+            self.cell_attr[key]
+
+        hits, misses, size = self.cell_attr.cache_info()
+        assert size == 3
+
+        self.cell_attr.append((selection_2, 0, {"testattr": 2}))
+
+        assert self.cell_attr.cache_info() == (hits, misses, 2)
+
+        assert self.cell_attr[2, 2, 0]["testattr"] == 2
+        assert self.cell_attr.cache_info() == (hits, misses + 1, 3)
+
+        assert self.cell_attr[3, 3, 0]["testattr"] == 3
+        assert "testattr" not in self.cell_attr[2, 2, 1]
+        assert self.cell_attr.cache_info() == (hits + 2, misses + 1, 3)
+
     def test_get_merging_cell(self):
         """Test get_merging_cell"""
 
@@ -146,6 +270,65 @@ class TestDictGrid(object):
         self.dict_grid[(2, 4, 5)] = "Test"
         assert self.dict_grid[(2, 4, 5)] == "Test"
 
+    def test_compact(self):
+        """Unit test for compact and access to columnar storage"""
+
+        for row in xrange(60):
+            self.dict_grid[row, 1, 0] = u"{}".format(row)
+        self.dict_grid[60, 1, 0] = u"ä" * 100
+        self.dict_grid[61, 1, 0] = "Test"
+        self.dict_grid[0, 2, 0] = u"1"
+
+        expected = dict(self.dict_grid.iteritems())
+
+        self.dict_grid.compact(min_density=0.01)
+
+        assert len(self.dict_grid.columns) == 60
+        assert dict.__len__(self.dict_grid) == 3
+        assert len(self.dict_grid) == 63
+        assert self.dict_grid == expected
+        assert sorted(self.dict_grid) == sorted(expected)
+        assert self.dict_grid[59, 1, 0] == u"59"
+        assert (59, 1, 0) in self.dict_grid
+        assert self.dict_grid[62, 1, 0] is None
+
+        self.dict_grid[5, 1, 0] = u"Longer code"
+        assert self.dict_grid[5, 1, 0] == u"Longer code"
+        self.dict_grid[6, 1, 0] = u"x" * 100
+        assert self.dict_grid[6, 1, 0] == u"x" * 100
+        assert len(self.dict_grid) == 63
+
+        assert self.dict_grid.pop((7, 1, 0)) == u"7"
+        assert (7, 1, 0) not in self.dict_grid
+
+        undo_stack().undo()
+        assert self.dict_grid[7, 1, 0] == u"7"
+        undo_stack().undo()
+        assert self.dict_grid[6, 1, 0] == u"6"
+        assert len(self.dict_grid.columns) == 60
+
+        self.dict_grid.clear()
+        assert len(self.dict_grid) == 0
+
+    def test_itertablekeys(self):
+        """Unit test for itertablekeys"""
+
+        for row in xrange(50):
+            self.dict_grid[row, 3, 1] = u"{}".format(row)
+            self.dict_grid[row, 2, 1] = u"{}".format(row)
+        self.dict_grid[4, 1, 1] = u"x" * 100
+        self.dict_grid[4, 0, 0] = u"Other table"
+
+        self.dict_grid.compact(min_density=0.01)
+        assert len(self.dict_grid.columns) == 100
+
+        self.dict_grid[4, 5, 1] = u"y" * 100
+
+        keys = list(self.dict_grid.itertablekeys(1))
+
+        assert keys == sorted(key for key in self.dict_grid if key[2] == 1)
+        assert keys[8:12] == [(4, 1, 1), (4, 2, 1), (4, 3, 1), (4, 5, 1)]
+
 
 class TestDataArray(object):
     """Unit tests for DataArray"""
@@ -426,6 +609,127 @@ class TestDataArray(object):
         for key in res:
             assert self.data_array[key] == res[key]
 
+    def test_insert_delete_undo(self):
+        """Insert and delete create one undo record each that restores all"""
+
+        data = {(0, 0, 0): "0", (5, 1, 0): "5", (98, 1, 0): "98",
+                (5, 1, 1): "other table"}
+        self.data_array.dict_grid.update(data)
+        self.data_array.set_row_height(5, 0, 33.0)
+        self.data_array.cell_attributes.append(
+            (Selection([], [], [5], [], []), 0, {"bgcolor": 1}))
+
+        undo_stack().clear()
+
+        self.data_array.insert(2, 3, 0, 0)
+
+        assert undo_stack().undocount() == 1
+        assert self.data_array[8, 1, 0] == "5"
+        assert self.data_array[98, 1, 0] is None
+        assert self.data_array[5, 1, 1] == "other table"
+        assert self.data_array.row_heights[8, 0] == 33.0
+        assert self.data_array.cell_attributes[8, 0, 0]["bgcolor"] == 1
+
+        self.data_array.delete(3, 6, 0, 0)
+
+        assert undo_stack().undocount() == 2
+        assert self.data_array[2, 1, 0] is None
+        assert len(self.data_array.dict_grid) == 2
+
+        undo_stack().undo()
+        undo_stack().undo()
+
+        assert dict(self.data_array.dict_grid) == data
+        assert self.data_array.row_heights[5, 0] == 33.0
+        assert self.data_array.cell_attributes[5, 0, 0]["bgcolor"] == 1
+        assert self.data_array.cell_attributes[8, 0, 0]["bgcolor"] != 1
+
+        undo_stack().redo()
+        assert self.data_array[8, 1, 0] == "5"
+
+    param_insert_delete_columns = [
+        {"operation": "insert", "point": 3, "number": 5, "axis": 0,
+         "tab": None},
+        {"operation": "insert", "point": 20, "number": 8, "axis": 0,
+         "tab": 1},
+        {"operation": "delete", "point": 2, "number": 11, "axis": 0,
+         "tab": None},
+        {"operation": "delete", "point": 30, "number": 4, "axis": 0,
+         "tab": 0},
+        {"operation": "insert", "point": 1, "number": 2, "axis": 1,
+         "tab": 0},
+        {"operation": "delete", "point": 0, "number": 1, "axis": 1,
+         "tab": None},
+        {"operation": "insert", "point": 0, "number": 1, "axis": 2,
+         "tab": None},
+        {"operation": "delete", "point": 0, "number": 1, "axis": 2,
+         "tab": None},
+    ]
+
+    @params(param_insert_delete_columns)
+    def test_insert_delete_columns(self, operation, point, number, axis,
+                                   tab):
+        """Insert and delete move cells in column storage like in the dict"""
+
+        data = {}
+        for row in xrange(40):
+            for col in xrange(4):
+                for grid_tab in xrange(3):
+                    if (row + col + grid_tab) % 3:
+                        data[row, col, grid_tab] = \
+                            u"{} {} {}".format(row, col, grid_tab)
+        data[7, 2, 1] = u"x" * 100
+
+        data_arrays = [DataArray((40, 4, 3)), DataArray((40, 4, 3))]
+        for data_array in data_arrays:
+            data_array.dict_grid.update(data)
+
+        columns = data_arrays[1].dict_grid.columns
+        columns.chunk_size = 8
+        data_arrays[1].dict_grid.compact(min_density=0)
+        assert len(columns) == len(data) - 1
+
+        undo_stack().clear()
+
+        for data_array in data_arrays:
+            getattr(data_array, operation)(point, number, axis, tab)
+
+        assert data_arrays[1].dict_grid == dict(data_arrays[0].dict_grid)
+        assert dict.__len__(data_arrays[1].dict_grid) <= 1
+
+        undo_stack().undo()
+        undo_stack().undo()
+
+        for data_array in data_arrays:
+            assert data_array.dict_grid == data
+
+    def test_undo_append_after_bulk_load(self):
+        """Undoing an append keeps attributes that are loaded without undo"""
+
+        cell_attributes = self.data_array.cell_attributes
+        undo_stack().clear()
+
+        cell_attributes.append(
+            (Selection([], [], [], [], [(0, 0)]), 0, {"bgcolor": 1}))
+        assert cell_attributes[0, 0, 0]["bgcolor"] == 1
+
+        # Attributes of a lazily loaded table
+        loaded = [(Selection([], [], [], [], [(0, 0)]), 1, {"bgcolor": 2})]
+        self.data_array._replace_cell_attributes(
+            list(cell_attributes) + loaded)
+
+        undo_stack().undo()
+
+        assert list(cell_attributes) == loaded
+        assert cell_attributes[0, 0, 0]["bgcolor"] != 1
+        assert cell_attributes[0, 0, 1]["bgcolor"] == 2
+
+        undo_stack().redo()
+
+        assert cell_attributes[0, 0, 0]["bgcolor"] == 1
+        assert cell_attributes[0, 0, 1]["bgcolor"] == 2
+        assert list(cell_attributes)[1:] == loaded
+
     def test_delete_error(self):
         """Tests delete operation error"""
 
@@ -449,6 +753,77 @@ class TestDataArray(object):
         self.data_array.set_col_width(7, 1, 22.345)
         assert self.data_array.col_widths[7, 1] == 22.345
 
+    def test_get_snapshot(self):
+        """Unit test for get_snapshot"""
+
+        data_array = DataArray((5000, 10, 5))
+
+        data_array[(1, 2, 3)] = u"12"
+        data_array.set_row_height(7, 1, 22.345)
+        data_array.macros = u"a = 1"
+        attr = (Selection([], [], [], [], [(1, 2)]), 3, {"angle": 0.2})
+        data_array.cell_attributes.append(attr)
+
+        for row in xrange(4096):
+            data_array[(row, 0, 0)] = u"1"
+        data_array.dict_grid.compact()
+
+        snapshot = data_array.get_snapshot()
+
+        data_array[(1, 2, 3)] = u"13"
+        data_array[(5, 0, 0)] = u"2"
+        data_array.set_row_height(7, 1, 10.0)
+        data_array.macros = u"a = 2"
+        data_array.cell_attributes.append(attr)
+
+        assert snapshot.shape == data_array.shape
+        assert snapshot((1, 2, 3)) == u"12"
+        assert snapshot((5, 0, 0)) == u"1"
+        assert len(snapshot.dict_grid) == 4097
+        assert snapshot.row_heights[(7, 1)] == 22.345
+        assert snapshot.macros == u"a = 1"
+        assert list(snapshot.cell_attributes) == [attr]
+        assert snapshot.cell_attributes[(1, 2, 3)]["angle"] == 0.2
+
+    def test_journal(self):
+        """Unit test for start_journal, get_journal and journal_suspended"""
+
+        self.data_array[(1, 2, 3)] = "12"
+        self.data_array[(1, 2, 4)] = "13"
+
+        assert self.data_array.get_journal() is None
+
+        self.data_array.start_journal()
+
+        self.data_array[(1, 2, 3)] = "14"
+        self.data_array.pop((1, 2, 4))
+        self.data_array.set_row_height(7, 1, 22.345)
+
+        attr = (Selection([], [], [], [], [(1, 2)]), 3, {"angle": 0.2})
+        self.data_array.cell_attributes.append(attr)
+
+        with self.data_array.journal_suspended():
+            self.data_array[(5, 5, 5)] = "15"
+            self.data_array.cell_attributes.append(attr)
+
+        journal = self.data_array.get_journal()
+
+        assert journal["grid"] == set([(1, 2, 3), (1, 2, 4)])
+        assert journal["attributes"] == [attr]
+        assert journal["row_heights"] == set([(7, 1)])
+        assert journal["col_widths"] == set()
+        assert not journal["macros"]
+
+        self.data_array.macros = u"a = 1"
+        assert self.data_array.get_journal()["macros"]
+
+        # Replaced cell attributes cannot be journaled
+        self.data_array._replace_cell_attributes([])
+        assert self.data_array.get_journal() is None
+
+        self.data_array.stop_journal()
+        assert self.data_array.get_journal() is None
+
 
 class TestCodeArray(object):
     """Unit tests for CodeArray"""
@@ -530,6 +905,244 @@ class TestCodeArray(object):
 
         assert filled_grid[1, 0, 0] == sum(numpy.arange(0, 10, 0.1))
 
+    def test_dependency_invalidation(self):
+        """Unit test for dependency tracked result cache invalidation"""
+
+        code_array = self.code_array
+
+        code_array[0, 0, 0] = "1"
+        code_array[1, 0, 0] = "S[0, 0, 0] + 1"
+        code_array[2, 0, 0] = "S[1, 0, 0] + 1"
+        code_array[0, 1, 0] = "2"
+        code_array[5, 1, 0] = "sum(nn(S[0:2, 1, 0]))"
+
+        assert code_array[2, 0, 0] == 3
+        assert code_array[5, 1, 0] == 2
+
+        code_array[0, 0, 0] = "5"
+
+        # Only the changed cell and its dependents are invalidated
+        assert repr((2, 0, 0)) not in code_array.result_cache
+        assert repr((1, 0, 0)) not in code_array.result_cache
+        assert repr((5, 1, 0)) in code_array.result_cache
+        assert code_array[2, 0, 0] == 7
+
+        # Filling a previously empty cell that is read via slice
+        code_array[1, 1, 0] = "3"
+        assert code_array[5, 1, 0] == 5
+
+        code_array.pop((0, 0, 0))
+        assert repr((2, 0, 0)) not in code_array.result_cache
+        assert repr((5, 1, 0)) in code_array.result_cache
+
+    def test_set_cells(self):
+        """Unit test for set_cells"""
+
+        code_array = self.code_array
+
+        code_array[0, 0, 0] = "1"
+        code_array[1, 0, 0] = "S[0, 0, 0] + 1"
+        code_array[9, 9, 0] = "9"
+        assert code_array[1, 0, 0] == 2
+        assert code_array[9, 9, 0] == 9
+
+        # Merged cells are not changed
+        merge_selection = Selection([(5, 5)], [(6, 6)], [], [], [])
+        code_array.cell_attributes.append(
+            (merge_selection, 0, {"merge_area": (5, 5, 6, 6)}))
+
+        undo_stack().clear()
+
+        with undo_group("Import"):
+            changed_keys = code_array.set_cells(
+                [((0, 0, 0), "5"), ((2, 0, 0), "3"), ((9, 9, 0), ""),
+                 ((5, 5, 0), "55"), ((6, 6, 0), "66")])
+
+        assert changed_keys == [(0, 0, 0), (2, 0, 0), (9, 9, 0), (5, 5, 0)]
+        assert code_array((2, 0, 0)) == "3"
+        assert code_array((9, 9, 0)) is None
+        assert code_array((6, 6, 0)) is None
+        assert code_array[1, 0, 0] == 6
+
+        # All changes are undone in one step
+        assert undo_stack().undocount() == 1
+        undo_stack().undo()
+
+        assert code_array((0, 0, 0)) == "1"
+        assert code_array((2, 0, 0)) is None
+        assert code_array((5, 5, 0)) is None
+        assert code_array((9, 9, 0)) == "9"
+
+    def test_set_block(self):
+        """Unit test for set_block"""
+
+        code_array = CodeArray((10000, 10, 2))
+        columns = code_array.dict_grid.columns
+
+        code_array[4095, 1, 0] = "1"
+        code_array[4096, 9, 0] = "S[4095, 1, 0] + 1"
+        code_array[0, 0, 1] = u"x" * 100
+        assert code_array[4096, 9, 0] == 2
+
+        block = numpy.array([[str(row), str(row * 2)]
+                             for row in xrange(4090, 4110)])
+        block[1, 0] = ""
+
+        undo_stack().clear()
+
+        with undo_group("Import"):
+            code_array.set_block(4090, 0, 0, block)
+
+        assert len(columns.chunks) == 4
+        assert len(columns) == 39
+        assert dict.__len__(code_array.dict_grid) == 2
+        assert code_array((4090, 0, 0)) == u"4090"
+        assert code_array((4091, 0, 0)) is None
+        assert code_array((4109, 1, 0)) == u"8218"
+        assert code_array[4096, 9, 0] == 8191
+
+        with pytest.raises(IndexError):
+            code_array.set_block(9999, 0, 0, block)
+
+        with pytest.raises(ValueError):
+            code_array.set_block(0, 0, 0, numpy.array([["x" * 100]]))
+
+        # The block is undone in one step
+        assert undo_stack().undocount() == 1
+        undo_stack().undo()
+
+        assert len(columns) == 0
+        assert not columns.chunks
+        assert code_array((4095, 1, 0)) == "1"
+        assert code_array((0, 0, 1)) == u"x" * 100
+
+        undo_stack().redo()
+
+        assert len(columns) == 39
+        assert code_array((4109, 1, 0)) == u"8218"
+
+    def test_result_row_gen(self):
+        """Unit test for result_row_gen"""
+
+        code_array = self.code_array
+
+        for row in xrange(10):
+            code_array[row, 0, 0] = str(row)
+            code_array[row, 1, 0] = "S[{row}, 0, 0] * 2".format(row=row)
+
+        # Results that are cached before are kept
+        assert code_array[5, 1, 0] == 10
+        cached_keys = set(code_array.result_cache)
+
+        row_gen = code_array.result_row_gen(0, 10, 0, 3, 0, chunk_size=3)
+
+        rows = []
+        for row, results in enumerate(row_gen):
+            rows.append(results)
+
+            # Only the current and the previous chunk are cached
+            for repr_key in set(code_array.result_cache) - cached_keys:
+                assert eval(repr_key)[0] >= row // 3 * 3 - 3
+
+        assert rows == [[row, row * 2, None] for row in xrange(10)]
+        assert set(code_array.result_cache) == cached_keys
+
+        # Only dependencies of cached results are kept
+        assert code_array.dependencies.precedents == \
+            {repr((5, 1, 0)): set([repr((5, 0, 0))])}
+
+        # Invalidation still works for cells that have been exported
+        code_array[5, 0, 0] = "6"
+        assert code_array[5, 1, 0] == 12
+
+    def test_global_assignment_invalidation(self):
+        """Global assignments only invalidate cells that use the global"""
+
+        code_array = self.code_array
+
+        code_array[0, 0, 0] = "dep_test_var = 1"
+        code_array[1, 0, 0] = "dep_test_var + 1"
+        code_array[2, 0, 0] = "3"
+
+        assert code_array[0, 0, 0] == 1
+        assert code_array[1, 0, 0] == 2
+        assert code_array[2, 0, 0] == 3
+
+        code_array[0, 0, 0] = "dep_test_var = 10"
+        assert code_array[0, 0, 0] == 10
+
+        assert repr((1, 0, 0)) not in code_array.result_cache
+        assert repr((2, 0, 0)) in code_array.result_cache
+        assert code_array[1, 0, 0] == 11
+
+    def test_global_assignment_function_invalidation(self):
+        """Global assignments invalidate all cells if functions read them"""
+
+        code_array = self.code_array
+
+        code_array[0, 0, 0] = "dep_test_var = 1"
+        code_array[1, 0, 0] = "dep_test_func = lambda: dep_test_var"
+        code_array[2, 0, 0] = "dep_test_func() + 1"
+        code_array[3, 0, 0] = "3"
+
+        assert code_array[0, 0, 0] == 1
+        assert code_array[1, 0, 0]
+        assert code_array[2, 0, 0] == 2
+        assert code_array[3, 0, 0] == 3
+
+        code_array[0, 0, 0] = "dep_test_var = 10"
+        assert code_array[0, 0, 0] == 10
+
+        assert repr((2, 0, 0)) not in code_array.result_cache
+        assert repr((3, 0, 0)) not in code_array.result_cache
+
+        # Macro functions read the global when they are called
+        code_array.clear_globals()
+        code_array.macros = "def dep_test_macro(): return dep_test_var"
+        code_array.execute_macros()
+
+        code_array[1, 0, 0] = "dep_test_macro()"
+        assert code_array[0, 0, 0] == 10
+        assert code_array[1, 0, 0] == 10
+
+        code_array[0, 0, 0] = "dep_test_var = 20"
+        assert code_array[0, 0, 0] == 20
+        assert code_array[1, 0, 0] == 20
+
+    def test_global_assignment_macro_invalidation(self):
+        """Only macros that read a global make its assignment clear results"""
+
+        code_array = self.code_array
+
+        code_array.macros = "\n".join([
+            "def dep_test_other(): return 1",
+            "class DepTest(object):",
+            "    @staticmethod",
+            "    def get(): return dep_test_var",
+        ])
+        code_array.execute_macros()
+
+        code_array[0, 0, 0] = "dep_test_var = 1"
+        code_array[1, 0, 0] = "DepTest.get()"
+        code_array[2, 0, 0] = "dep_test_other()"
+
+        assert code_array[0, 0, 0] == 1
+        assert code_array[1, 0, 0] == 1
+        assert code_array[2, 0, 0] == 1
+
+        code_array[0, 0, 0] = "dep_test_var = 10"
+        assert code_array[0, 0, 0] == 10
+
+        assert repr((1, 0, 0)) not in code_array.result_cache
+        assert code_array[1, 0, 0] == 10
+        assert code_array[2, 0, 0] == 1
+
+        code_array[3, 0, 0] = "dep_test_unread = 1"
+        assert code_array[3, 0, 0] == 1
+
+        assert repr((1, 0, 0)) in code_array.result_cache
+        assert repr((2, 0, 0)) in code_array.result_cache
+
     def test_make_nested_list(self):
         """Unit test for _make_nested_list"""
 
@@ -585,6 +1198,48 @@ class TestCodeArray(object):
         self.code_array[key] = code
         assert self.code_array._eval_cell(key, code) == res
 
+    def test_compile_cell_code(self):
+        """Unit test for _compile_cell_code"""
+
+        code_array = self.code_array
+
+        error, glob_var, expression, names = \
+            code_array._compile_cell_code("a = b + 1")
+
+        assert error is None
+        assert glob_var == "a"
+        assert eval(expression, {"b": 1}) == 2
+        assert names == frozenset(["b"])
+
+        # Unchanged code is taken from the cache
+        assert code_array._compile_cell_code("a = b + 1")[2] is expression
+
+        error = code_array._compile_cell_code("import os")[0]
+        assert isinstance(error, Exception)
+
+        error = code_array._compile_cell_code("a = 3 ; a < 44")[0]
+        assert isinstance(error, ValueError)
+
+    def test_eval_cell_environment(self):
+        """Cell evaluation does not leave per cell names in globals"""
+
+        code_array = self.code_array
+        env = code_array.get_globals()
+        old_env_items = [(name, env.get(name)) for name in "XYZRCTS"]
+
+        assert code_array._eval_cell((3, 1, 0), "X + Y") == 4
+        assert code_array._eval_cell((3, 1, 0), "[X + i for i in xrange(2)]") \
+            == [3, 4]
+        assert code_array._eval_cell((3, 1, 0), "list(Y for _ in xrange(2))") \
+            == [1, 1]
+
+        # Lambdas keep the environment of their cell
+        func = code_array._eval_cell((5, 1, 0), "lambda: X")
+        code_array._eval_cell((6, 1, 0), "X")
+        assert func() == 5
+
+        assert [(name, env.get(name)) for name in "XYZRCTS"] == old_env_items
+
     def test_execute_macros(self):
         """Unit test for execute_macros"""
 
@@ -593,6 +1248,14 @@ class TestCodeArray(object):
         assert self.code_array._eval_cell((0, 0, 0), "a") == 5
         assert self.code_array._eval_cell((0, 0, 0), "f(2)") == 4
 
+        # Macros and global assignments do not change the module namespace
+        self.code_array._eval_cell((1, 0, 0), "b = 6")
+        assert self.code_array._eval_cell((0, 0, 0), "b") == 6
+        assert not set(["a", "b", "f", "S"]) & set(vars(model))
+
+        self.code_array.clear_globals()
+        assert "a" not in self.code_array.get_globals()
+
     def test_sorted_keys(self):
         """Unit test for _sorted_keys"""
 